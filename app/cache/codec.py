@@ -0,0 +1,60 @@
+# app/cache/codec.py
+"""
+缓存值编解码
+
+缓存值是已编码好的JSON响应体，命中时需原样返回，因此编解码只在字节层面做压缩，
+不改变内容格式。每个值带一个字节的格式标记；编解码器的version会并入缓存键命名空间，
+更换编解码器后不会读到旧格式的数据。
+"""
+import zlib
+
+
+class RawCodec:
+    """不做任何处理"""
+
+    version = "raw"
+
+    def encode(self, body: bytes) -> bytes:
+        return body
+
+    def decode(self, data: bytes) -> bytes:
+        return data
+
+
+class ZlibCodec:
+    """超过阈值的值用zlib压缩，小值原样存储"""
+
+    version = "z1"
+    FLAG_RAW = 0x00
+    FLAG_ZLIB = 0x01
+
+    def __init__(self, threshold: int = 1024, level: int = 6):
+        self.threshold = threshold
+        self.level = level
+
+    def encode(self, body: bytes) -> bytes:
+        if len(body) < self.threshold:
+            return bytes((self.FLAG_RAW,)) + body
+        return bytes((self.FLAG_ZLIB,)) + zlib.compress(body, self.level)
+
+    def decode(self, data: bytes) -> bytes:
+        if not data:
+            raise ValueError("Empty cache value")
+        flag = data[0]
+        if flag == self.FLAG_RAW:
+            return data[1:]
+        if flag == self.FLAG_ZLIB:
+            try:
+                return zlib.decompress(memoryview(data)[1:])
+            except zlib.error as e:
+                raise ValueError(f"Corrupted compressed cache value: {e}")
+        raise ValueError(f"Unknown cache value flag: {flag}")
+
+
+def get_codec(name: str, threshold: int = 1024, level: int = 6):
+    """按名称创建编解码器"""
+    if name == "raw":
+        return RawCodec()
+    if name == "zlib":
+        return ZlibCodec(threshold=threshold, level=level)
+    raise ValueError(f"Unknown cache codec: {name}")
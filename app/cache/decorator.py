@@ -0,0 +1,204 @@
+# app/cache/decorator.py
+"""
+路由缓存装饰器
+
+被装饰的路由函数只负责回源并返回数据，装饰器负责生成缓存键、读写两级缓存、
+序列化为响应字节以及空结果的缓存策略，并记录每个接口的命中、未命中与耗时。
+"""
+import functools
+import inspect
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+import aioredis
+from fastapi import Depends, HTTPException, Response
+from pydantic_core import from_json, to_json
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache.manager import CacheManager, get_cache
+from app.database import USE_PRIMARY
+from app.utils.logger import get_logger
+
+logger = get_logger("app.cache")
+
+# 装饰器注入的缓存管理器参数名，避免与路由函数自身的参数冲突
+CACHE_PARAM = "_cache"
+# 负缓存(如404)的值前缀，正常的JSON响应体不会以该字节开头
+NEGATIVE_PREFIX = b"!"
+
+
+def envelope_serializer(data: Any) -> bytes:
+    """按通用响应模型(code/message/data/pagination)包装后编码"""
+    return to_json({"code": 200, "message": "success", "data": data, "pagination": None})
+
+
+def json_serializer(data: Any) -> bytes:
+    """直接编码返回值"""
+    return to_json(data)
+
+
+def is_empty_result(data: Any) -> bool:
+    """默认的空结果判断：空列表，或分页结构中data为空"""
+    if isinstance(data, dict) and "data" in data:
+        return not data["data"]
+    return not data
+
+
+def encode_negative(exc: HTTPException) -> bytes:
+    """将HTTP异常编码为负缓存值"""
+    return NEGATIVE_PREFIX + to_json({"status_code": exc.status_code, "detail": exc.detail})
+
+
+def raise_if_negative(body: bytes):
+    """命中负缓存时还原并抛出原来的HTTP异常"""
+    if body.startswith(NEGATIVE_PREFIX):
+        error = from_json(body[len(NEGATIVE_PREFIX):])
+        raise HTTPException(status_code=error["status_code"], detail=error["detail"])
+
+
+class EndpointStats:
+    """单个接口的缓存统计"""
+
+    __slots__ = ("hits", "misses", "errors", "hit_time", "miss_time", "max_time")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.hit_time = 0.0
+        self.miss_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, hit: bool, elapsed: float):
+        if hit:
+            self.hits += 1
+            self.hit_time += elapsed
+        else:
+            self.misses += 1
+            self.miss_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+
+    def to_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "avg_hit_ms": round(self.hit_time / self.hits * 1000, 3) if self.hits else 0,
+            "avg_miss_ms": round(self.miss_time / self.misses * 1000, 3) if self.misses else 0,
+            "max_ms": round(self.max_time * 1000, 3),
+        }
+
+
+ENDPOINT_STATS: Dict[str, EndpointStats] = {}
+
+
+def get_endpoint_stats() -> dict:
+    """所有缓存接口的统计"""
+    return {name: stats.to_dict() for name, stats in ENDPOINT_STATS.items()}
+
+
+def use_primary(kwargs: dict):
+    """让路由参数中的数据库会话与加载器改读主库"""
+    for value in kwargs.values():
+        if isinstance(value, AsyncSession):
+            value.info[USE_PRIMARY] = True
+        elif hasattr(value, "use_primary"):
+            value.use_primary()
+
+
+def cached(
+    key: Callable[..., str],
+    ttl: int = 3600,
+    tags: Union[Iterable[str], Callable[..., Iterable[str]]] = (),
+    serializer: Callable[[Any], bytes] = envelope_serializer,
+    negative_ttl: Optional[int] = None,
+    is_empty: Callable[[Any], bool] = is_empty_result,
+    negative_statuses: Iterable[int] = (404,),
+    lock: bool = True,
+):
+    """
+    缓存路由返回结果
+
+    key/tags接收路由函数的参数(关键字参数形式)，返回缓存键/标签
+    negative_ttl为None时空结果不缓存，否则以该过期时间缓存空结果，
+    以及状态码在negative_statuses中的HTTP异常(如不存在的景点)，命中时原样抛出
+    被装饰的函数额外提供refresh(cache, **kwargs)，供预热任务强制回源并覆盖缓存
+    标签刚被失效(复制延迟窗口内)时回源改读主库，refresh则跳过，由请求按需从主库回源
+    """
+
+    def decorator(func):
+        name = func.__name__
+        negative_status_set = frozenset(negative_statuses)
+        stats = ENDPOINT_STATS.setdefault(name, EndpointStats())
+
+        # 在路由签名中追加缓存管理器依赖，使FastAPI自动注入
+        signature = inspect.signature(func)
+        parameters = list(signature.parameters.values())
+        parameters.append(
+            inspect.Parameter(
+                CACHE_PARAM,
+                inspect.Parameter.KEYWORD_ONLY,
+                default=Depends(get_cache),
+                annotation=CacheManager,
+            )
+        )
+
+        async def build(kwargs):
+            """回源并编码，返回(响应体, 写入缓存的值, 过期时间)"""
+            try:
+                data = await func(**kwargs)
+            except HTTPException as e:
+                if negative_ttl is None or e.status_code not in negative_status_set:
+                    raise
+                body = encode_negative(e)
+                return body, body, negative_ttl
+            body = serializer(data)
+            if is_empty(data):
+                return body, (None if negative_ttl is None else body), negative_ttl
+            return body, body, ttl
+
+        async def refresh(cache: CacheManager, **kwargs) -> bool:
+            """强制回源并覆盖缓存，返回是否写入了缓存"""
+            cache_tags = tuple(tags(**kwargs)) if callable(tags) else tuple(tags)
+            if await cache.recently_invalidated(cache_tags):
+                return False
+            versions = await cache.tag_versions(cache_tags)
+            _, raw, ex = await build(kwargs)
+            if raw is None:
+                return False
+            return await cache.set(key(**kwargs), raw, ex=ex, tags=cache_tags, versions=versions)
+
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            cache: CacheManager = kwargs.pop(CACHE_PARAM)
+            start_time = time.perf_counter()
+            cache_key = key(**kwargs)
+            cache_tags = tuple(tags(**kwargs)) if callable(tags) else tuple(tags)
+            loaded = False
+
+            async def load():
+                nonlocal loaded
+                loaded = True
+                if await cache.recently_invalidated(cache_tags):
+                    use_primary(kwargs)
+                return await build(kwargs)
+
+            try:
+                body = await cache.get_or_load(cache_key, load, ex=ttl, tags=cache_tags, lock=lock)
+            except aioredis.RedisError as e:
+                # 缓存不可用时直接回源，不影响接口可用性
+                stats.errors += 1
+                logger.error(f"Cache unavailable for {name} ({cache_key}): {str(e)}")
+                if loaded:
+                    raise
+                body = (await load())[0]
+            stats.record(hit=not loaded, elapsed=time.perf_counter() - start_time)
+            raise_if_negative(body)
+            return Response(content=body, media_type="application/json")
+
+        wrapper.__signature__ = signature.replace(parameters=parameters)
+        wrapper.refresh = refresh
+        wrapper.cache_key = key
+        return wrapper
+
+    return decorator
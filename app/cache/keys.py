@@ -0,0 +1,78 @@
+# app/cache/keys.py
+"""
+缓存键与缓存标签的统一定义
+"""
+import hashlib
+
+# 景点缓存标签：列表类缓存在任意景点变更后都需要失效
+SIGHT_DETAIL_TAG = "sight:detail"
+SIGHT_LIST_TAG = "sight:list"
+SIGHT_SEARCH_TAG = "sight:search"
+SIGHT_HOT_TAG = "sight:hot"
+SIGHT_FINE_TAG = "sight:fine"
+SIGHT_COLLECTION_TAGS = (SIGHT_LIST_TAG, SIGHT_SEARCH_TAG, SIGHT_HOT_TAG, SIGHT_FINE_TAG)
+
+# 门票缓存标签
+TICKET_DETAIL_TAG = "ticket:detail"
+TICKET_LIST_TAG = "ticket:list"
+TICKET_TAGS = (TICKET_DETAIL_TAG, TICKET_LIST_TAG)
+
+SIGHT_HOT_KEY = "sight:hot:list"
+SIGHT_FINE_KEY = "sight:fine:list"
+
+# 搜索关键词超过该长度时在缓存键中使用其摘要，避免超长键
+MAX_KEYWORD_KEY_LENGTH = 64
+
+
+def sight_tag(sight_id: int) -> str:
+    """单个景点的缓存标签，景点详情及其门票列表都登记在该标签下"""
+    return f"sight:{sight_id}"
+
+
+def ticket_tag(ticket_id: int) -> str:
+    """单张门票的缓存标签"""
+    return f"ticket:{ticket_id}"
+
+
+def sight_detail_key(sight_id: int) -> str:
+    return f"sight:detail:{sight_id}"
+
+
+def sight_list_key(page: int, page_size: int) -> str:
+    return f"sight:list:{page}:{page_size}"
+
+
+def _keyword_token(keyword: str) -> str:
+    """关键词在缓存键中的表示，调用方需先规范化关键词"""
+    if len(keyword) > MAX_KEYWORD_KEY_LENGTH:
+        return "h:" + hashlib.sha1(keyword.encode("utf-8")).hexdigest()
+    return keyword
+
+
+def sight_list_cursor_key(cursor: str, page_size: int) -> str:
+    return f"sight:list:cursor:{cursor}:{page_size}"
+
+
+def sight_search_key(keyword: str, page: int, page_size: int) -> str:
+    return f"sight:search:{_keyword_token(keyword)}:{page}:{page_size}"
+
+
+def sight_search_cursor_key(keyword: str, cursor: str, page_size: int) -> str:
+    return f"sight:search:cursor:{_keyword_token(keyword)}:{cursor}:{page_size}"
+
+
+def sight_search_count_key(keyword: str) -> str:
+    """搜索结果总数，同一关键词的所有分页与页大小共用"""
+    return f"sight:search:count:{_keyword_token(keyword)}"
+
+
+def ticket_detail_key(ticket_id: int) -> str:
+    return f"ticket:detail:{ticket_id}"
+
+
+def ticket_list_key(skip: int, limit: int) -> str:
+    return f"ticket:list:{skip}:{limit}"
+
+
+def sight_tickets_key(sight_id: int) -> str:
+    return f"ticket:sight:{sight_id}"
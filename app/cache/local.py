@@ -0,0 +1,91 @@
+# app/cache/local.py
+"""
+进程内一级缓存(L1)：容量与TTL受限，按LRU淘汰，支持按标签失效
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+
+class LocalCache:
+    """进程内LRU+TTL缓存，非线程安全，仅在事件循环内使用"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (过期时间, 值, 标签)
+        self._data: "OrderedDict[str, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        # 标签 -> 键集合
+        self._tags: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存值，不存在或已过期返回None"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()):
+        """写入缓存，超出容量时淘汰最久未使用的项"""
+        if key in self._data:
+            self.delete(key)
+        tags = tuple(tags)
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._data[key] = (time.monotonic() + ttl, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._data) > self.maxsize:
+            oldest = next(iter(self._data))
+            self.delete(oldest)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        """删除单个缓存项"""
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """删除标签下的所有缓存项，返回删除数量"""
+        removed = 0
+        for tag in tags:
+            for key in list(self._tags.pop(tag, ())):
+                if key in self._data:
+                    self.delete(key)
+                    removed += 1
+        return removed
+
+    def clear(self):
+        """清空缓存"""
+        self._data.clear()
+        self._tags.clear()
+
+    def stats(self) -> dict:
+        """命中统计"""
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,389 @@
+# app/cache/manager.py
+"""
+两级缓存：进程内L1(LocalCache) + Redis L2
+
+写操作通过Redis发布订阅广播失效消息，所有worker收到后立即丢弃各自的L1缓存项。
+缓存未命中时通过进程内请求合并与可选的Redis锁保证只有一个加载者回源，
+过期时间加入随机抖动，并按XFetch算法在过期前概率性地提前刷新。
+
+L2中每个缓存项是一个哈希：v为缓存值，d为上次回源耗时(毫秒)，供XFetch使用。
+缓存键统一加上命名空间前缀，缓存内容格式变化时更换命名空间即可避免读到旧格式数据。
+写入L2前经codec编码(如压缩)，读取后解码，L1中保存解码后的值。
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import time
+import uuid
+from collections import Counter
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple
+
+import aioredis
+from fastapi import Request
+
+from app.cache.codec import RawCodec
+from app.cache.local import LocalCache
+from app.cache.singleflight import SingleFlight
+from app.cache.tags import LUA_NOW, TAG_TTL, invalidate_tags, tag_key, tag_versions, version_key
+from app.utils.logger import get_logger
+
+logger = get_logger("app.cache")
+
+VALUE_FIELD = "v"
+DELTA_FIELD = "d"
+LOCK_KEY_PREFIX = "cache:lock:"
+# 标签最近被失效的标记，存在期间该标签下的缓存从主库回源
+FRESH_KEY_PREFIX = "cache:fresh:"
+# 访问计数最多跟踪的键数，避免大量一次性键(如随机搜索词)占用内存
+MAX_TRACKED_KEYS = 10000
+# 锁等待期间轮询缓存的间隔(秒)
+LOCK_POLL_INTERVAL = 0.05
+
+# 仅当锁仍归自己所有时才释放
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# 仅当各标签版本与回源前读到的一致时写入缓存项并登记到标签下，否则说明回源期间标签被失效过，
+# 结果可能是失效前读到的旧数据，放弃写入。写入与登记在同一脚本中完成，失效不会落在两者之间而漏删
+# KEYS: 缓存键, 各标签键, 各标签版本键；ARGV: 缓存值, 回源耗时(毫秒), 过期时间(秒), 标签过期时间(秒), 各标签版本
+STORE_SCRIPT = LUA_NOW + f"""
+local n = (#KEYS - 1) / 2
+for i = 1, n do
+    if (redis.call('GET', KEYS[1 + n + i]) or '0') ~= ARGV[4 + i] then
+        return 0
+    end
+end
+redis.call('HSET', KEYS[1], '{VALUE_FIELD}', ARGV[1], '{DELTA_FIELD}', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+for i = 1, n do
+    redis.call('ZADD', KEYS[1 + i], now + tonumber(ARGV[3]), KEYS[1])
+    redis.call('ZREMRANGEBYSCORE', KEYS[1 + i], '-inf', now)
+    redis.call('EXPIRE', KEYS[1 + i], ARGV[4])
+end
+return 1
+"""
+
+# 加载函数返回(返回给调用方的值, 写入缓存的编码值[, 过期时间])，编码值为None时不写缓存，
+# 未给出过期时间时使用get_or_load的ex
+Loader = Callable[[], Awaitable[tuple]]
+
+
+class CacheManager:
+    """两级缓存管理器，保存在app.state.cache上，所有请求共享"""
+
+    def __init__(
+        self,
+        redis,
+        local: LocalCache,
+        channel: str = "cache:invalidate",
+        namespace: str = "v1",
+        codec=None,
+        ttl_jitter: float = 0.1,
+        xfetch_beta: float = 1.0,
+        lock_timeout_ms: int = 5000,
+        lock_wait: float = 2,
+        fresh_window: float = 0,
+    ):
+        self.redis = redis
+        self.local = local
+        self.channel = channel
+        self.codec = codec or RawCodec()
+        # 编解码器版本并入命名空间，更换编解码器不会读到旧格式数据
+        self.namespace = f"{namespace}:{self.codec.version}"
+        self.ttl_jitter = ttl_jitter
+        self.xfetch_beta = xfetch_beta
+        self.lock_timeout_ms = lock_timeout_ms
+        self.lock_wait = lock_wait
+        # 标签失效后多长时间(秒)内回源须读主库，覆盖从库复制延迟；0表示不区分(无从库)
+        self.fresh_window = fresh_window
+        self.flight = SingleFlight()
+        # 本进程标识，用于忽略自己发出的失效广播
+        self.instance_id = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.loads = 0
+        self.early_refreshes = 0
+        # 回源期间标签被失效而放弃写入的次数
+        self.stale_writes = 0
+        # 各缓存键自上次统计以来的访问次数，供预热任务判断哪些键值得提前刷新
+        self.access_counts: Counter = Counter()
+        self._listener_task: Optional[asyncio.Task] = None
+
+    def _key(self, key: str) -> str:
+        """加上命名空间前缀的完整缓存键"""
+        return f"{self.namespace}:{key}"
+
+    async def _fetch(self, key: str) -> Tuple[Optional[bytes], float, float]:
+        """一次往返读取L2中的缓存值、回源耗时(秒)与剩余TTL(秒)"""
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.hmget(key, VALUE_FIELD, DELTA_FIELD)
+                pipe.pttl(key)
+                (raw, delta), ttl_ms = await pipe.execute()
+            if raw is not None:
+                raw = self.codec.decode(raw)
+        except (aioredis.ResponseError, ValueError) as e:
+            # 键类型不符或数据损坏，删除后按未命中处理
+            logger.error(f"Error reading cache key {key}: {str(e)}")
+            await self.redis.delete(key)
+            return None, 0.0, 0.0
+        return raw, float(delta or 0) / 1000, ttl_ms / 1000
+
+    def _should_refresh_early(self, delta: float, ttl: float) -> bool:
+        """XFetch：剩余TTL越短、回源越慢，越可能提前刷新"""
+        if self.xfetch_beta <= 0 or delta <= 0 or ttl < 0:
+            return False
+        return delta * self.xfetch_beta * -math.log(1.0 - random.random()) >= ttl
+
+    def _jitter(self, ex: int) -> int:
+        """给过期时间加上随机抖动"""
+        return ex + random.randint(0, int(ex * self.ttl_jitter))
+
+    async def get(self, key: str, tags: Iterable[str] = (), decode: Callable[[Any], Any] = None) -> Optional[Any]:
+        """
+        依次查询L1、L2，L2命中后解码并回填L1
+        tags需与写入时一致，用于L1按标签失效
+        """
+        key = self._key(key)
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        raw, _, ttl = await self._fetch(key)
+        if raw is None:
+            self.l2_misses += 1
+            return None
+        self.l2_hits += 1
+        value = decode(raw) if decode else raw
+        self.local.set(key, value, ttl=ttl, tags=tags)
+        return value
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Loader,
+        ex: int,
+        tags: Iterable[str] = (),
+        decode: Callable[[Any], Any] = None,
+        lock: bool = True,
+    ) -> Any:
+        """
+        读取缓存，未命中时只允许一个加载者回源，其余请求等待其结果
+        lock为True时额外使用Redis锁在多进程间互斥
+        """
+        if key in self.access_counts or len(self.access_counts) < MAX_TRACKED_KEYS:
+            self.access_counts[key] += 1
+        key = self._key(key)
+        tags = tuple(tags)
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        raw, delta, ttl = await self._fetch(key)
+        if raw is not None:
+            self.l2_hits += 1
+            if self._should_refresh_early(delta, ttl) and not self.flight.in_flight(key):
+                # 抽中提前刷新的请求自己回源(加载函数依赖请求内的数据库会话)，其余请求继续使用缓存值
+                self.early_refreshes += 1
+                return await self.flight.do(key, lambda: self._load(key, loader, ex, tags, decode, lock=False))
+            value = decode(raw) if decode else raw
+            self.local.set(key, value, ttl=ttl, tags=tags)
+            return value
+
+        self.l2_misses += 1
+        return await self.flight.do(key, lambda: self._load(key, loader, ex, tags, decode, lock))
+
+    async def _load(self, key: str, loader: Loader, ex: int, tags: Tuple[str, ...], decode, lock: bool) -> Any:
+        """回源加载并写入缓存"""
+        token = None
+        lock_key = f"{LOCK_KEY_PREFIX}{key}"
+        if lock:
+            token = uuid.uuid4().hex
+            if not await self.redis.set(lock_key, token, nx=True, px=self.lock_timeout_ms):
+                token = None
+                # 其他进程正在回源，等待其写入缓存
+                raw = await self._wait_for(key)
+                if raw is not None:
+                    return decode(raw) if decode else raw
+        try:
+            # 在回源之前读取标签版本，回源期间发生的失效会使写入被放弃
+            versions = await tag_versions(self.redis, tags)
+            start_time = time.perf_counter()
+            result = await loader()
+            delta = time.perf_counter() - start_time
+            self.loads += 1
+            value, raw = result[0], result[1]
+            if len(result) > 2:
+                ex = result[2]
+            if raw is not None:
+                try:
+                    await self._set(key, raw, ex=ex, tags=tags, delta=delta, versions=versions)
+                except Exception as e:
+                    logger.error(f"Error caching data for key {key}: {str(e)}")
+            return value
+        finally:
+            if token is not None:
+                try:
+                    await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                except Exception as e:
+                    logger.error(f"Error releasing cache lock {lock_key}: {str(e)}")
+
+    async def _wait_for(self, key: str) -> Optional[bytes]:
+        """轮询等待其他进程写入缓存，超时返回None"""
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            raw = await self.redis.hget(key, VALUE_FIELD)
+            if raw is not None:
+                try:
+                    return self.codec.decode(raw)
+                except ValueError:
+                    return None
+        return None
+
+    async def set(self, key: str, value, ex: int, tags: Iterable[str] = (), versions: Optional[List[bytes]] = None) -> bool:
+        """
+        写入L2(过期时间带随机抖动)并丢弃本进程的L1旧值，L1在下次读取时回填。
+        versions为生成value之前通过tag_versions读到的标签版本，此后标签被失效过时不写入；
+        未给出时以当前版本为准。返回是否写入
+        """
+        key = self._key(key)
+        self.local.delete(key)
+        return await self._set(key, value, ex=ex, tags=tags, versions=versions)
+
+    async def tag_versions(self, tags: Iterable[str]) -> List[bytes]:
+        """读取标签当前的版本，在生成缓存值之前调用，传给set"""
+        return await tag_versions(self.redis, tags)
+
+    async def _set(
+        self, key: str, value, ex: int, tags: Iterable[str] = (), delta: float = 0.0,
+        versions: Optional[List[bytes]] = None,
+    ) -> bool:
+        tags = tuple(tags)
+        if versions is None:
+            versions = await tag_versions(self.redis, tags)
+        keys = [key] + [tag_key(tag) for tag in tags] + [version_key(tag) for tag in tags]
+        stored = await self.redis.eval(
+            STORE_SCRIPT, len(keys), *keys,
+            self.codec.encode(value), int(delta * 1000), self._jitter(ex), TAG_TTL, *versions,
+        )
+        if not stored:
+            self.stale_writes += 1
+            logger.info(f"Skipped caching {key}: tags invalidated while loading")
+        return bool(stored)
+
+    async def ttl(self, key: str) -> float:
+        """缓存项在L2中的剩余过期时间(秒)，不存在时返回-2"""
+        ttl_ms = await self.redis.pttl(self._key(key))
+        return ttl_ms / 1000 if ttl_ms >= 0 else ttl_ms
+
+    def pop_access_counts(self) -> Counter:
+        """取出并清零访问计数"""
+        counts, self.access_counts = self.access_counts, Counter()
+        return counts
+
+    async def delete(self, key: str):
+        """删除单个缓存项"""
+        key = self._key(key)
+        self.local.delete(key)
+        await self.redis.delete(key)
+
+    async def invalidate(self, *tags: str) -> int:
+        """
+        按标签失效L2与本进程L1，并广播给其他worker。
+        先为标签打上最近失效标记再删除缓存，删除后的回源都能看到标记而改读主库，
+        不会在复制延迟窗口内把从库上的旧数据重新写进缓存
+        """
+        if self.fresh_window > 0 and tags:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.set(f"{FRESH_KEY_PREFIX}{tag}", 1, px=int(self.fresh_window * 1000))
+                await pipe.execute()
+        self.local.invalidate_tags(tags)
+        removed = await invalidate_tags(self.redis, *tags)
+        await self.redis.publish(
+            self.channel,
+            json.dumps({"origin": self.instance_id, "tags": list(tags)}),
+        )
+        return removed
+
+    async def recently_invalidated(self, tags: Iterable[str]) -> bool:
+        """这些标签中是否有在fresh_window内被失效的，Redis出错时按是处理(读主库总是安全的)"""
+        if self.fresh_window <= 0 or not tags:
+            return False
+        try:
+            return await self.redis.exists(*[f"{FRESH_KEY_PREFIX}{tag}" for tag in tags]) > 0
+        except aioredis.RedisError as e:
+            logger.error(f"Error checking fresh markers for {tags}: {str(e)}")
+            return True
+
+    def _handle_message(self, data):
+        """处理失效广播"""
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            logger.error(f"Invalid cache invalidation message: {data!r}")
+            return
+        if message.get("origin") == self.instance_id:
+            return
+        self.local.invalidate_tags(message.get("tags", []))
+
+    async def _listen(self):
+        """订阅失效频道，连接异常时清空L1(可能漏掉了广播)并重新订阅"""
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                logger.info(f"Subscribed to cache invalidation channel: {self.channel}")
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self._handle_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation listener error: {str(e)}")
+                self.local.clear()
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.reset()
+                except Exception:
+                    pass
+
+    def start(self):
+        """启动失效广播监听任务"""
+        if self._listener_task is None:
+            self._listener_task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """停止失效广播监听任务"""
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+    def stats(self) -> dict:
+        """各级缓存命中统计"""
+        return {
+            "l1": self.local.stats(),
+            "l2": {"hits": self.l2_hits, "misses": self.l2_misses},
+            "loads": self.loads,
+            "coalesced": self.flight.coalesced,
+            "early_refreshes": self.early_refreshes,
+            "stale_writes": self.stale_writes,
+        }
+
+
+async def get_cache(request: Request) -> CacheManager:
+    """获取缓存管理器(依赖注入)"""
+    return request.app.state.cache
@@ -0,0 +1,49 @@
+# app/cache/singleflight.py
+"""
+进程内请求合并：同一个键同时只有一个协程执行加载，其余协程等待并共享结果
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """按键合并并发的加载调用"""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        # 被合并(未实际执行加载)的调用次数
+        self.coalesced = 0
+
+    def in_flight(self, key: str) -> bool:
+        """该键是否正在加载"""
+        return key in self._calls
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """执行fn，若同一键已有加载在进行，则等待其结果"""
+        while key in self._calls:
+            future = self._calls[key]
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 执行加载的协程被取消(如客户端断开)，由当前协程重新发起加载
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 标记异常已被读取，避免没有等待者时打印"never retrieved"警告
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
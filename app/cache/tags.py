@@ -0,0 +1,69 @@
+# app/cache/tags.py
+"""
+基于标签的缓存失效
+
+每个缓存键写入时登记到一个或多个标签(Redis有序集合)下，分数为该键的过期时间戳，失效时只删除
+标签下登记的键，代价为O(受影响的键数)，请求路径上不再需要KEYS/SCAN。
+每次登记时顺带移除已过期的成员，标签集合的大小以当前仍存活的缓存键数为上限，
+不会随不同的搜索词等一次性键无限增长。
+失效同时递增标签版本号，回源期间标签被失效过的加载结果不再写入缓存。
+"""
+from typing import Iterable, List
+
+# 标签集合的键前缀(有序集合，与旧版集合类型的标签键区分)
+TAG_KEY_PREFIX = "cache:ztag:"
+# 标签集合的过期时间，需大于任何缓存项的过期时间(含抖动)，长时间没有写入的标签自行过期
+TAG_TTL = 2 * 3600
+# 每个标签的版本号，每次失效加一。回源前记下版本，写入时版本已变化说明回源期间标签被失效过，
+# 读到的可能是失效前的旧数据，放弃写入(见CacheManager的STORE_SCRIPT)
+VERSION_KEY_PREFIX = "cache:tagver:"
+# 成员分数与过期判断统一使用Redis服务器时间，不受各应用服务器时钟偏差影响
+# (Redis 5起脚本按效果复制，TIME之后可以写入)
+LUA_NOW = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+"""
+# 原子地删除标签下仍存活的键以及标签本身并递增标签版本，避免读取成员与删除标签之间有新键登记而被遗漏。
+# 用UNLINK在后台释放内存，脚本本身只做摘除，耗时与键的大小无关
+# KEYS: 各标签键, 各标签版本键；ARGV: 标签过期时间(秒)
+INVALIDATE_SCRIPT = LUA_NOW + """
+local n = #KEYS / 2
+local total = 0
+for i = 1, n do
+    local members = redis.call('ZRANGEBYSCORE', KEYS[i], now, '+inf')
+    for j = 1, #members, 500 do
+        redis.call('UNLINK', unpack(members, j, math.min(j + 499, #members)))
+    end
+    total = total + #members
+    redis.call('DEL', KEYS[i])
+    redis.call('INCR', KEYS[n + i])
+    redis.call('EXPIRE', KEYS[n + i], ARGV[1])
+end
+return total
+"""
+
+
+def tag_key(tag: str) -> str:
+    """标签对应的Redis集合键"""
+    return f"{TAG_KEY_PREFIX}{tag}"
+
+
+def version_key(tag: str) -> str:
+    """标签对应的版本号键"""
+    return f"{VERSION_KEY_PREFIX}{tag}"
+
+
+async def tag_versions(redis, tags: Iterable[str]) -> List[bytes]:
+    """读取各标签当前的版本号，从未失效过的标签为0"""
+    tags = list(tags)
+    if not tags:
+        return []
+    return [version or b"0" for version in await redis.mget(*[version_key(tag) for tag in tags])]
+
+
+async def invalidate_tags(redis, *tags: str) -> int:
+    """删除标签下登记的所有缓存键以及标签本身并递增标签版本，返回删除的缓存键数"""
+    if not tags:
+        return 0
+    keys = [tag_key(tag) for tag in tags] + [version_key(tag) for tag in tags]
+    return await redis.eval(INVALIDATE_SCRIPT, len(keys), *keys, TAG_TTL)
@@ -69,6 +69,16 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
 
     return token_data
 
+async def get_current_user_with_id(current_user: TokenData = Depends(get_current_user)):
+    # 下单等按用户归属数据的接口需要user_id，令牌中缺少时视为未认证
+    if current_user.user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token missing user id",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return current_user
+
 async def get_sight_admin(current_user: TokenData = Depends(get_current_user)):
     if current_user.user_type != "sight_admin":
         raise HTTPException(
@@ -1,26 +1,154 @@
 # app/main.py
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
+import aioredis
 from app.sight.router import router as sight_router
 from app.tickets.router import router as tickets_router
+from app.order.routers import router as order_router
 # from app.auth import router as auth_router
-from app.database import  get_redis,create_async_db_pool,close_async_db_pool
+from app.database import (
+    create_redis_pool,
+    create_redis_client,
+    close_redis_pool,
+    get_redis,
+    get_redis_pool_stats,
+    get_db_pool_stats,
+    create_async_db_pool,
+    close_async_db_pool,
+    AsyncSessionLocal,
+    PrimarySessionLocal,
+    replicas,
+)
 from app.utils.logger import setup_logger
+from app.cache.codec import get_codec
+from app.cache.local import LocalCache
+from app.cache.manager import CacheManager
+from app.cache.decorator import get_endpoint_stats
+from app.sight.warmer import SightCacheWarmer
+from app.sight.counters import SightCounters
+from app.sight.loaders import SightBatchers
+from app.tickets.inventory import TicketInventory
+from app.order.expiry import OrderExpiryQueue
+from app.utils.snowflake import WorkerIdLease, order_numbers
+from app.config import (
+    LOCAL_CACHE_MAXSIZE,
+    LOCAL_CACHE_TTL,
+    CACHE_INVALIDATION_CHANNEL,
+    CACHE_NAMESPACE,
+    CACHE_TTL_JITTER,
+    CACHE_XFETCH_BETA,
+    CACHE_LOCK_TIMEOUT_MS,
+    CACHE_LOCK_WAIT,
+    DATABASE_REPLICA_URLS,
+    DB_READ_YOUR_WRITES_WINDOW,
+    CACHE_WARM_CONCURRENCY,
+    CACHE_WARM_TOP_DETAILS,
+    CACHE_WARM_INTERVAL,
+    CACHE_WARM_REFRESH_AHEAD,
+    CACHE_WARM_MIN_HITS,
+    CACHE_CODEC,
+    CACHE_COMPRESS_THRESHOLD,
+    CACHE_COMPRESS_LEVEL,
+    SIGHT_COUNTER_RECONCILE_INTERVAL,
+    TICKET_INVENTORY_BACKEND,
+    TICKET_INVENTORY_FLUSH_INTERVAL,
+    TICKET_INVENTORY_FLUSH_BATCH,
+    TICKET_INVENTORY_RECONCILE_INTERVAL,
+    TICKET_INVENTORY_HOLD_TTL,
+    ORDER_WORKER_ID,
+    ORDER_WORKER_LEASE_TTL,
+    ORDER_PAYMENT_TIMEOUT,
+    ORDER_EXPIRY_INTERVAL,
+    ORDER_EXPIRY_BATCH,
+    ORDER_EXPIRY_RETRY_AFTER,
+)
 
 
 async def lifespan(app: FastAPI):
     # Startup event
     logger.info("redis and db startup...")  # 记录启动日志
-    app.state.redis = await get_redis()
+    app.state.redis = create_redis_client(create_redis_pool())  # 进程内共享的Redis连接池
+    app.state.cache = CacheManager(
+        app.state.redis,
+        LocalCache(maxsize=LOCAL_CACHE_MAXSIZE, ttl=LOCAL_CACHE_TTL),
+        channel=CACHE_INVALIDATION_CHANNEL,
+        namespace=CACHE_NAMESPACE,
+        codec=get_codec(CACHE_CODEC, threshold=CACHE_COMPRESS_THRESHOLD, level=CACHE_COMPRESS_LEVEL),
+        ttl_jitter=CACHE_TTL_JITTER,
+        xfetch_beta=CACHE_XFETCH_BETA,
+        lock_timeout_ms=CACHE_LOCK_TIMEOUT_MS,
+        lock_wait=CACHE_LOCK_WAIT,
+        # 有从库时，标签失效后的复制延迟窗口内缓存回源读主库
+        fresh_window=DB_READ_YOUR_WRITES_WINDOW if DATABASE_REPLICA_URLS else 0,
+    )
+    app.state.cache.start()  # 订阅跨进程缓存失效广播
     app.state.db_pool = await create_async_db_pool()  # 创建连接池
+    app.state.order_worker_lease = None
+    if ORDER_WORKER_ID:
+        order_numbers.configure(int(ORDER_WORKER_ID))
+    else:
+        app.state.order_worker_lease = WorkerIdLease(app.state.redis, order_numbers, key_prefix="order:worker:", ttl=ORDER_WORKER_LEASE_TTL)
+        try:
+            await app.state.order_worker_lease.start()  # 租用订单编号的工作节点ID
+        except Exception as e:
+            logger.error(f"Failed to lease order worker id, falling back to pid: {str(e)}")
+    app.state.sight_counters = SightCounters(
+        app.state.redis,
+        PrimarySessionLocal,  # 对账以主库为准
+        reconcile_interval=SIGHT_COUNTER_RECONCILE_INTERVAL,
+    )
+    app.state.sight_counters.start()  # 定期与数据库对账景点计数
+    app.state.sight_batchers = SightBatchers(AsyncSessionLocal)  # 跨请求合并景点关联数据查询
+    app.state.primary_sight_batchers = SightBatchers(PrimarySessionLocal)  # 读己之写窗口内使用
+    app.state.warmer = SightCacheWarmer(
+        app.state.cache,
+        AsyncSessionLocal,
+        concurrency=CACHE_WARM_CONCURRENCY,
+        top_details=CACHE_WARM_TOP_DETAILS,
+        interval=CACHE_WARM_INTERVAL,
+        refresh_ahead=CACHE_WARM_REFRESH_AHEAD,
+        min_hits=CACHE_WARM_MIN_HITS,
+        counters=app.state.sight_counters,
+        batchers=app.state.sight_batchers,
+    )
+    app.state.warmer.start()  # 后台预热缓存，完成后就绪检查才通过
+    app.state.ticket_inventory = None
+    if TICKET_INVENTORY_BACKEND == "redis":
+        app.state.ticket_inventory = TicketInventory(
+            app.state.redis,
+            PrimarySessionLocal,
+            flush_interval=TICKET_INVENTORY_FLUSH_INTERVAL,
+            flush_batch=TICKET_INVENTORY_FLUSH_BATCH,
+            reconcile_interval=TICKET_INVENTORY_RECONCILE_INTERVAL,
+            hold_ttl=TICKET_INVENTORY_HOLD_TTL,
+        )
+        app.state.ticket_inventory.start()  # 门票库存按数据库异步重新计算，启动时先全量对账
+    app.state.order_expiry = OrderExpiryQueue(
+        app.state.redis,
+        PrimarySessionLocal,
+        timeout=ORDER_PAYMENT_TIMEOUT,
+        interval=ORDER_EXPIRY_INTERVAL,
+        batch_size=ORDER_EXPIRY_BATCH,
+        retry_after=ORDER_EXPIRY_RETRY_AFTER,
+        inventory=app.state.ticket_inventory,
+    )
+    app.state.order_expiry.start()  # 超时未支付的订单自动取消并归还余量
 
     yield  # 应用运行期间
 
     # Shutdown event
     logger.info("redis and db shutdown...")
-    await app.state.redis.close()
+    await app.state.warmer.stop()
+    await app.state.order_expiry.stop()
+    if app.state.ticket_inventory is not None:
+        await app.state.ticket_inventory.stop()
+    await app.state.sight_counters.stop()
+    if app.state.order_worker_lease is not None:
+        await app.state.order_worker_lease.stop()
+    await app.state.cache.stop()
+    await close_redis_pool(app.state.redis)
     await close_async_db_pool()
 
 
@@ -46,6 +174,7 @@ logger = setup_logger()
 # 注册路由
 app.include_router(tickets_router)
 app.include_router(sight_router)
+app.include_router(order_router)
 
 # 挂载静态文件目录
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -54,6 +183,29 @@ app.mount("/static", StaticFiles(directory="app/static"), name="static")
 async def root():
     return {"message": "欢迎使用旅游系统API"}
 
+@app.get("/metrics/", include_in_schema=False)
+async def metrics(redis: aioredis.Redis = Depends(get_redis)):
+    """运行时指标"""
+    return {
+        "redis_pool": get_redis_pool_stats(redis.connection_pool),
+        "db_pools": get_db_pool_stats(),
+        "db_replicas": replicas.stats(),
+        "cache": app.state.cache.stats(),
+        "loaders": app.state.sight_batchers.stats(),
+        "endpoints": get_endpoint_stats(),
+        "warmer": app.state.warmer.stats(),
+        "ticket_inventory": app.state.ticket_inventory and app.state.ticket_inventory.stats(),
+        "order_expiry": app.state.order_expiry.stats(),
+    }
+
+@app.get("/health/ready/", include_in_schema=False)
+async def readiness(response: Response):
+    """就绪检查，缓存预热完成前返回503"""
+    if not app.state.warmer.ready.is_set():
+        response.status_code = 503
+        return {"status": "warming"}
+    return {"status": "ready"}
+
 from fastapi.responses import FileResponse
 import os
 
@@ -1,5 +1,5 @@
 # app/models/ticket.py
-from sqlalchemy import Column, Integer, String, Numeric, Boolean, Text, ForeignKey, Float, Date, DateTime, BigInteger
+from sqlalchemy import Column, Integer, String, Numeric, Boolean, Text, ForeignKey, Float, Date, DateTime, BigInteger, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -9,6 +9,10 @@ class Ticket(Base):
     门票模型
     """
     __tablename__ = "sight_ticket"
+    __table_args__ = (
+        # 按景点查询有效门票
+        Index("ix_sight_ticket_sight_id_is_valid", "sight_id", "is_valid"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     sight_id = Column(Integer, ForeignKey("sight.id"), index=True)  # 关联的景点ID
@@ -0,0 +1,179 @@
+# app/order/expiry.py
+"""
+未支付订单超时取消
+
+下单提交后把订单ID加入Redis有序集合，分数为过期时间戳；后台任务定期领取已到期的订单，
+按批把仍为待支付的订单改为已取消并归还门票余量。不需要扫描order表。
+
+领取时不直接删除，而是把分数推后retry_after秒作为租约，处理完成后才删除：
+处理中进程崩溃时订单会重新到期，由其他进程再次处理。取消只作用于仍为待支付的订单(加锁读取)，
+重复处理不会重复归还余量。
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from fastapi import Request
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.future import select
+
+from app.order.models import Order, OrderItem
+from app.tickets.inventory import TicketInventory
+from app.tickets.models import Ticket
+from app.utils.logger import get_logger
+
+logger = get_logger("app.order.expiry")
+
+ORDER_EXPIRY_KEY = "order:expiry"
+
+# KEYS[1]: 延时队列；ARGV: 当前时间戳, 租约到期时间戳, 批大小。返回领取到的订单ID
+CLAIM_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[3])
+for _, id in ipairs(ids) do
+    redis.call('ZADD', KEYS[1], ARGV[2], id)
+end
+return ids
+"""
+
+_RESTORE_REMAIN = (
+    update(Ticket.__table__)
+    .where(Ticket.__table__.c.id == bindparam("b_id"))
+    .values(remain=Ticket.__table__.c.remain + bindparam("b_quantity"))
+)
+
+
+class OrderExpiryQueue:
+    """未支付订单延时队列，保存在app.state.order_expiry上"""
+
+    def __init__(
+        self,
+        redis,
+        session_factory,
+        timeout: float = 900,
+        interval: float = 1,
+        batch_size: int = 200,
+        retry_after: float = 60,
+        inventory: TicketInventory = None,
+        key: str = ORDER_EXPIRY_KEY,
+    ):
+        self.redis = redis
+        self.key = key
+        self.session_factory = session_factory
+        self.timeout = timeout
+        self.interval = interval
+        self.batch_size = batch_size
+        self.retry_after = retry_after
+        # 库存在Redis中时归还到Redis，数据库余量由库存回写任务更新
+        self.inventory = inventory
+        self._claim = redis.register_script(CLAIM_SCRIPT)
+        self.scheduled = 0
+        self.cancelled = 0
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def schedule(self, order: Order):
+        """订单提交后加入队列，出错只记录日志，不影响下单"""
+        expire_at = order.created_at.timestamp() + self.timeout
+        try:
+            await self.redis.zadd(self.key, {order.id: expire_at})
+            self.scheduled += 1
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Error scheduling expiry for order {order.id}: {str(e)}")
+
+    async def claim(self, now: float = None) -> List[int]:
+        """领取一批已到期的订单"""
+        now = time.time() if now is None else now
+        ids = await self._claim(keys=[self.key], args=[now, now + self.retry_after, self.batch_size])
+        return [int(order_id) for order_id in ids]
+
+    async def cancel(self, order_ids: List[int]) -> int:
+        """取消其中仍为待支付的订单并归还余量，返回实际取消的订单数"""
+        async with self.session_factory() as db:
+            # 锁定仍待支付的订单，与支付等状态变更串行，已支付或已取消的订单跳过
+            pending = (await db.execute(
+                select(Order.id)
+                .where(Order.id.in_(order_ids), Order.status == Order.STATUS_PENDING)
+                .order_by(Order.id)
+                .with_for_update()
+            )).scalars().all()
+            if not pending:
+                await db.commit()
+                return 0
+            await db.execute(
+                update(Order)
+                .where(Order.id.in_(pending))
+                .values(status=Order.STATUS_CANCELLED)
+                .execution_options(synchronize_session=False)
+            )
+            rows = (await db.execute(
+                select(OrderItem.ticket_id, func.sum(OrderItem.quantity))
+                .where(OrderItem.order_id.in_(pending))
+                .group_by(OrderItem.ticket_id)
+            )).all()
+            quantities: Dict[int, int] = {ticket_id: int(quantity) for ticket_id, quantity in rows}
+            if quantities and self.inventory is None:
+                # 按门票ID顺序更新，与下单扣减的加锁顺序一致
+                await db.execute(_RESTORE_REMAIN, [
+                    {"b_id": ticket_id, "b_quantity": quantities[ticket_id]} for ticket_id in sorted(quantities)
+                ])
+            await db.commit()
+        if quantities and self.inventory is not None:
+            # 提交后再让Redis库存按数据库重新计算：失败只会少卖，不会超卖，下次全量对账时修正
+            try:
+                await self.inventory.refresh(quantities)
+            except Exception as e:
+                logger.error(f"Error refreshing stock of cancelled orders {pending}: {str(e)}")
+        self.cancelled += len(pending)
+        return len(pending)
+
+    async def process(self, now: float = None) -> int:
+        """处理一批到期订单，返回领取到的订单数"""
+        order_ids = await self.claim(now)
+        if not order_ids:
+            return 0
+        count = await self.cancel(order_ids)
+        await self.redis.zrem(self.key, *order_ids)
+        if count:
+            logger.info(f"Cancelled {count} expired orders")
+        return len(order_ids)
+
+    async def _run(self):
+        while True:
+            try:
+                while await self.process() >= self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 已领取的订单在租约到期后重新处理
+                self.failures += 1
+                logger.error(f"Error cancelling expired orders: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """启动超时取消任务"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止超时取消任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": self.scheduled,
+            "cancelled": self.cancelled,
+            "failures": self.failures,
+        }
+
+
+async def get_order_expiry(request: Request) -> Optional[OrderExpiryQueue]:
+    """获取未支付订单延时队列(依赖注入)"""
+    return getattr(request.app.state, "order_expiry", None)
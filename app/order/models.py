@@ -1,12 +1,20 @@
-from sqlalchemy import Column,Integer,String,Float,DateTime,ForeignKey,Boolean,Date,BigInteger
+from sqlalchemy import Column,Integer,String,Float,DateTime,ForeignKey,Boolean,Date,BigInteger,Index
 from sqlalchemy.sql import func
 from app.database import Base
-import random
-from datetime import datetime
+from app.utils.snowflake import order_numbers
 
 class Order(Base):
     '''订单主表'''
     __tablename__ = 'order'
+    __table_args__ = (
+        # 按用户查询订单并按创建时间排序
+        Index('ix_order_user_id_created_at', 'user_id', 'created_at'),
+    )
+
+    # 订单状态
+    STATUS_PENDING = 0
+    STATUS_PAID = 1
+    STATUS_CANCELLED = 2
 
     id = Column(Integer, primary_key=True, index=True)
     # 订单编号
@@ -32,9 +40,8 @@ class Order(Base):
 
     @staticmethod
     def generate_order_number():
-        '''生成订单编号,年月日时分秒+4位随机数'''
-        now = datetime.now()
-        return now.strftime('%Y%m%d%H%M%S') + ''.join(random.choice('0123456789') for _ in range(4))
+        '''生成订单编号,年月日+19位Snowflake编号,全局唯一且按生成时间有序'''
+        return order_numbers.next_str()
 
 
 class OrderItem(Base):
@@ -0,0 +1,14 @@
+from typing import Generic, TypeVar, Optional, Any, Dict
+from pydantic import BaseModel
+
+T = TypeVar('T')
+
+class ResponseModel(BaseModel, Generic[T]):
+    """通用响应模型"""
+    code: int = 200
+    message: str = "success"
+    data: Optional[T] = None
+    pagination: Optional[Dict[str, Any]] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,60 @@
+# app/order/routers.py
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db, get_primary_db
+from app.dependencies import get_current_user_with_id, TokenData
+from app.order.expiry import OrderExpiryQueue, get_order_expiry
+from app.order.response import ResponseModel
+from app.order.schemas import OrderCreate, OrderResponse, OrderItemResponse, VisitorResponse
+from app.order.services import OrderError, create_order_async, get_order_async
+from app.tickets.inventory import TicketInventory, get_ticket_inventory
+from app.utils.logger import get_logger
+
+logger = get_logger("app.routers.orders")
+
+router = APIRouter(
+    prefix="/api/order",
+    tags=["orders"],
+    responses={404: {"description": "Not found"}},
+)
+
+def order_response(order, items, visitors) -> OrderResponse:
+    """组装订单响应"""
+    response = OrderResponse.model_validate(order)
+    response.items = [OrderItemResponse.model_validate(item) for item in items]
+    response.visitors = [VisitorResponse.model_validate(visitor) for visitor in visitors]
+    return response
+
+@router.post("/create/", response_model=ResponseModel[OrderResponse])
+async def create_order(
+    order_data: OrderCreate,
+    # 用户校验在打开会话、预占库存之前
+    current_user: TokenData = Depends(get_current_user_with_id),
+    db: AsyncSession = Depends(get_primary_db),
+    inventory: TicketInventory = Depends(get_ticket_inventory),
+    expiry: OrderExpiryQueue = Depends(get_order_expiry),
+):
+    """下单并扣减门票余量"""
+    # 门票余量变化不主动失效缓存：门票缓存时间很短，抢购时逐单失效的开销远大于短暂的余量陈旧
+    try:
+        order, items, visitors = await create_order_async(
+            db, current_user.user_id, order_data, inventory, expiry
+        )
+    except OrderError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Error creating order for user {current_user.user_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"下单失败: {str(e)}")
+    return ResponseModel(code=200, message="下单成功", data=order_response(order, items, visitors))
+
+@router.get("/detail/{order_id}/", response_model=ResponseModel[OrderResponse])
+async def get_order_detail(
+    order_id: int,
+    current_user: TokenData = Depends(get_current_user_with_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """获取自己的订单详情"""
+    order, items, visitors = await get_order_async(db, order_id, current_user.user_id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return ResponseModel(data=order_response(order, items, visitors))
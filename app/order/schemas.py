@@ -0,0 +1,62 @@
+# app/order/schemas.py
+
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import date, datetime
+
+class OrderItemCreate(BaseModel):
+    ticket_id: int
+    quantity: int = Field(..., ge=1, le=100)
+    visit_date: date
+
+class VisitorCreate(BaseModel):
+    name: str = Field(..., max_length=32)
+    id_card: str = Field(..., max_length=18)
+    phone: str = Field(..., max_length=11)
+
+class OrderCreate(BaseModel):
+    items: List[OrderItemCreate] = Field(..., min_length=1)
+    visitors: List[VisitorCreate] = []
+    contact_name: str = Field(..., max_length=32)
+    contact_phone: str = Field(..., max_length=11)
+    remark: Optional[str] = Field(None, max_length=256)
+
+class OrderItemResponse(BaseModel):
+    id: int
+    ticket_id: int
+    ticket_name: str
+    price: int
+    quantity: int
+    amount: int
+    visit_date: date
+
+    model_config = {
+        "from_attributes": True,
+    }
+
+class VisitorResponse(BaseModel):
+    id: int
+    name: str
+    id_card: str
+    phone: str
+
+    model_config = {
+        "from_attributes": True,
+    }
+
+class OrderResponse(BaseModel):
+    id: int
+    order_number: str
+    user_id: int
+    total_amount: float
+    status: int
+    contact_name: str
+    contact_phone: str
+    remark: Optional[str] = None
+    created_at: datetime
+    items: List[OrderItemResponse] = []
+    visitors: List[VisitorResponse] = []
+
+    model_config = {
+        "from_attributes": True,
+    }
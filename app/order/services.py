@@ -0,0 +1,227 @@
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.order.expiry import OrderExpiryQueue
+from app.order.models import Order, OrderItem, Visitor
+from app.order.schemas import OrderCreate
+from app.tickets.inventory import TicketInventory
+from app.tickets.models import Ticket
+from app.utils.logger import get_logger
+
+logger = get_logger("app.order")
+
+# 订单编号冲突(唯一索引)时的最大重试次数
+MAX_ORDER_NUMBER_RETRIES = 3
+
+# 订单项与游客用Core executemany一次写入：驱动将其改写为一条多行INSERT，
+# 不像ORM在MySQL上(无RETURNING)那样为取回自增ID逐行INSERT；写入后按订单ID一次读回
+_INSERT_ORDER_ITEMS = insert(OrderItem.__table__)
+_INSERT_VISITORS = insert(Visitor.__table__)
+_ORDER_ITEMS = select(OrderItem).where(OrderItem.order_id == bindparam("order_id")).order_by(OrderItem.id)
+_VISITORS = select(Visitor).where(Visitor.order_id == bindparam("order_id")).order_by(Visitor.id)
+
+
+class OrderError(Exception):
+    """下单失败，message可直接返回给客户端"""
+
+    status_code = 400
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+
+class TicketUnavailableError(OrderError):
+    """门票不存在或已下架"""
+
+    status_code = 404
+
+
+class InsufficientStockError(OrderError):
+    """门票余量不足"""
+
+    status_code = 409
+
+    def __init__(self, ticket_id: int):
+        super().__init__(f"门票{ticket_id}余量不足")
+        self.ticket_id = ticket_id
+
+
+def _merge_quantities(order_data: OrderCreate) -> Dict[int, int]:
+    """按门票合并购买数量"""
+    quantities: Dict[int, int] = {}
+    for item in order_data.items:
+        quantities[item.ticket_id] = quantities.get(item.ticket_id, 0) + item.quantity
+    return quantities
+
+
+async def _load_tickets(db: AsyncSession, ticket_ids) -> Dict[int, Tuple[str, int]]:
+    """
+    读取门票名称与成交单价(不加锁)，余量以扣减时的条件更新为准。
+    返回普通值而非ORM对象，重试前的回滚不会使其过期
+    """
+    result = await db.execute(
+        select(Ticket.id, Ticket.name, Ticket.price, Ticket.discount, Ticket.is_valid)
+        .where(Ticket.id.in_(list(ticket_ids)))
+    )
+    rows = {row.id: row for row in result.all()}
+    tickets = {}
+    for ticket_id in ticket_ids:
+        row = rows.get(ticket_id)
+        if row is None or not row.is_valid:
+            raise TicketUnavailableError(f"门票{ticket_id}不存在或已下架")
+        # 订单项价格列为整数(元)
+        tickets[ticket_id] = (row.name, round(row.price * (row.discount or 1)))
+    return tickets
+
+
+async def _decrement_remain(db: AsyncSession, quantities: Dict[int, int]):
+    """
+    条件更新扣减余量：余量不足时WHERE不成立、影响行数为0，不存在先读后写的竞争。
+    按门票ID顺序更新，多张门票的订单之间不会互相死锁
+    """
+    for ticket_id in sorted(quantities):
+        quantity = quantities[ticket_id]
+        result = await db.execute(
+            update(Ticket)
+            .where(Ticket.id == ticket_id, Ticket.remain >= quantity)
+            .values(remain=Ticket.remain - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            raise InsufficientStockError(ticket_id)
+
+
+async def _place_order(
+    db: AsyncSession,
+    user_id: int,
+    order_data: OrderCreate,
+    tickets: Dict[int, Tuple[str, int]],
+    quantities: Dict[int, int],
+    decrement: bool = True,
+) -> Tuple[Order, List[OrderItem], List[Visitor]]:
+    """
+    写入订单、订单项与游客。往返次数与订单项、游客数量无关：
+    订单一条INSERT，订单项、游客各一条多行INSERT与一条读回SELECT
+    """
+    now = datetime.now()
+    item_rows = []
+    for item in order_data.items:
+        name, price = tickets[item.ticket_id]
+        item_rows.append({
+            "ticket_id": item.ticket_id,
+            "ticket_name": name,
+            "price": price,
+            "quantity": item.quantity,
+            "amount": price * item.quantity,
+            "visit_date": item.visit_date,
+            "created_at": now,
+        })
+    order = Order(
+        order_number=Order.generate_order_number(),
+        user_id=user_id,
+        total_amount=float(sum(row["amount"] for row in item_rows)),
+        status=Order.STATUS_PENDING,
+        contact_name=order_data.contact_name,
+        contact_phone=order_data.contact_phone,
+        remark=order_data.remark,
+        created_at=now,
+    )
+    db.add(order)
+    await db.flush()
+    for row in item_rows:
+        row["order_id"] = order.id
+    await db.execute(_INSERT_ORDER_ITEMS, item_rows)
+    if order_data.visitors:
+        await db.execute(_INSERT_VISITORS, [
+            {
+                "order_id": order.id,
+                "name": visitor.name,
+                "id_card": visitor.id_card,
+                "phone": visitor.phone,
+                "created_at": now,
+            }
+            for visitor in order_data.visitors
+        ])
+    params = {"order_id": order.id}
+    items = list((await db.execute(_ORDER_ITEMS, params)).scalars().all())
+    visitors = list((await db.execute(_VISITORS, params)).scalars().all()) if order_data.visitors else []
+    # 扣减放在事务最后，门票行锁只持有到随即的提交为止
+    if decrement:
+        await _decrement_remain(db, quantities)
+    await db.commit()
+    return order, items, visitors
+
+
+async def create_order_async(
+    db: AsyncSession,
+    user_id: int,
+    order_data: OrderCreate,
+    inventory: TicketInventory = None,
+    expiry: OrderExpiryQueue = None,
+) -> Tuple[Order, List[OrderItem], List[Visitor]]:
+    """
+    下单：在同一事务中写入订单、订单项与游客，并以条件更新扣减门票余量，
+    余量不足或任一步失败时整个事务回滚。返回(订单, 订单项, 游客)。
+    传入Redis库存时先在Redis中预占库存，事务内不再扣减sight_ticket.remain(由库存回写任务按订单项重新计算)，
+    提交后确认预占，下单失败时归还。提交后订单加入超时取消队列
+    """
+    quantities = _merge_quantities(order_data)
+    tickets = await _load_tickets(db, quantities)
+    hold_id = None
+    if inventory is not None:
+        hold_id = uuid.uuid4().hex
+        short_ticket_id = await inventory.reserve(hold_id, quantities)
+        if short_ticket_id is not None:
+            raise InsufficientStockError(short_ticket_id)
+    try:
+        for attempt in range(1, MAX_ORDER_NUMBER_RETRIES + 1):
+            try:
+                order, items, visitors = await _place_order(
+                    db, user_id, order_data, tickets, quantities, decrement=inventory is None
+                )
+                break
+            except IntegrityError as e:
+                await db.rollback()
+                if attempt == MAX_ORDER_NUMBER_RETRIES:
+                    raise
+                logger.warning(f"Order insert conflict, retrying ({attempt}): {str(e)}")
+            except Exception:
+                await db.rollback()
+                raise
+    except Exception:
+        if hold_id is not None:
+            await inventory.release(hold_id, quantities)
+        raise
+    if hold_id is not None:
+        try:
+            await inventory.confirm(hold_id, quantities)
+        except Exception as e:
+            # 订单已提交，确认失败不影响下单结果：预占到期后被丢弃，库存按数据库中的订单项重新计算
+            logger.error(f"Error confirming stock hold {hold_id}: {str(e)}")
+    if expiry is not None:
+        await expiry.schedule(order)
+    return order, items, visitors
+
+
+async def get_order_async(
+    db: AsyncSession, order_id: int, user_id: int
+) -> Tuple[Optional[Order], List[OrderItem], List[Visitor]]:
+    """
+    获取用户自己的订单及其订单项与游客，订单不存在时订单为None
+    """
+    order = (await db.execute(
+        select(Order).where(Order.id == order_id, Order.user_id == user_id)
+    )).scalar_one_or_none()
+    if order is None:
+        return None, [], []
+    params = {"order_id": order_id}
+    items = (await db.execute(_ORDER_ITEMS, params)).scalars().all()
+    visitors = (await db.execute(_VISITORS, params)).scalars().all()
+    return order, list(items), list(visitors)
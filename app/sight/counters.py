@@ -0,0 +1,151 @@
+# app/sight/counters.py
+"""
+景点计数器
+
+在Redis哈希中维护景点总数以及热门、精选、有效景点数，由创建/更新/删除服务增量更新，
+分页元数据读取计数为O(1)，不再每页执行COUNT(*)。后台定期与数据库对账修正偏差。
+"""
+import asyncio
+from typing import Dict, Optional
+
+import aioredis
+
+from fastapi import Request
+from sqlalchemy import func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.sight.models import Sight
+from app.utils.logger import get_logger
+
+logger = get_logger("app.sight.counters")
+
+SIGHT_COUNTERS_KEY = "sight:counters"
+# 计数字段与对应的景点标记列
+FLAG_FIELDS = {"hot": "is_hot", "top": "is_top", "valid": "is_valid"}
+FIELDS = ("total",) + tuple(FLAG_FIELDS)
+
+# 计数哈希存在时才增量更新。哈希丢失(Redis被清空或重启)后HINCRBY会重建出只有部分字段、
+# 从0开始的哈希，get()只在字段缺失时重建，部分字段齐全时会一直返回错误的计数；
+# 不存在时跳过，由下次get()或对账从数据库整体重建
+# KEYS[1]: 计数哈希；ARGV: 字段, 增量, 字段, 增量...
+INCR_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 1, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+return 1
+"""
+
+
+def sight_flags(sight) -> Dict[str, bool]:
+    """景点当前的计数相关标记"""
+    return {field: bool(getattr(sight, column)) for field, column in FLAG_FIELDS.items()}
+
+
+class SightCounters:
+    """景点计数器，保存在app.state.sight_counters上"""
+
+    def __init__(self, redis, session_factory, reconcile_interval: float = 600):
+        self.redis = redis
+        self.session_factory = session_factory
+        self.reconcile_interval = reconcile_interval
+        self._incr_script = redis.register_script(INCR_SCRIPT)
+        self._task: Optional[asyncio.Task] = None
+
+    async def count_from_db(self, db: AsyncSession) -> Dict[str, int]:
+        """一次查询统计所有计数"""
+        query = select(
+            func.count(),
+            *(func.coalesce(func.sum(case((getattr(Sight, column) == True, 1), else_=0)), 0)
+              for column in FLAG_FIELDS.values()),
+        ).select_from(Sight)
+        row = (await db.execute(query)).one()
+        return dict(zip(FIELDS, (int(value) for value in row)))
+
+    async def reconcile(self, db: AsyncSession = None) -> Dict[str, int]:
+        """以数据库为准重置计数"""
+        if db is None:
+            async with self.session_factory() as session:
+                counts = await self.count_from_db(session)
+        else:
+            counts = await self.count_from_db(db)
+        await self.redis.hset(SIGHT_COUNTERS_KEY, mapping=counts)
+        return counts
+
+    async def get(self, db: AsyncSession = None) -> Dict[str, int]:
+        """读取所有计数，计数不存在(如Redis被清空)时从数据库重建"""
+        try:
+            values = await self.redis.hmget(SIGHT_COUNTERS_KEY, *FIELDS)
+            if any(value is None for value in values):
+                return await self.reconcile(db)
+        except aioredis.RedisError as e:
+            # Redis不可用时退回数据库统计
+            logger.error(f"Sight counters unavailable: {str(e)}")
+            if db is None:
+                async with self.session_factory() as session:
+                    return await self.count_from_db(session)
+            return await self.count_from_db(db)
+        return dict(zip(FIELDS, (int(value) for value in values)))
+
+    async def total(self, db: AsyncSession = None) -> int:
+        """景点总数"""
+        return (await self.get(db))["total"]
+
+    async def _incr(self, deltas: Dict[str, int]):
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        try:
+            await self._incr_script(
+                keys=[SIGHT_COUNTERS_KEY],
+                args=[value for item in deltas.items() for value in item],
+            )
+        except Exception as e:
+            # 数据库已提交，计数偏差由定期对账修正，不影响写操作
+            logger.error(f"Error updating sight counters: {str(e)}")
+
+    async def on_create(self, sight):
+        """新增景点后调用"""
+        flags = sight_flags(sight)
+        await self._incr({"total": 1, **{field: int(value) for field, value in flags.items()}})
+
+    async def on_delete(self, flags: Dict[str, bool]):
+        """删除景点后调用，flags为删除前的标记"""
+        await self._incr({"total": -1, **{field: -int(value) for field, value in flags.items()}})
+
+    async def on_update(self, before: Dict[str, bool], sight):
+        """更新景点后调用，只有is_hot/is_top/is_valid发生变化时才会修改计数"""
+        after = sight_flags(sight)
+        await self._incr({field: int(after[field]) - int(before[field]) for field in FLAG_FIELDS})
+
+    async def _run(self):
+        while True:
+            try:
+                counts = await self.reconcile()
+                logger.info(f"Reconciled sight counters: {counts}")
+            except Exception as e:
+                logger.error(f"Error reconciling sight counters: {str(e)}")
+            await asyncio.sleep(self.reconcile_interval)
+
+    def start(self):
+        """启动定期对账任务"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止定期对账任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+async def get_sight_counters(request: Request) -> SightCounters:
+    """获取景点计数器(依赖注入)"""
+    return request.app.state.sight_counters
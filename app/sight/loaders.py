@@ -0,0 +1,74 @@
+# app/sight/loaders.py
+"""
+景点关联数据的批量加载器
+
+并发的详情、门票请求在同一事件循环轮次内按sight_id合并为一次IN查询，
+批量查询使用独立的数据库会话，加载到的对象与请求会话无关，可安全地在多个请求间共享。
+"""
+import asyncio
+from typing import List, Optional
+
+from fastapi import Request
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.database import is_primary_sticky
+from app.sight.models import Sight, SightProfile
+from app.sight.services import get_profiles_by_sight_ids_async
+from app.tickets.models import Ticket
+from app.tickets.services import get_tickets_by_sight_ids_async
+from app.utils.dataloader import BatchLoader, RequestLoader
+
+
+class SightBatchers:
+    """跨请求共享的批量加载器，保存在app.state.sight_batchers上"""
+
+    def __init__(self, session_factory, max_batch_size: int = 500):
+        self.session_factory = session_factory
+        self.profiles = BatchLoader(self._load_profiles, max_batch_size)
+        self.tickets = BatchLoader(self._load_tickets, max_batch_size)
+
+    async def _load_profiles(self, sight_ids):
+        async with self.session_factory() as db:
+            return await get_profiles_by_sight_ids_async(db, sight_ids)
+
+    async def _load_tickets(self, sight_ids):
+        async with self.session_factory() as db:
+            return await get_tickets_by_sight_ids_async(db, sight_ids)
+
+    def stats(self) -> dict:
+        return {"profiles": self.profiles.stats(), "tickets": self.tickets.stats()}
+
+
+class SightLoaders:
+    """单个请求内使用的加载器，同一请求内重复加载直接返回记忆的结果"""
+
+    def __init__(self, batchers: SightBatchers, primary_batchers: SightBatchers = None):
+        self.profiles = RequestLoader(batchers.profiles)
+        self.tickets = RequestLoader(batchers.tickets)
+        self.primary_batchers = primary_batchers
+
+    def use_primary(self):
+        """改为从主库加载(缓存回源时标签刚被失效)，须在首次加载前调用"""
+        if self.primary_batchers is not None:
+            self.profiles = RequestLoader(self.primary_batchers.profiles)
+            self.tickets = RequestLoader(self.primary_batchers.tickets)
+
+    async def profile(self, sight_id: int) -> Optional[SightProfile]:
+        return await self.profiles.load(sight_id)
+
+    async def tickets_of(self, sight_id: int) -> List[Ticket]:
+        return await self.tickets.load(sight_id) or []
+
+    async def attach(self, sight: Sight) -> Sight:
+        """为景点填充详情与门票关系，不会被会话视为修改"""
+        profile, tickets = await asyncio.gather(self.profile(sight.id), self.tickets_of(sight.id))
+        set_committed_value(sight, "profile", profile)
+        set_committed_value(sight, "tickets", tickets)
+        return sight
+
+
+async def get_sight_loaders(request: Request) -> SightLoaders:
+    """获取请求内的景点加载器(依赖注入，同一请求内共用一个实例)，最近写过数据的客户端从主库加载"""
+    if is_primary_sticky(request):
+        return SightLoaders(request.app.state.primary_sight_batchers)
+    return SightLoaders(request.app.state.sight_batchers, request.app.state.primary_sight_batchers)
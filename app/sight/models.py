@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, Text, DateTime, ForeignKey, BigInteger
+from sqlalchemy import Column, Integer, String, Float, Boolean, Text, DateTime, ForeignKey, BigInteger, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -7,6 +7,18 @@ from app.database import Base
 class Sight(Base):
     """景点基础信息表"""
     __tablename__ = "sight"
+    __table_args__ = (
+        # 搜索用全文索引(ngram分词，支持中文)
+        Index(
+            "ft_sight_search", "name", "province", "city", "area",
+            mysql_prefix="FULLTEXT", mysql_with_parser="ngram",
+        ),
+        # 热门、精选列表按标记过滤并按ID分页
+        Index("ix_sight_is_hot_id", "is_hot", "id"),
+        Index("ix_sight_is_top_id", "is_top", "id"),
+        # 有效景点按评分排序
+        Index("ix_sight_is_valid_score", "is_valid", "score"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(64), nullable=False)  # 景点名称
@@ -1,34 +1,51 @@
 # app/routes/sights.py
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_async_db, get_redis
+from app.database import get_async_db, get_primary_db
 from app.sight.models import Sight
-from app.sight.schemas import SightResponse, SightListResponse
+from app.sight.schemas import SightResponse, SightListItem, SightListResponse
 from app.sight.response import ResponseModel
 from app.sight.services import (
-    get_sight_by_id_async,
+    get_sight_base_async,
     get_sight_async,
-    count_sights_async,
+    get_sight_after_async,
     get_hot_sights_async,
     get_fine_sights_async,
     search_sights_async,
+    search_sights_after_async,
     count_search_sights_async,
+    normalize_keyword,
 )
-from typing import List
+from typing import List, Optional
 import math
-import json
-from datetime import datetime
 from app.utils.logger import get_logger, log_execution_time
+from app.utils.pagination import encode_cursor, decode_cursor
 from app.sight.schemas import SightCreate, SightUpdate
 from app.sight.services import create_sight_async, update_sight_async, delete_sight_async
 from app.dependencies import get_current_user, get_sight_admin, TokenData
-
-# 自定义JSON编码器，处理datetime对象
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
+from app.cache.manager import CacheManager, get_cache
+from app.sight.counters import SightCounters, get_sight_counters
+from app.sight.loaders import SightLoaders, get_sight_loaders
+from app.config import NEGATIVE_CACHE_TTL, SEARCH_COUNT_CACHE_TTL
+from app.cache.decorator import cached
+from app.cache.keys import (
+    SIGHT_DETAIL_TAG,
+    SIGHT_LIST_TAG,
+    SIGHT_SEARCH_TAG,
+    SIGHT_HOT_TAG,
+    SIGHT_FINE_TAG,
+    SIGHT_COLLECTION_TAGS,
+    SIGHT_HOT_KEY,
+    SIGHT_FINE_KEY,
+    TICKET_TAGS,
+    sight_tag,
+    sight_detail_key,
+    sight_list_key,
+    sight_list_cursor_key,
+    sight_search_key,
+    sight_search_cursor_key,
+    sight_search_count_key,
+)
 
 logger = get_logger("app.routers.sights")
 
@@ -38,100 +55,94 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-async def get_Info_from_redis(redis, cache_key):
-    """从Redis获取信息"""
-    cached = await redis.get(cache_key)
-    if cached:
+def validate_sights(sights, label: str = "sight") -> List[SightListItem]:
+    """逐个校验列表中的景点数据(只含卡片字段)，校验失败的记录日志后跳过"""
+    sights_data = []
+    for sight in sights:
         try:
-            # 尝试解析缓存的JSON数据
-            cached_data = json.loads(cached)
-            logger.info(f"Successfully retrieved data from Redis cache: {cache_key}")
-            return ResponseModel(code=200, data=cached_data)
+            sights_data.append(SightListItem.model_validate(sight))
         except Exception as e:
-            # 使用logger而不是print，记录更详细的错误信息
-            logger.error(f"Error parsing cached data for key {cache_key}: {str(e)}")
-            # 删除可能损坏的缓存
-            await redis.delete(cache_key)
-            logger.info(f"Deleted potentially corrupted cache for key: {cache_key}")
-            return None
-    logger.info(f"No cache found for key: {cache_key}")
-    return None
+            # 记录具体的验证错误，但继续处理其他景点
+            logger.error(f"Error validating {label} {sight.id}: {str(e)}")
+    return sights_data
+
+def parse_cursor(cursor: Optional[str]) -> int:
+    """解析游标，返回上一页最后一个景点的ID，空游标表示第一页"""
+    if not cursor:
+        return 0
+    try:
+        return int(decode_cursor(cursor)["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def cursor_page(sights, page_size: int, label: str = "sight") -> dict:
+    """组装游标分页结果，sights需多查询一条用于判断是否还有下一页"""
+    has_more = len(sights) > page_size
+    sights = sights[:page_size]
+    pagination = {
+        "page_size": page_size,
+        "has_more": has_more,
+        "next_cursor": encode_cursor({"id": sights[-1].id}) if has_more else None,
+    }
+    return {
+        "data": validate_sights(sights, label),
+        "pagination": pagination,
+    }
 
 @router.get("/detail/{sight_id}/",response_model=ResponseModel)
 @log_execution_time()
+@cached(
+    key=lambda sight_id, **_: sight_detail_key(sight_id),
+    tags=lambda sight_id, **_: (SIGHT_DETAIL_TAG, sight_tag(sight_id)),
+    negative_ttl=NEGATIVE_CACHE_TTL,
+)
 async def get_sight_detail(
     sight_id : int,
     db:AsyncSession = Depends(get_async_db),
-    redis=Depends(get_redis),
+    loaders:SightLoaders = Depends(get_sight_loaders),
 ):
     """获取景点详情信息"""
-    cache_key = f"sight:detail:{sight_id}"
-    cached_response = await get_Info_from_redis(redis, cache_key)
-    if cached_response:
-        return cached_response
-
     try:
-        sight = await get_sight_by_id_async(db,sight_id=sight_id)
+        sight = await get_sight_base_async(db,sight_id=sight_id)
         if not sight:
             raise HTTPException(status_code=404,detail="Sight not found")
-
-        try:
-            sight_data = SightResponse.model_validate(sight)
-
-            # 只有在成功处理数据后才缓存
-            try:
-                # 将Pydantic模型转换为字典，然后序列化为JSON字符串，使用自定义编码器处理datetime
-                json_str = json.dumps(
-                    sight_data.model_dump(),
-                    cls=DateTimeEncoder
-                )
-                await redis.set(
-                    cache_key,
-                    json_str,
-                    ex=3600,
-                )
-                logger.info(f"Successfully cached sight detail for ID {sight_id}")
-            except Exception as e:
-                logger.error(f"Error caching sight detail {sight_id}: {str(e)}")
-
-            return ResponseModel(code=200,data=sight_data)
-        except Exception as e:
-            logger.error(f"Error processing sight detail {sight_id}: {str(e)}")
-            raise HTTPException(status_code=500,detail=f"Error processing sight data: {str(e)}")
-
+        # 详情与门票由批量加载器加载，并发请求合并为一次IN查询
+        await loaders.attach(sight)
+        return SightResponse.model_validate(sight)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error in get_sight_detail: {str(e)}")
         raise HTTPException(status_code=500,detail=str(e))
 
 
 @router.get("/list/",response_model=ResponseModel)
+@cached(
+    key=lambda page, page_size, cursor, **_: (
+        sight_list_key(page, page_size) if cursor is None else sight_list_cursor_key(cursor, page_size)
+    ),
+    tags=(SIGHT_LIST_TAG,),
+    negative_ttl=NEGATIVE_CACHE_TTL,
+)
 async def get_sight_list(
     page:int = Query(1,ge=1),
     page_size:int = Query(6,ge=1,le=100),
+    cursor:Optional[str] = Query(None,description="游标分页：传空字符串获取第一页，之后传上一页返回的next_cursor"),
     db:AsyncSession = Depends(get_async_db),
-    redis=Depends(get_redis),
+    counters:SightCounters = Depends(get_sight_counters),
 ):
-    cache_key = f"sight:list:{page}:{page_size}"
-    cached_response = await get_Info_from_redis(redis, cache_key)
-    if cached_response:
-        return cached_response
-
     try:
+        if cursor is not None:
+            # 游标分页：按ID定位，不统计总数
+            sights = await get_sight_after_async(db,after_id=parse_cursor(cursor),limit=page_size + 1)
+            return cursor_page(sights, page_size)
+
         skip = (page - 1) * page_size
         sights = await get_sight_async(db,skip=skip,limit=page_size)
-        total = await count_sights_async(db)
+        # 总数读取维护的计数器，不再每页执行COUNT(*)
+        total = await counters.total(db)
         total_pages = math.ceil(total / page_size)
-
-        # 更详细的错误处理
-        sights_data = []
-        for sight in sights:
-            try:
-                sight_data = SightResponse.model_validate(sight)
-                sights_data.append(sight_data)
-            except Exception as e:
-                # 记录具体的验证错误，但继续处理其他景点
-                logger.error(f"Error validating sight {sight.id}: {str(e)}")
-                continue
+        sights_data = validate_sights(sights)
 
         pagination = {
             "total": total,
@@ -139,157 +150,99 @@ async def get_sight_list(
             "current_page": page,
             "total_pages": total_pages,
         }
-        response_data = {
+        logger.info(f"Loaded sight list data, page: {page}, count: {len(sights_data)}")
+        return {
             "data": sights_data,
             "pagination": pagination,
         }
-
-        # 只有在成功处理所有数据后才缓存
-        if sights_data:
-            try:
-                # 将Pydantic模型转换为字典，然后序列化为JSON字符串，使用自定义编码器处理datetime
-                response_data = {
-                    "data": [sight.model_dump() for sight in sights_data],
-                    "pagination": pagination
-                }
-                json_str = json.dumps(
-                    response_data,
-                    cls=DateTimeEncoder
-                )
-                await redis.set(
-                    cache_key,
-                    json_str,
-                    ex=3600,
-                )
-                logger.info(f"Successfully cached sight list data, page: {page}, count: {len(sights_data)}")
-            except Exception as e:
-                logger.error(f"Error caching data: {str(e)}")
-
-        return ResponseModel(code=200,data=response_data)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error in get_sight_list: {str(e)}")
         raise HTTPException(status_code=500,detail=str(e))
 
 @router.get("/hot/list/",response_model=ResponseModel)
+@cached(
+    key=lambda **_: SIGHT_HOT_KEY,
+    tags=(SIGHT_HOT_TAG,),
+    negative_ttl=NEGATIVE_CACHE_TTL,
+)
 async def get_hot_sight_list(
     db:AsyncSession = Depends(get_async_db),
-    redis=Depends(get_redis),
 ):
-    cache_key = "sight:hot:list"
-    cached_response = await get_Info_from_redis(redis, cache_key)
-    if cached_response:
-        return cached_response
-
     try:
         hot_sights = await get_hot_sights_async(db)
-
-        # 更详细的错误处理
-        hot_sights_data = []
-        for sight in hot_sights:
-            try:
-                sight_data = SightResponse.model_validate(sight)
-                hot_sights_data.append(sight_data)
-            except Exception as e:
-                # 记录具体的验证错误，但继续处理其他景点
-                logger.error(f"Error validating hot sight {sight.id}: {str(e)}")
-                continue
-
-        # 只有在成功处理所有数据后才缓存
-        if hot_sights_data:
-            try:
-                # 将Pydantic模型转换为JSON字符串，使用自定义编码器处理datetime
-                json_str = json.dumps(
-                    [sight.model_dump() for sight in hot_sights_data],
-                    cls=DateTimeEncoder
-                )
-                await redis.set(
-                    cache_key,
-                    json_str,
-                    ex=3600,
-                )
-                logger.info(f"Successfully cached hot sights data, count: {len(hot_sights_data)}")
-            except Exception as e:
-                logger.error(f"Error caching hot sights data: {str(e)}")
-
-        return ResponseModel(code=200,data=hot_sights_data)
+        hot_sights_data = validate_sights(hot_sights, "hot sight")
+        logger.info(f"Loaded hot sights data, count: {len(hot_sights_data)}")
+        return hot_sights_data
     except Exception as e:
         logger.error(f"Unexpected error in get_hot_sight_list: {str(e)}")
         raise HTTPException(status_code=500,detail=str(e))
 
 
 @router.get("/fine/list/",response_model=ResponseModel)
+@cached(
+    key=lambda **_: SIGHT_FINE_KEY,
+    tags=(SIGHT_FINE_TAG,),
+    negative_ttl=NEGATIVE_CACHE_TTL,
+)
 async def get_fine_sight_list(
     db:AsyncSession = Depends(get_async_db),
-    redis=Depends(get_redis)
 ):
-    cache_key = "sight:fine:list"
-    cached_response = await get_Info_from_redis(redis, cache_key)
-    if cached_response:
-        return cached_response
-
     try:
         fine_sights = await get_fine_sights_async(db)
-
-        # 更详细的错误处理
-        fine_sights_data = []
-        for sight in fine_sights:
-            try:
-                sight_data = SightResponse.model_validate(sight)
-                fine_sights_data.append(sight_data)
-            except Exception as e:
-                logger.error(f"Error validating fine sight {sight.id}: {str(e)}")
-                continue
-        if fine_sights_data:
-            try:
-                # 将Pydantic模型转换为JSON字符串，使用自定义编码器处理datetime
-                json_str = json.dumps(
-                    [sight.model_dump() for sight in fine_sights_data],
-                    cls=DateTimeEncoder
-                )
-                await redis.set(
-                    cache_key,
-                    json_str,
-                    ex=3600,
-                )
-                logger.info(f"Successfully cached fine sights data, count: {len(fine_sights_data)}")
-            except Exception as e:
-                logger.error(f"Error caching fine sights data: {str(e)}")
-
-        return ResponseModel(code=200,data=fine_sights_data)
+        fine_sights_data = validate_sights(fine_sights, "fine sight")
+        logger.info(f"Loaded fine sights data, count: {len(fine_sights_data)}")
+        return fine_sights_data
     except Exception as e:
         logger.error(f"Unexpected error in get_fine_sight_list: {str(e)}")
         raise HTTPException(status_code=500,detail=str(e))
 
+async def count_search_sights_cached(cache: CacheManager, db: AsyncSession, keyword: str) -> int:
+    """搜索结果总数，按规范化后的关键词缓存，所有分页共用一次COUNT"""
+    async def load():
+        total = await count_search_sights_async(db,keyword=keyword)
+        body = str(total).encode("utf-8")
+        return body, body, (SEARCH_COUNT_CACHE_TTL if total else NEGATIVE_CACHE_TTL)
+
+    total = await cache.get_or_load(
+        sight_search_count_key(keyword), load, ex=SEARCH_COUNT_CACHE_TTL, tags=(SIGHT_SEARCH_TAG,)
+    )
+    return int(total)
+
 @router.get("/search/",response_model=ResponseModel)
+@cached(
+    key=lambda keyword, page, page_size, cursor, **_: (
+        sight_search_key(normalize_keyword(keyword), page, page_size) if cursor is None
+        else sight_search_cursor_key(normalize_keyword(keyword), cursor, page_size)
+    ),
+    tags=(SIGHT_SEARCH_TAG,),
+    negative_ttl=NEGATIVE_CACHE_TTL,
+)
 async def search_sights(
     keyword:str = Query(...,min_length=1),
     page:int = Query(1,ge=1),
     page_size:int = Query(4,ge=1,le=100),
+    cursor:Optional[str] = Query(None,description="游标分页：传空字符串获取第一页，之后传上一页返回的next_cursor"),
     db:AsyncSession = Depends(get_async_db),
-    redis=Depends(get_redis),
+    cache: CacheManager = Depends(get_cache),
 ):
     """搜索景点"""
-    cache_key = f"sight:search:{keyword}:{page}:{page_size}"
-    cached_response = await get_Info_from_redis(redis, cache_key)
-    if cached_response:
-        return cached_response
-
     try:
+        # 规范化关键词，" 西湖"、全角或大小写不同的写法共用同一份缓存
+        keyword = normalize_keyword(keyword)
+        if cursor is not None:
+            sights = await search_sights_after_async(
+                db,keyword=keyword,after_id=parse_cursor(cursor),limit=page_size + 1
+            ) if keyword else []
+            return cursor_page(sights, page_size, "search sight")
+
         skip = (page - 1) * page_size
-        sights = await search_sights_async(db,keyword=keyword,skip=skip,limit=page_size)
-        total = await count_search_sights_async(db,keyword=keyword)
+        total = await count_search_sights_cached(cache, db, keyword) if keyword else 0
+        # 超出结果范围的分页无需再查询
+        sights = await search_sights_async(db,keyword=keyword,skip=skip,limit=page_size) if skip < total else []
         total_pages = math.ceil(total / page_size)
-
-        # 更详细的错误处理
-        sights_data = []
-        for sight in sights:
-            try:
-                sight_data = SightResponse.model_validate(sight)
-                sights_data.append(sight_data)
-            except Exception as e:
-                # 记录具体的验证错误，但继续处理其他景点
-                logger.error(f"Error validating search sight {sight.id}: {str(e)}")
-                continue
+        sights_data = validate_sights(sights, "search sight")
 
         pagination = {
             "total": total,
@@ -297,34 +250,13 @@ async def search_sights(
             "current_page": page,
             "total_pages": total_pages,
         }
-
-        # 只有在成功处理所有数据后才缓存
-        if sights_data:
-            try:
-                # 将Pydantic模型转换为JSON字符串，使用自定义编码器处理datetime
-                response_data = {
-                    "data": [sight.model_dump() for sight in sights_data],
-                    "pagination": pagination
-                }
-                json_str = json.dumps(
-                    response_data,
-                    cls=DateTimeEncoder
-                )
-                await redis.set(
-                    cache_key,
-                    json_str,
-                    ex=3600,
-                )
-                logger.info(f"Successfully cached search data for keyword '{keyword}', count: {len(sights_data)}")
-            except Exception as e:
-                logger.error(f"Error caching search data: {str(e)}")
-
-        response_data = {
+        logger.info(f"Loaded search data for keyword '{keyword}', count: {len(sights_data)}")
+        return {
             "data": sights_data,
             "pagination": pagination,
         }
-        return ResponseModel(code=200,data=response_data)
-
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error in search_sights: {str(e)}")
         raise HTTPException(status_code=500,detail=str(e))
@@ -333,17 +265,18 @@ async def search_sights(
 @router.post("/create/", response_model=ResponseModel)
 async def create_sight(
     sight_data: SightCreate,
-    db: AsyncSession = Depends(get_async_db),
+    db: AsyncSession = Depends(get_primary_db),
+    cache: CacheManager = Depends(get_cache),
+    counters: SightCounters = Depends(get_sight_counters),
     current_user: TokenData = Depends(get_sight_admin)
 ):
 
     try:
-        new_sight = await create_sight_async(db, sight_data)
+        new_sight = await create_sight_async(db, sight_data, counters)
         sight_response = SightResponse.model_validate(new_sight)
 
-        # 清除相关缓存
-        redis = await get_redis()
-        await redis.delete("sight:list:*")
+        # 清除相关缓存，包括该ID此前可能存在的"景点不存在"负缓存
+        await cache.invalidate(sight_tag(new_sight.id), *SIGHT_COLLECTION_TAGS)
 
         return ResponseModel(code=200, message="景点创建成功", data=sight_response)
     except Exception as e:
@@ -356,23 +289,21 @@ async def create_sight(
 async def update_sight(
     sight_id: int,
     sight_data: SightUpdate,
-    db: AsyncSession = Depends(get_async_db),
+    db: AsyncSession = Depends(get_primary_db),
+    cache: CacheManager = Depends(get_cache),
+    counters: SightCounters = Depends(get_sight_counters),
     current_user: TokenData = Depends(get_sight_admin)
 ):
 
     try:
-        updated_sight = await update_sight_async(db, sight_id, sight_data)
+        updated_sight = await update_sight_async(db, sight_id, sight_data, counters)
         if not updated_sight:
             raise HTTPException(status_code=404, detail="景点不存在")
 
         sight_response = SightResponse.model_validate(updated_sight)
 
         # 清除相关缓存
-        redis = await get_redis()
-        await redis.delete(f"sight:detail:{sight_id}")
-        await redis.delete("sight:list:*")
-        await redis.delete("sight:hot:list")
-        await redis.delete("sight:fine:list")
+        await cache.invalidate(sight_tag(sight_id), *SIGHT_COLLECTION_TAGS)
 
         return ResponseModel(code=200, message="景点更新成功", data=sight_response)
     except HTTPException:
@@ -385,21 +316,19 @@ async def update_sight(
 @router.delete("/delete/{sight_id}/", response_model=ResponseModel)
 async def delete_sight(
     sight_id: int,
-    db: AsyncSession = Depends(get_async_db),
+    db: AsyncSession = Depends(get_primary_db),
+    cache: CacheManager = Depends(get_cache),
+    counters: SightCounters = Depends(get_sight_counters),
     current_user: TokenData = Depends(get_sight_admin)
 ):
     """删除景点（需要景点管理员权限）"""
     try:
-        success = await delete_sight_async(db, sight_id)
+        success = await delete_sight_async(db, sight_id, counters)
         if not success:
             raise HTTPException(status_code=404, detail="景点不存在")
 
         # 清除相关缓存
-        redis = await get_redis()
-        await redis.delete(f"sight:detail:{sight_id}")
-        await redis.delete("sight:list:*")
-        await redis.delete("sight:hot:list")
-        await redis.delete("sight:fine:list")
+        await cache.invalidate(sight_tag(sight_id), *SIGHT_COLLECTION_TAGS)
 
         return ResponseModel(code=200, message="景点删除成功")
     except HTTPException:
@@ -411,28 +340,12 @@ async def delete_sight(
 # 添加清除缓存的API端点
 @router.post("/clear-cache/", response_model=ResponseModel)
 async def clear_cache(
-    redis=Depends(get_redis),
+    cache: CacheManager = Depends(get_cache),
 ):
     """清除所有景点相关的缓存"""
     try:
         # 清除所有景点相关的缓存
-        await redis.delete("sight:hot:list")
-        await redis.delete("sight:fine:list")
-
-        # 清除列表缓存
-        keys = await redis.keys("sight:list:*")
-        if keys:
-            await redis.delete(*keys)
-
-        # 清除详情缓存
-        detail_keys = await redis.keys("sight:detail:*")
-        if detail_keys:
-            await redis.delete(*detail_keys)
-
-        # 清除搜索缓存
-        search_keys = await redis.keys("sight:search:*")
-        if search_keys:
-            await redis.delete(*search_keys)
+        await cache.invalidate(SIGHT_DETAIL_TAG, *SIGHT_COLLECTION_TAGS, *TICKET_TAGS)
 
         logger.info("Successfully cleared all sight caches")
         return ResponseModel(code=200, message="所有景点缓存已清除")
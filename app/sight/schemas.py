@@ -73,8 +73,23 @@ class SightResponse(SightBase):
         "from_attributes": True,
     }
 
+class SightListItem(BaseModel):
+    """列表卡片所需的景点字段，不含详细内容、详情与门票"""
+    id: int
+    name: str
+    main_img: str
+    score: float = 5.0
+    min_price: float = 0
+    province: str
+    city: str
+    area: Optional[str] = None
+
+    model_config = {
+        "from_attributes": True,
+    }
+
 class SightListResponse(BaseModel):
-    data: List[SightResponse]
+    data: List[SightListItem]
     pagination: Optional[Dict[str, Any]] = None
 
 class SightUpdate(BaseModel):
@@ -1,71 +1,157 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import or_, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import or_, func, desc, bindparam
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import selectinload, load_only
 from app.sight.models import Sight,SightProfile
-from typing import List, Optional
+# 预构建语句中的selectinload会触发映射器配置，Sight.tickets引用的Ticket须先注册
+import app.tickets.models  # noqa: F401
+from typing import Dict, List, Optional
+import re
+import unicodedata
+from app.config import SIGHT_SEARCH_BACKEND, SIGHT_SEARCH_NGRAM_SIZE
 from app.sight.schemas import SightCreate, SightUpdate
+from app.sight.counters import SightCounters, sight_flags
+
+def normalize_keyword(keyword: str) -> str:
+    """
+    规范化搜索关键词：NFKC(全角转半角等)、去除首尾及合并连续空白、大小写折叠
+    """
+    keyword = unicodedata.normalize("NFKC", keyword)
+    return " ".join(keyword.split()).casefold()
+
+def _list_columns():
+    """列表查询只加载卡片所需的列，不加载详细内容、详情与门票"""
+    return load_only(
+        Sight.id, Sight.name, Sight.main_img, Sight.score, Sight.min_price,
+        Sight.province, Sight.city, Sight.area,
+    )
+
+# 高频查询在模块加载时构建一次，参数通过绑定参数传入：
+# 每次调用不再重新构建select与加载选项，语句对象及其缓存键可复用，编译缓存总能命中
+_SIGHT_BY_ID = (
+    select(Sight)
+    .options(selectinload(Sight.profile), selectinload(Sight.tickets))
+    .where(Sight.id == bindparam("sight_id"))
+)
+_SIGHT_BASE_BY_ID = select(Sight).where(Sight.id == bindparam("sight_id"))
+_PROFILES_BY_SIGHT_IDS = select(SightProfile).where(SightProfile.sight_id.in_(bindparam("sight_ids", expanding=True)))
+_SIGHT_LIST = select(Sight).options(_list_columns()).offset(bindparam("skip")).limit(bindparam("limit"))
+_HOT_SIGHTS = (
+    select(Sight).options(_list_columns()).where(Sight.is_hot == True)
+    .order_by(Sight.id).offset(bindparam("skip")).limit(bindparam("limit"))
+)
+_FINE_SIGHTS = (
+    select(Sight).options(_list_columns()).where(Sight.is_top == True)
+    .order_by(Sight.id).offset(bindparam("skip")).limit(bindparam("limit"))
+)
+_SIGHTS_AFTER = (
+    select(Sight).options(_list_columns()).where(Sight.id > bindparam("after_id"))
+    .order_by(Sight.id).limit(bindparam("limit"))
+)
+_COUNT_SIGHTS = select(func.count()).select_from(Sight)
 
 async def get_sight_by_id_async(db: AsyncSession, sight_id: int) -> Optional[Sight]:
     """
     根据ID获取景点信息
     """
-    query = (
-        select(Sight)
-        .options(
-            selectinload(Sight.profile),
-            selectinload(Sight.tickets)
-        )
-        .where(Sight.id == sight_id)
-    )
-    result = await db.execute(query)
+    result = await db.execute(_SIGHT_BY_ID, {"sight_id": sight_id})
+    return result.scalar_one_or_none()
+
+async def get_sight_base_async(db: AsyncSession, sight_id: int) -> Optional[Sight]:
+    """
+    根据ID获取景点本身，不加载详情与门票(由批量加载器统一加载)
+    """
+    result = await db.execute(_SIGHT_BASE_BY_ID, {"sight_id": sight_id})
     return result.scalar_one_or_none()
 
+async def get_profiles_by_sight_ids_async(db: AsyncSession, sight_ids: List[int]) -> Dict[int, SightProfile]:
+    """
+    根据多个景点ID批量获取景点详情，返回 景点ID -> 景点详情
+    """
+    result = await db.execute(_PROFILES_BY_SIGHT_IDS, {"sight_ids": list(sight_ids)})
+    return {profile.sight_id: profile for profile in result.scalars().all()}
 
 async def get_sight_async(db:AsyncSession,skip:int = 0,limit: int = 100) -> List[Sight]:
     """
     获取景点列表
     """
-    query = select(Sight).options(selectinload(Sight.profile),
-                                  selectinload(Sight.tickets)
-    ).offset(skip).limit(limit)
-    result = await db.execute(query)
+    result = await db.execute(_SIGHT_LIST, {"skip": skip, "limit": limit})
     return result.scalars().all()
 
 async def get_hot_sights_async(db:AsyncSession,skip:int = 0,limit: int = 10) -> List[Sight]:
     """
     获取热门景点列表
     """
-    query = select(Sight).options(selectinload(Sight.profile),
-                                  selectinload(Sight.tickets)
-                                  ).where(Sight.is_hot == True).offset(skip).limit(limit)
-    result = await db.execute(query)
+    result = await db.execute(_HOT_SIGHTS, {"skip": skip, "limit": limit})
     return result.scalars().all()
 
 async def get_fine_sights_async(db:AsyncSession,skip:int = 0,limit: int = 3) -> List[Sight]:
     """
     获取精选景点列表
     """
-    query = select(Sight).options(selectinload(Sight.profile),
-                                  selectinload(Sight.tickets)
-                                  ).where(Sight.is_top == True).offset(skip).limit(limit)
-    result = await db.execute(query)
+    result = await db.execute(_FINE_SIGHTS, {"skip": skip, "limit": limit})
+    return result.scalars().all()
+
+async def get_sight_after_async(db:AsyncSession,after_id: int = 0,limit: int = 100) -> List[Sight]:
+    """
+    按ID游标获取景点列表(keyset分页)，查询耗时与翻页深度无关
+    """
+    result = await db.execute(_SIGHTS_AFTER, {"after_id": after_id, "limit": limit})
     return result.scalars().all()
 
+# 全文布尔模式下的运算符，关键词中出现时替换为空白
+_BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]')
+
+def _fulltext_phrase(keyword: str) -> Optional[str]:
+    """
+    关键词转为全文索引的短语查询，关键词短于ngram分词长度或未启用全文索引时返回None
+    """
+    if SIGHT_SEARCH_BACKEND != "fulltext":
+        return None
+    phrase = " ".join(_BOOLEAN_OPERATORS.sub(" ", keyword).split())
+    if len(phrase) < SIGHT_SEARCH_NGRAM_SIZE:
+        return None
+    return f'"{phrase}"'
+
+def _search_match(phrase: str):
+    """全文匹配表达式，作为条件时过滤，作为排序时为相关度"""
+    return match(Sight.name, Sight.province, Sight.city, Sight.area, against=phrase).in_boolean_mode()
+
+def _search_condition(keyword: str):
+    """搜索匹配条件：优先使用全文索引，否则逐行模糊匹配"""
+    phrase = _fulltext_phrase(keyword)
+    if phrase is not None:
+        return _search_match(phrase)
+    return or_(
+        Sight.name.contains(keyword),
+        Sight.province.contains(keyword),
+        Sight.city.contains(keyword),
+        Sight.area.contains(keyword)
+    )
+
+def _search_order(keyword: str):
+    """搜索结果排序：全文索引按相关度，ID保证分页稳定"""
+    phrase = _fulltext_phrase(keyword)
+    if phrase is not None:
+        return desc(_search_match(phrase)), Sight.id
+    return (Sight.id,)
+
 async def search_sights_async(db:AsyncSession,keyword: str,skip:int = 0,limit: int = 100) -> List[Sight]:
     """
-    搜索景点
+    搜索景点，按相关度排序
     """
-    query = select(Sight).options(selectinload(Sight.profile),
-                                  selectinload(Sight.tickets)
-                                  ).where(
-        or_(
-            Sight.name.contains(keyword),
-            Sight.province.contains(keyword),
-            Sight.city.contains(keyword),
-            Sight.area.contains(keyword)
-        )
-    ).offset(skip).limit(limit)
+    query = select(Sight).options(_list_columns()).where(_search_condition(keyword)
+                                  ).order_by(*_search_order(keyword)).offset(skip).limit(limit)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+async def search_sights_after_async(db:AsyncSession,keyword: str,after_id: int = 0,limit: int = 100) -> List[Sight]:
+    """
+    按ID游标搜索景点(keyset分页)，结果按ID而非相关度排序
+    """
+    query = select(Sight).options(_list_columns()).where(_search_condition(keyword), Sight.id > after_id
+                                  ).order_by(Sight.id).limit(limit)
     result = await db.execute(query)
     return result.scalars().all()
 
@@ -73,29 +159,21 @@ async def count_sights_async(db:AsyncSession) -> int:
     """
     获取景点总数
     """
-    query = select(func.count()).select_from(Sight)
-    result = await db.execute(query)
+    result = await db.execute(_COUNT_SIGHTS)
     return result.scalar_one()
 
 async def count_search_sights_async(db:AsyncSession,keyword: str) -> int:
     """
     获取搜索景点总数
     """
-    query = select(func.count()).select_from(Sight).where(
-        or_(
-            Sight.name.contains(keyword),
-            Sight.province.contains(keyword),
-            Sight.city.contains(keyword),
-            Sight.area.contains(keyword)
-        )
-    )
+    query = select(func.count()).select_from(Sight).where(_search_condition(keyword))
     result = await db.execute(query)
     return result.scalar_one()
 
 #实现创建新景点的异步函数
-async def create_sight_async(db: AsyncSession, sight_data: SightCreate) -> Sight:
+async def create_sight_async(db: AsyncSession, sight_data: SightCreate, counters: SightCounters = None) -> Sight:
     """
-    创建新景点及其详情
+    创建新景点及其详情，提交后更新景点计数
     """
     # 创建新景点对象
     new_sight = Sight(
@@ -136,6 +214,8 @@ async def create_sight_async(db: AsyncSession, sight_data: SightCreate) -> Sight
     db.add(new_profile)
     await db.commit()
     await db.refresh(new_sight)
+    if counters is not None:
+        await counters.on_create(new_sight)
     
     # 手动加载关系
     query = (
@@ -155,15 +235,18 @@ async def create_sight_async(db: AsyncSession, sight_data: SightCreate) -> Sight
     return created_sight
 
 #实现更新景点信息的异步函数
-async def update_sight_async(db: AsyncSession, sight_id: int, sight_data: SightUpdate) -> Optional[Sight]:
+async def update_sight_async(
+    db: AsyncSession, sight_id: int, sight_data: SightUpdate, counters: SightCounters = None
+) -> Optional[Sight]:
     """
-    更新景点信息及其详情
+    更新景点信息及其详情，is_hot/is_top/is_valid变化时更新景点计数
     """
     # 获取要更新的景点
     sight = await get_sight_by_id_async(db, sight_id)
     if not sight:
         return None
-    
+    before = sight_flags(sight)
+
     # 更新景点属性
     update_data = sight_data.model_dump(exclude={"profile"}, exclude_unset=True)
     for key, value in update_data.items():
@@ -186,6 +269,8 @@ async def update_sight_async(db: AsyncSession, sight_id: int, sight_data: SightU
     # 提交更改
     await db.commit()
     await db.refresh(sight)
+    if counters is not None:
+        await counters.on_update(before, sight)
     
     # 获取完整的景点对象，包括关系
     updated_sight = await get_sight_by_id_async(db, sight_id)
@@ -193,14 +278,15 @@ async def update_sight_async(db: AsyncSession, sight_id: int, sight_data: SightU
     return updated_sight
 
 #通过景点id删除景点和景点详情
-async def delete_sight_async(db: AsyncSession, sight_id: int) -> None:
+async def delete_sight_async(db: AsyncSession, sight_id: int, counters: SightCounters = None) -> None:
     """
-    删除景点及其详情
+    删除景点及其详情，提交后更新景点计数
     """
     # 获取要删除的景点
     sight = await get_sight_by_id_async(db, sight_id)
     if not sight:
         return False
+    flags = sight_flags(sight)
     try:
         #先删除关联的景点详情
         if sight.profile:
@@ -209,8 +295,10 @@ async def delete_sight_async(db: AsyncSession, sight_id: int) -> None:
 
         await db.delete(sight)
         await db.commit()
-        return True
     except Exception as e:
         await db.rollback()
         raise e
+    if counters is not None:
+        await counters.on_delete(flags)
+    return True
 
@@ -0,0 +1,190 @@
+# app/sight/warmer.py
+"""
+景点缓存预热
+
+启动时以有限并发预热热门、精选、首页列表以及访问最多的景点详情，
+之后按访问频率在缓存过期前于后台刷新。预热完成前就绪检查返回未就绪。
+"""
+import asyncio
+from typing import Callable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.cache.keys import SIGHT_HOT_KEY, SIGHT_FINE_KEY, sight_detail_key, sight_list_key
+from app.cache.manager import CacheManager
+from app.sight.counters import SightCounters
+from app.sight.loaders import SightBatchers, SightLoaders
+from app.sight.router import get_sight_detail, get_sight_list, get_hot_sight_list, get_fine_sight_list
+from app.sight.services import get_hot_sights_async
+from app.utils.logger import get_logger
+
+logger = get_logger("app.sight.warmer")
+
+# 景点详情访问次数排行(有序集合)，跨进程、跨重启保留，用于决定预热哪些详情
+SIGHT_VIEWS_KEY = "sight:views"
+# 排行中最多保留的景点数
+SIGHT_VIEWS_LIMIT = 1000
+DETAIL_KEY_PREFIX = "sight:detail:"
+
+# 首页列表默认分页
+HOME_PAGE = 1
+HOME_PAGE_SIZE = 6
+
+# (缓存键, 路由函数, 路由参数)
+Target = Tuple[str, Callable, dict]
+
+
+class SightCacheWarmer:
+    """景点缓存预热与后台刷新"""
+
+    def __init__(
+        self,
+        cache: CacheManager,
+        session_factory,
+        concurrency: int = 4,
+        top_details: int = 20,
+        interval: float = 60,
+        refresh_ahead: float = 300,
+        min_hits: int = 1,
+        counters: SightCounters = None,
+        batchers: SightBatchers = None,
+    ):
+        self.cache = cache
+        self.counters = counters
+        self.batchers = batchers or SightBatchers(session_factory)
+        self.session_factory = session_factory
+        self.top_details = top_details
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.min_hits = min_hits
+        self.ready = asyncio.Event()
+        self.refreshed = 0
+        self.failures = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._task: Optional[asyncio.Task] = None
+
+    def _fixed_targets(self) -> List[Target]:
+        return [
+            (SIGHT_HOT_KEY, get_hot_sight_list, {}),
+            (SIGHT_FINE_KEY, get_fine_sight_list, {}),
+            (sight_list_key(HOME_PAGE, HOME_PAGE_SIZE), get_sight_list, {"page": HOME_PAGE, "page_size": HOME_PAGE_SIZE, "cursor": None, "counters": self.counters}),
+        ]
+
+    def _detail_targets(self, sight_ids) -> List[Target]:
+        # 同一轮刷新的详情共用加载器，关联数据合并为批量查询
+        loaders = SightLoaders(self.batchers)
+        return [
+            (sight_detail_key(sight_id), get_sight_detail, {"sight_id": sight_id, "loaders": loaders})
+            for sight_id in sight_ids
+        ]
+
+    async def _top_sight_ids(self) -> List[int]:
+        """访问最多的景点ID，排行为空时(首次部署)退回热门景点"""
+        ids = await self.cache.redis.zrevrange(SIGHT_VIEWS_KEY, 0, self.top_details - 1)
+        if ids:
+            return [int(sight_id) for sight_id in ids]
+        async with self.session_factory() as db:
+            hot_sights = await get_hot_sights_async(db, limit=self.top_details)
+        return [sight.id for sight in hot_sights]
+
+    async def _refresh(self, target: Target) -> bool:
+        """回源并覆盖一个缓存键，每个任务使用独立的数据库会话"""
+        cache_key, route, kwargs = target
+        async with self._semaphore:
+            try:
+                async with self.session_factory() as db:
+                    await route.refresh(self.cache, db=db, **kwargs)
+                self.refreshed += 1
+                return True
+            except HTTPException as e:
+                # 景点已不存在等情况，跳过即可
+                logger.info(f"Skip warming {cache_key}: {e.detail}")
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Error warming cache {cache_key}: {str(e)}")
+        return False
+
+    async def _needs_refresh(self, cache_key: str) -> bool:
+        """缓存不存在或即将过期"""
+        return await self.cache.ttl(cache_key) < self.refresh_ahead
+
+    async def _refresh_expiring(self, targets: List[Target]) -> int:
+        """刷新即将过期的目标，返回成功刷新的数量"""
+        expiring = [target for target in targets if await self._needs_refresh(target[0])]
+        results = await asyncio.gather(*(self._refresh(target) for target in expiring))
+        return sum(results)
+
+    async def warm(self):
+        """启动预热：缓存已由其他worker预热过的键会被跳过"""
+        targets = self._fixed_targets() + self._detail_targets(await self._top_sight_ids())
+        count = await self._refresh_expiring(targets)
+        logger.info(f"Cache warming finished, refreshed {count}/{len(targets)} keys")
+
+    async def _record_views(self, counts):
+        """把本周期的详情访问次数累加到排行中"""
+        views = {
+            cache_key[len(DETAIL_KEY_PREFIX):]: hits
+            for cache_key, hits in counts.items()
+            if cache_key.startswith(DETAIL_KEY_PREFIX)
+        }
+        if not views:
+            return
+        async with self.cache.redis.pipeline(transaction=False) as pipe:
+            for sight_id, hits in views.items():
+                pipe.zincrby(SIGHT_VIEWS_KEY, hits, sight_id)
+            pipe.zremrangebyrank(SIGHT_VIEWS_KEY, 0, -SIGHT_VIEWS_LIMIT - 1)
+            await pipe.execute()
+
+    async def refresh_hot_keys(self):
+        """后台刷新：只刷新本周期内被访问过且即将过期的键"""
+        counts = self.cache.pop_access_counts()
+        await self._record_views(counts)
+        detail_ids = [
+            int(cache_key[len(DETAIL_KEY_PREFIX):])
+            for cache_key, hits in counts.most_common()
+            if cache_key.startswith(DETAIL_KEY_PREFIX) and hits >= self.min_hits
+        ][:self.top_details]
+        targets = [
+            target for target in self._fixed_targets() + self._detail_targets(detail_ids)
+            if counts.get(target[0], 0) >= self.min_hits
+        ]
+        count = await self._refresh_expiring(targets)
+        if count:
+            logger.info(f"Refreshed {count} hot cache keys before expiry")
+
+    async def _run(self):
+        try:
+            await self.warm()
+        except Exception as e:
+            logger.error(f"Cache warming failed: {str(e)}")
+        finally:
+            # 预热失败也置为就绪，请求会按需回源
+            self.ready.set()
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh_hot_keys()
+            except Exception as e:
+                logger.error(f"Background cache refresh failed: {str(e)}")
+
+    def start(self):
+        """启动预热与后台刷新任务"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready.is_set(),
+            "refreshed": self.refreshed,
+            "failures": self.failures,
+        }
@@ -0,0 +1,356 @@
+# app/tickets/inventory.py
+"""
+Redis门票库存
+
+抢购时在Redis中用Lua脚本原子地检查并扣减库存，不再在sight_ticket行锁上排队。
+
+数据库是库存的唯一依据：门票余量 = total - 未取消订单的订单项数量之和。Redis中的库存只是
+这一数值减去尚未结算的预占，由后台任务按数据库重新计算后覆盖(而不是把Redis的值写回数据库)，
+补货(修改total)、订单取消都会在下次重新计算时反映到Redis。
+
+每次预占是一条带到期时间的记录(预占ID -> 各门票数量)，同时计入门票的预占中数量：
+- 订单提交后确认(confirm)：预占转为已售，门票标记为待重新计算，回写任务把余量写回sight_ticket.remain；
+- 下单失败时归还(release)：数量加回Redis库存；
+- 进程在预占与确认之间崩溃时记录到期后被丢弃，不归还也不计为已售，由重新计算按订单是否已提交决定，
+  预占的库存不会永久丢失。
+
+重新计算时先记下各门票的已售计数，再读取数据库：读取之后才确认的预占不在数据库读到的订单项中，
+但计入了已售计数的增量，两者相减后不会重复计算，也不会漏算。
+"""
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import Request
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.future import select
+
+from app.order.models import Order, OrderItem
+from app.tickets.models import Ticket
+from app.utils.logger import get_logger
+
+logger = get_logger("app.tickets.inventory")
+
+STOCK_KEY_PREFIX = "ticket:stock:"
+# 各门票尚未结算的预占数量
+HELD_KEY_PREFIX = "ticket:held:"
+# 各门票确认售出的累计数量，只增不减，重新计算时用来扣除读取数据库之后才确认的预占
+SOLD_KEY_PREFIX = "ticket:sold:"
+# 预占记录(哈希：门票ID -> 数量)
+HOLD_KEY_PREFIX = "ticket:hold:"
+# 未结算的预占ID，分数为到期时间戳
+HOLDS_KEY = "ticket:holds"
+# 所有已加载到Redis的门票ID，全量对账时使用
+TRACKED_KEY = "ticket:stock:ids"
+# 库存变化后尚未按数据库重新计算的门票ID
+DIRTY_KEY = "ticket:stock:dirty"
+
+# KEYS: 预占集合, 预占记录, 各门票库存键, 各门票预占中数量键；
+# ARGV: 预占ID, 到期时间戳, 各门票ID, 各门票数量(与库存键一一对应)
+# 返回{1, 0}成功；{0, i}第i张门票库存不足；{-1, i}第i张门票库存未加载
+RESERVE_SCRIPT = """
+local n = (#KEYS - 2) / 2
+for i = 1, n do
+    local stock = redis.call('GET', KEYS[2 + i])
+    if not stock then
+        return {-1, i}
+    end
+    if tonumber(stock) < tonumber(ARGV[2 + n + i]) then
+        return {0, i}
+    end
+end
+for i = 1, n do
+    redis.call('DECRBY', KEYS[2 + i], ARGV[2 + n + i])
+    redis.call('INCRBY', KEYS[2 + n + i], ARGV[2 + n + i])
+    redis.call('HSET', KEYS[2], ARGV[2 + i], ARGV[2 + n + i])
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+return {1, 0}
+"""
+
+# 结算一条预占，预占记录已不存在(已结算)时什么也不做，重复结算是安全的
+# KEYS: 预占集合, 预占记录, 待重新计算集合, 各门票库存键, 各门票预占中数量键, 各门票已售计数键；
+# ARGV: 预占ID, 结算方式(confirm/release/drop), 各门票ID, 各门票数量
+SETTLE_SCRIPT = """
+if redis.call('DEL', KEYS[2]) == 0 then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+local n = (#KEYS - 3) / 3
+for i = 1, n do
+    local quantity = ARGV[2 + n + i]
+    redis.call('DECRBY', KEYS[3 + n + i], quantity)
+    if ARGV[2] == 'confirm' then
+        redis.call('INCRBY', KEYS[3 + 2 * n + i], quantity)
+        redis.call('SADD', KEYS[3], ARGV[2 + i])
+    elseif ARGV[2] == 'release' then
+        if redis.call('EXISTS', KEYS[3 + i]) == 1 then
+            redis.call('INCRBY', KEYS[3 + i], quantity)
+        end
+    else
+        -- 不知道订单是否已提交，由重新计算决定
+        redis.call('SADD', KEYS[3], ARGV[2 + i])
+    end
+end
+return 1
+"""
+
+# 按数据库余量重置Redis库存：库存 = 数据库余量 - 预占中数量 - 读取数据库之后新确认的数量
+# KEYS: 已加载集合, 各门票库存键, 各门票预占中数量键, 各门票已售计数键；
+# ARGV: 各门票ID, 各门票数据库余量, 读取数据库之前的已售计数
+RESEED_SCRIPT = """
+local n = (#KEYS - 1) / 3
+for i = 1, n do
+    local held = tonumber(redis.call('GET', KEYS[1 + n + i]) or 0)
+    local sold = tonumber(redis.call('GET', KEYS[1 + 2 * n + i]) or 0)
+    local stock = tonumber(ARGV[n + i]) - held - (sold - tonumber(ARGV[2 * n + i]))
+    redis.call('SET', KEYS[1 + i], math.max(stock, 0))
+    redis.call('SADD', KEYS[1], ARGV[i])
+end
+return n
+"""
+
+# 已售数量：未取消订单的订单项
+_SOLD = (
+    select(OrderItem.ticket_id, func.sum(OrderItem.quantity))
+    .join(Order, Order.id == OrderItem.order_id)
+    .where(OrderItem.ticket_id.in_(bindparam("ticket_ids", expanding=True)), Order.status != Order.STATUS_CANCELLED)
+    .group_by(OrderItem.ticket_id)
+)
+_TOTALS = select(Ticket.id, Ticket.total).where(Ticket.id.in_(bindparam("ticket_ids", expanding=True)))
+_UPDATE_REMAIN = (
+    update(Ticket.__table__)
+    .where(Ticket.__table__.c.id == bindparam("b_id"))
+    .values(remain=bindparam("b_remain"))
+)
+
+
+def stock_key(ticket_id: int) -> str:
+    return f"{STOCK_KEY_PREFIX}{ticket_id}"
+
+
+def held_key(ticket_id: int) -> str:
+    return f"{HELD_KEY_PREFIX}{ticket_id}"
+
+
+def sold_key(ticket_id: int) -> str:
+    return f"{SOLD_KEY_PREFIX}{ticket_id}"
+
+
+def hold_key(hold_id: str) -> str:
+    return f"{HOLD_KEY_PREFIX}{hold_id}"
+
+
+class TicketInventory:
+    """Redis门票库存，保存在app.state.ticket_inventory上"""
+
+    def __init__(
+        self,
+        redis,
+        session_factory,
+        flush_interval: float = 0.5,
+        flush_batch: int = 500,
+        reconcile_interval: float = 300,
+        hold_ttl: float = 120,
+    ):
+        self.redis = redis
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.reconcile_interval = reconcile_interval
+        # 预占到确认的最长时间(秒)，需大于下单事务可能的最长耗时，超过后预占被丢弃
+        self.hold_ttl = hold_ttl
+        self._reserve = redis.register_script(RESERVE_SCRIPT)
+        self._settle_script = redis.register_script(SETTLE_SCRIPT)
+        self._reseed = redis.register_script(RESEED_SCRIPT)
+        self.reserved = 0
+        self.rejected = 0
+        self.expired = 0
+        self.flushed = 0
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def load(self, ticket_ids: Iterable[int]) -> int:
+        """按数据库重新计算这些门票的余量：写回sight_ticket.remain并重置Redis库存，返回处理的门票数"""
+        ticket_ids = sorted(set(ticket_ids))
+        if not ticket_ids:
+            return 0
+        # 先于数据库读取记下已售计数，之后确认的预占由计数的增量扣除
+        sold_before = await self.redis.mget([sold_key(ticket_id) for ticket_id in ticket_ids])
+        sold_before = dict(zip(ticket_ids, (int(value or 0) for value in sold_before)))
+        params = {"ticket_ids": ticket_ids}
+        async with self.session_factory() as db:
+            totals = dict((await db.execute(_TOTALS, params)).all())
+            sold = dict((await db.execute(_SOLD, params)).all())
+            remains = {ticket_id: (totals[ticket_id] or 0) - int(sold.get(ticket_id) or 0) for ticket_id in sorted(totals)}
+            if remains:
+                await db.execute(_UPDATE_REMAIN, [
+                    {"b_id": ticket_id, "b_remain": remain} for ticket_id, remain in remains.items()
+                ])
+            await db.commit()
+        if not remains:
+            return 0
+        ids = list(remains)
+        await self._reseed(
+            keys=[TRACKED_KEY]
+            + [stock_key(ticket_id) for ticket_id in ids]
+            + [held_key(ticket_id) for ticket_id in ids]
+            + [sold_key(ticket_id) for ticket_id in ids],
+            args=ids + [remains[ticket_id] for ticket_id in ids] + [sold_before[ticket_id] for ticket_id in ids],
+        )
+        return len(ids)
+
+    async def reserve(self, hold_id: str, quantities: Dict[int, int]) -> Optional[int]:
+        """
+        原子地预占多张门票的库存，全部足够才预占。成功返回None，否则返回库存不足的门票ID。
+        预占须在hold_ttl内以同一hold_id确认或归还
+        """
+        ticket_ids = sorted(quantities)
+        keys = (
+            [HOLDS_KEY, hold_key(hold_id)]
+            + [stock_key(ticket_id) for ticket_id in ticket_ids]
+            + [held_key(ticket_id) for ticket_id in ticket_ids]
+        )
+        args = [hold_id, 0] + ticket_ids + [quantities[ticket_id] for ticket_id in ticket_ids]
+        for _ in range(2):
+            args[1] = time.time() + self.hold_ttl
+            status, index = await self._reserve(keys=keys, args=args)
+            if status == 1:
+                self.reserved += 1
+                return None
+            if status == 0:
+                self.rejected += 1
+                return ticket_ids[index - 1]
+            # 库存未加载，从数据库加载后重试一次
+            await self.load(ticket_ids)
+        self.rejected += 1
+        return ticket_ids[index - 1]
+
+    async def _settle(self, hold_id: str, quantities: Dict[int, int], mode: str) -> bool:
+        ticket_ids = sorted(quantities)
+        keys = (
+            [HOLDS_KEY, hold_key(hold_id), DIRTY_KEY]
+            + [stock_key(ticket_id) for ticket_id in ticket_ids]
+            + [held_key(ticket_id) for ticket_id in ticket_ids]
+            + [sold_key(ticket_id) for ticket_id in ticket_ids]
+        )
+        args = [hold_id, mode] + ticket_ids + [quantities[ticket_id] for ticket_id in ticket_ids]
+        return bool(await self._settle_script(keys=keys, args=args))
+
+    async def confirm(self, hold_id: str, quantities: Dict[int, int]) -> bool:
+        """订单提交后确认预占，返回是否确认(预占已到期被丢弃时为False，由重新计算修正)"""
+        return await self._settle(hold_id, quantities, "confirm")
+
+    async def release(self, hold_id: str, quantities: Dict[int, int]) -> bool:
+        """下单失败时归还预占的库存"""
+        return await self._settle(hold_id, quantities, "release")
+
+    async def refresh(self, ticket_ids: Iterable[int]):
+        """数据库中的余量发生变化(如订单取消)，标记这些门票待按数据库重新计算"""
+        ticket_ids = list(ticket_ids)
+        if ticket_ids:
+            await self.redis.sadd(DIRTY_KEY, *ticket_ids)
+
+    async def stock(self, ticket_id: int) -> Optional[int]:
+        value = await self.redis.get(stock_key(ticket_id))
+        return None if value is None else int(value)
+
+    async def expire_holds(self, now: float = None) -> int:
+        """丢弃一批已到期的预占，相关门票待重新计算，返回丢弃的预占数"""
+        hold_ids = await self.redis.zrangebyscore(
+            HOLDS_KEY, "-inf", time.time() if now is None else now, start=0, num=self.flush_batch
+        )
+        count = 0
+        for hold_id in hold_ids:
+            hold_id = hold_id.decode() if isinstance(hold_id, bytes) else hold_id
+            quantities = {int(k): int(v) for k, v in (await self.redis.hgetall(hold_key(hold_id))).items()}
+            if not quantities:
+                await self.redis.zrem(HOLDS_KEY, hold_id)
+                continue
+            if await self._settle(hold_id, quantities, "drop"):
+                count += 1
+        if count:
+            self.expired += count
+            logger.warning(f"Dropped {count} expired ticket stock holds")
+        return count
+
+    async def flush(self) -> int:
+        """重新计算一批待处理的门票，返回处理的门票数"""
+        ticket_ids = await self.redis.spop(DIRTY_KEY, self.flush_batch)
+        if not ticket_ids:
+            return 0
+        ticket_ids = [int(ticket_id) for ticket_id in ticket_ids]
+        try:
+            count = await self.load(ticket_ids)
+        except Exception:
+            # 放回待处理集合，下次重试
+            await self.redis.sadd(DIRTY_KEY, *ticket_ids)
+            raise
+        self.flushed += count
+        return count
+
+    async def reconcile(self) -> int:
+        """全量对账：丢弃到期的预占，并按数据库重新计算所有已加载门票的库存"""
+        while await self.expire_holds() >= self.flush_batch:
+            pass
+        ticket_ids: List[int] = sorted(int(ticket_id) for ticket_id in await self.redis.smembers(TRACKED_KEY))
+        count = 0
+        for start in range(0, len(ticket_ids), self.flush_batch):
+            count += await self.load(ticket_ids[start:start + self.flush_batch])
+        if count:
+            logger.info(f"Reconciled {count} ticket stocks with database")
+        return count
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_reconcile = 0.0
+        while True:
+            try:
+                if loop.time() >= next_reconcile:
+                    await self.reconcile()
+                    next_reconcile = loop.time() + self.reconcile_interval
+                await self.expire_holds()
+                while await self.flush() >= self.flush_batch:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Ticket stock write-behind failed: {str(e)}")
+                # 出错后下一轮先全量对账
+                next_reconcile = 0.0
+            await asyncio.sleep(self.flush_interval)
+
+    def start(self):
+        """启动回写任务(启动时先全量对账)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止回写任务并处理剩余的待重新计算门票"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            while await self.flush():
+                pass
+        except Exception as e:
+            logger.error(f"Error flushing ticket stocks on shutdown: {str(e)}")
+
+    def stats(self) -> dict:
+        return {
+            "reserved": self.reserved,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "flushed": self.flushed,
+            "failures": self.failures,
+        }
+
+
+async def get_ticket_inventory(request: Request) -> Optional[TicketInventory]:
+    """获取Redis门票库存(依赖注入)，库存扣减方式不是redis时为None"""
+    return getattr(request.app.state, "ticket_inventory", None)
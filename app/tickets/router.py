@@ -4,9 +4,24 @@ from app.database import get_async_db
 from app.tickets.models import Ticket
 from app.tickets.schemas import TicketResponse
 from app.tickets.response import ResponseModel
-from app.tickets.services import get_ticket_async, get_tickets_async, get_tickets_by_sight_async
+from app.tickets.services import get_ticket_async, get_tickets_async
+from app.sight.loaders import SightLoaders, get_sight_loaders
+from app.config import NEGATIVE_CACHE_TTL
+from app.cache.decorator import cached, json_serializer
+from app.cache.keys import (
+    TICKET_DETAIL_TAG,
+    TICKET_LIST_TAG,
+    sight_tag,
+    ticket_tag,
+    ticket_detail_key,
+    ticket_list_key,
+    sight_tickets_key,
+)
 from typing import List
 
+# 门票剩余数量变化频繁，缓存时间较短
+TICKET_CACHE_TTL = 60
+
 router = APIRouter(
     prefix="/api/sight",
     tags=["tickets"],
@@ -14,21 +29,41 @@ router = APIRouter(
 )
 
 @router.get("/ticket/{ticket_id}/", response_model=ResponseModel[TicketResponse])
+@cached(
+    key=lambda ticket_id, **_: ticket_detail_key(ticket_id),
+    ttl=TICKET_CACHE_TTL,
+    tags=lambda ticket_id, **_: (TICKET_DETAIL_TAG, ticket_tag(ticket_id)),
+    negative_ttl=NEGATIVE_CACHE_TTL,
+)
 async def get_ticket_detail(ticket_id: int, db: AsyncSession = Depends(get_async_db)):
     """获取门票详情"""
     ticket = await get_ticket_async(db, ticket_id=ticket_id)
     if ticket is None:
         raise HTTPException(status_code=404, detail="Ticket not found")
-    return ResponseModel(code=200, data=ticket)
+    return TicketResponse.model_validate(ticket)
 
 @router.get("/", response_model=List[TicketResponse])
+@cached(
+    key=lambda skip, limit, **_: ticket_list_key(skip, limit),
+    ttl=TICKET_CACHE_TTL,
+    tags=(TICKET_LIST_TAG,),
+    serializer=json_serializer,
+    negative_ttl=NEGATIVE_CACHE_TTL,
+)
 async def get_tickets(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
     """获取门票列表"""
     tickets = await get_tickets_async(db, skip=skip, limit=limit)
-    return tickets
+    return [TicketResponse.model_validate(ticket) for ticket in tickets]
 
 @router.get("/sight/{sight_id}", response_model=List[TicketResponse])
-async def get_tickets_by_sight(sight_id: int, db: AsyncSession = Depends(get_async_db)):
-    """根据景点ID获取门票列表"""
-    tickets = await get_tickets_by_sight_async(db, sight_id=sight_id)
-    return tickets
+@cached(
+    key=lambda sight_id, **_: sight_tickets_key(sight_id),
+    ttl=TICKET_CACHE_TTL,
+    tags=lambda sight_id, **_: (TICKET_LIST_TAG, sight_tag(sight_id)),
+    serializer=json_serializer,
+    negative_ttl=NEGATIVE_CACHE_TTL,
+)
+async def get_tickets_by_sight(sight_id: int, loaders: SightLoaders = Depends(get_sight_loaders)):
+    """根据景点ID获取门票列表，并发请求按景点ID合并为一次批量查询"""
+    tickets = await loaders.tickets_of(sight_id)
+    return [TicketResponse.model_validate(ticket) for ticket in tickets]
@@ -1,28 +1,44 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import bindparam
 from app.tickets.models import Ticket
-from typing import List, Optional
+from typing import Dict, List, Optional
+
+# 高频查询在模块加载时构建一次，参数通过绑定参数传入
+_TICKET_BY_ID = select(Ticket).where(Ticket.id == bindparam("ticket_id"))
+_TICKETS = select(Ticket).offset(bindparam("skip")).limit(bindparam("limit"))
+_TICKETS_BY_SIGHT = select(Ticket).where(Ticket.sight_id == bindparam("sight_id"))
+_TICKETS_BY_SIGHT_IDS = (
+    select(Ticket).where(Ticket.sight_id.in_(bindparam("sight_ids", expanding=True))).order_by(Ticket.id)
+)
 
 async def get_ticket_async(db: AsyncSession, ticket_id: int) -> Optional[Ticket]:
     """
     根据ID获取门票信息
     """
-    query = select(Ticket).where(Ticket.id == ticket_id)
-    result = await db.execute(query)
+    result = await db.execute(_TICKET_BY_ID, {"ticket_id": ticket_id})
     return result.scalar_one_or_none()
 
 async def get_tickets_async(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Ticket]:
     """
     获取门票列表
     """
-    query = select(Ticket).offset(skip).limit(limit)
-    result = await db.execute(query)
+    result = await db.execute(_TICKETS, {"skip": skip, "limit": limit})
     return result.scalars().all()
 
 async def get_tickets_by_sight_async(db: AsyncSession, sight_id: int) -> List[Ticket]:
     """
     根据景点ID获取门票列表
     """
-    query = select(Ticket).where(Ticket.sight_id == sight_id)
-    result = await db.execute(query)
+    result = await db.execute(_TICKETS_BY_SIGHT, {"sight_id": sight_id})
     return result.scalars().all()
+
+async def get_tickets_by_sight_ids_async(db: AsyncSession, sight_ids: List[int]) -> Dict[int, List[Ticket]]:
+    """
+    根据多个景点ID批量获取门票，返回 景点ID -> 门票列表，没有门票的景点对应空列表
+    """
+    tickets = {sight_id: [] for sight_id in sight_ids}
+    result = await db.execute(_TICKETS_BY_SIGHT_IDS, {"sight_ids": list(sight_ids)})
+    for ticket in result.scalars().all():
+        tickets[ticket.sight_id].append(ticket)
+    return tickets
@@ -0,0 +1,82 @@
+# app/utils/dataloader.py
+"""
+批量加载(DataLoader)
+
+同一事件循环轮次内对BatchLoader.load的调用会被收集起来，在下一轮次以一次批量查询
+(如 WHERE sight_id IN (...))统一加载，相同的键只查询一次。
+RequestLoader在此之上做请求内的记忆化，同一请求内重复加载同一个键直接返回已有结果。
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Set
+
+from app.utils.logger import get_logger
+
+logger = get_logger("app.dataloader")
+
+# 批量加载函数：接收键列表，返回 键 -> 值 的字典，缺少的键按None处理
+BatchFn = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+
+class BatchLoader:
+    """跨请求共享的批量加载器，保存在app.state上"""
+
+    def __init__(self, batch_fn: BatchFn, max_batch_size: int = 500):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.loads = 0
+        self.batches = 0
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def load(self, key: Hashable) -> Awaitable[Any]:
+        """加载一个键，本轮次内的所有请求在下一轮次合并为批量查询"""
+        self.loads += 1
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+            future = self._pending[key] = loop.create_future()
+        # 某个等待者被取消时不影响同一批次的其他等待者
+        return asyncio.shield(future)
+
+    def _dispatch(self):
+        pending, self._pending = self._pending, {}
+        keys = list(pending)
+        for start in range(0, len(keys), self.max_batch_size):
+            task = asyncio.ensure_future(self._run(keys[start:start + self.max_batch_size], pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, keys: List[Hashable], pending: Dict[Hashable, asyncio.Future]):
+        self.batches += 1
+        try:
+            results = await self.batch_fn(keys)
+        except Exception as e:
+            logger.error(f"Batch load of {len(keys)} keys failed: {str(e)}")
+            for key in keys:
+                if not pending[key].done():
+                    pending[key].set_exception(e)
+            return
+        for key in keys:
+            if not pending[key].done():
+                pending[key].set_result(results.get(key))
+
+    def stats(self) -> dict:
+        return {"loads": self.loads, "batches": self.batches}
+
+
+class RequestLoader:
+    """请求内记忆化的加载器，每个请求新建一个"""
+
+    def __init__(self, loader: BatchLoader):
+        self.loader = loader
+        self._memo: Dict[Hashable, Any] = {}
+
+    async def load(self, key: Hashable) -> Any:
+        if key not in self._memo:
+            self._memo[key] = await self.loader.load(key)
+        return self._memo[key]
+
+    async def load_many(self, keys: List[Hashable]) -> List[Any]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
@@ -0,0 +1,141 @@
+# app/utils/pool_metrics.py
+"""
+数据库连接池指标
+
+通过SQLAlchemy连接池事件统计新建连接、回收(recycle)、失效与存活检查失败，
+通过MeteredQueuePool统计获取连接的等待耗时分布，池的占用情况直接读取连接池。
+
+install_idle_pre_ping提供比pool_pre_ping更省的存活检查：只有空闲超过阈值的连接在取出时才PING，
+持续有负载时连接总是刚归还不久，不会给每次取出都多一次往返。
+"""
+import bisect
+import time
+from typing import Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.utils.logger import get_logger
+
+logger = get_logger("app.pool")
+
+# 获取连接等待耗时直方图的桶上界(毫秒)
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+# 连接记录中的字段：info随每次重连清空，record_info在连接记录的整个生命周期内保留
+CONNECTED_AT = "connected_at"  # record_info，当前连接建立的时间(time.time)
+CHECKED_IN_AT = "checked_in_at"  # info
+
+
+class PoolMetrics:
+    """单个连接池的指标"""
+
+    def __init__(self):
+        self.connects = 0
+        self.recycles = 0
+        self.invalidations = 0
+        self.pre_pings = 0
+        self.pre_ping_failures = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def observe_wait(self, seconds: float):
+        self.checkouts += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+        self.wait_buckets[bisect.bisect_left(WAIT_BUCKETS_MS, seconds * 1000)] += 1
+
+    def to_dict(self, pool=None) -> dict:
+        buckets = {f"le_{bound}ms": count for bound, count in zip(WAIT_BUCKETS_MS, self.wait_buckets)}
+        buckets["gt_{}ms".format(WAIT_BUCKETS_MS[-1])] = self.wait_buckets[-1]
+        stats = {
+            "connects": self.connects,
+            "recycles": self.recycles,
+            "invalidations": self.invalidations,
+            "pre_pings": self.pre_pings,
+            "pre_ping_failures": self.pre_ping_failures,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0,
+            "max_wait_ms": round(self.wait_max * 1000, 3),
+            "wait_histogram": buckets,
+        }
+        if pool is not None and hasattr(pool, "checkedout"):
+            stats.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                # 超出pool_size临时新建的连接数，为负表示池尚未建满
+                "overflow": pool.overflow(),
+            })
+        return stats
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """记录获取连接等待耗时的连接池"""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.timeouts += 1
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_wait(time.perf_counter() - start)
+
+    def recreate(self):
+        # engine.dispose()会重建连接池，指标需延续
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def install_pool_metrics(engine, metrics: PoolMetrics):
+    """在同步引擎上注册连接池事件，engine.dispose()重建的连接池同样生效"""
+    if isinstance(engine.pool, MeteredQueuePool):
+        engine.pool.metrics = metrics
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+        now = time.time()
+        connected_at = connection_record.record_info.get(CONNECTED_AT)
+        recycle = engine.pool._recycle
+        if connected_at is not None and recycle > -1 and now - connected_at > recycle:
+            # 连接记录重连且旧连接存活超过pool_recycle，与连接池判断回收的条件一致
+            metrics.recycles += 1
+        connection_record.record_info[CONNECTED_AT] = now
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        connection_record.info[CHECKED_IN_AT] = time.monotonic()
+
+
+def install_idle_pre_ping(engine, metrics: PoolMetrics, idle_seconds: float):
+    """取出连接时只对空闲超过idle_seconds的连接做存活检查，失败时连接池丢弃该连接并重试"""
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get(CHECKED_IN_AT)
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        metrics.pre_pings += 1
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            metrics.pre_ping_failures += 1
+            logger.warning(f"Pre-ping failed on idle connection, reconnecting: {str(e)}")
+            # 连接池收到DisconnectionError后会丢弃该连接并重新获取(最多重试3次)
+            raise exc.DisconnectionError() from e
@@ -0,0 +1,152 @@
+# app/utils/snowflake.py
+"""
+Snowflake风格的唯一编号
+
+编号由毫秒时间戳(41位)、工作节点ID(10位)、毫秒内序号(12位)组成，同一节点内单调递增，
+不同节点ID不同因而全局唯一，无需访问数据库或Redis。时钟回拨或同一毫秒序号用尽时沿用/借用
+逻辑时间继续递增，不阻塞也不重复。
+
+工作节点ID须在同时运行的进程之间唯一：可通过配置指定，或由WorkerIdLease从Redis租用。
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from app.utils.logger import get_logger
+
+logger = get_logger("app.snowflake")
+
+# 自定义纪元 2024-01-01 00:00:00 UTC(毫秒)，41位时间戳可用约69年
+EPOCH_MS = 1704067200000
+WORKER_ID_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_ID_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+# 63位整数的十进制最多19位，补零到定长后字符串顺序与数值顺序一致
+ID_DIGITS = 19
+
+
+class SnowflakeGenerator:
+    """编号生成器，线程安全"""
+
+    def __init__(self, worker_id: Optional[int] = None, epoch_ms: int = EPOCH_MS):
+        self.epoch_ms = epoch_ms
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+        self._day = (0, 0, "")
+        self.worker_id = 0
+        self.configure(worker_id)
+
+    def configure(self, worker_id: Optional[int] = None):
+        """设置工作节点ID，未指定时按进程号取一个(仅适合单机少量进程)"""
+        if worker_id is None:
+            worker_id = os.getpid()
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            worker_id %= MAX_WORKER_ID + 1
+        self.worker_id = worker_id
+
+    def next_id(self) -> int:
+        """下一个整数编号"""
+        with self._lock:
+            now = time.time_ns() // 1_000_000 - self.epoch_ms
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = 0
+            else:
+                # 同一毫秒或时钟回拨：沿用上次的逻辑时间，序号用尽时借用下一毫秒
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    self._last_ms += 1
+                    self._sequence = 0
+            return (self._last_ms << (WORKER_ID_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+    def _date_prefix(self, snowflake_id: int) -> str:
+        """编号时间戳所在日期(本地时间)，同一天内缓存"""
+        ms = (snowflake_id >> (WORKER_ID_BITS + SEQUENCE_BITS)) + self.epoch_ms
+        start, end, prefix = self._day
+        if not start <= ms < end:
+            day = datetime.fromtimestamp(ms / 1000).replace(hour=0, minute=0, second=0, microsecond=0)
+            start = int(day.timestamp() * 1000)
+            end = start + 86400 * 1000
+            prefix = day.strftime("%Y%m%d")
+            self._day = (start, end, prefix)
+        return prefix
+
+    def next_str(self) -> str:
+        """下一个字符串编号：年月日(8位)+定长19位整数编号，共27位，字符串顺序即生成顺序"""
+        snowflake_id = self.next_id()
+        return f"{self._date_prefix(snowflake_id)}{snowflake_id:0{ID_DIGITS}d}"
+
+
+# 订单编号生成器，进程启动时由lifespan配置工作节点ID
+order_numbers = SnowflakeGenerator()
+
+# fork出的子进程继承了父进程的生成器，需按子进程号重新取ID
+os.register_at_fork(after_in_child=lambda: order_numbers.configure())
+
+
+class WorkerIdLease:
+    """从Redis租用工作节点ID：SET NX占用，后台定期续约，租约丢失时重新租用"""
+
+    def __init__(self, redis, generator: SnowflakeGenerator, key_prefix: str = "snowflake:worker:", ttl: int = 60):
+        self.redis = redis
+        self.generator = generator
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+        self.token = f"{os.uname().nodename}:{os.getpid()}:{random.getrandbits(32)}"
+        self.worker_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _key(self, worker_id: int) -> str:
+        return f"{self.key_prefix}{worker_id}"
+
+    async def acquire(self) -> int:
+        """从随机位置开始依次尝试占用一个空闲的ID"""
+        offset = random.randrange(MAX_WORKER_ID + 1)
+        for i in range(MAX_WORKER_ID + 1):
+            worker_id = (offset + i) % (MAX_WORKER_ID + 1)
+            if await self.redis.set(self._key(worker_id), self.token, nx=True, ex=self.ttl):
+                self.worker_id = worker_id
+                self.generator.configure(worker_id)
+                logger.info(f"Leased snowflake worker id {worker_id}")
+                return worker_id
+        raise RuntimeError("No free snowflake worker id")
+
+    async def renew(self):
+        """续约，租约已过期或被占用时重新租用"""
+        key = self._key(self.worker_id)
+        value = await self.redis.get(key)
+        if value is not None and value.decode() == self.token:
+            await self.redis.expire(key, self.ttl)
+            return
+        logger.warning(f"Snowflake worker id {self.worker_id} lease lost, leasing a new one")
+        await self.acquire()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                await self.renew()
+            except Exception as e:
+                logger.error(f"Error renewing snowflake worker id lease: {str(e)}")
+
+    async def start(self):
+        """租用ID并启动续约任务"""
+        await self.acquire()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止续约。租约不主动释放，过期前该ID不会被重启后的进程复用，避免与本进程最后一毫秒的编号重复"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,201 @@
+"""
+缓存编解码基准：比较不同编码方式下景点缓存值的大小与编解码耗时
+
+用法:
+    python -m benchmarks.cache_codec_bench            # 使用按真实表结构生成的景点数据
+    python -m benchmarks.cache_codec_bench --from-db  # 从数据库读取真实景点数据
+
+"命中路径"一列是缓存命中时得到可直接返回的JSON响应体所需的耗时：
+存储JSON字节的方案只需解码(解压)，二进制格式还需要反序列化后重新编码为JSON。
+"""
+import argparse
+import asyncio
+import json
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from pydantic_core import to_json
+
+from app.cache.codec import RawCodec, ZlibCodec
+from app.sight.schemas import SightResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def make_sight(sight_id: int) -> SightResponse:
+    """按sight/sight_profile/sight_ticket表结构生成一条景点数据"""
+    now = datetime(2025, 5, 1, 10, 0, 0)
+    content = "景区介绍：" + "这里山清水秀，历史悠久，是国家5A级旅游景区。" * 60
+    attention = "注意事项：" + "请游客文明游览，爱护景区环境，不要攀爬文物。" * 20
+    tickets = [
+        {
+            "id": sight_id * 10 + i,
+            "name": f"成人票{i}",
+            "desc": "含景区大门票，不含索道",
+            "type": "成人",
+            "price": 120.0 + i,
+            "discount": 0.9,
+            "total": 1000,
+            "remain": 800 - i,
+            "expire_date": None,
+            "return_policy": "游玩日前一天可免费退",
+            "is_valid": True,
+            "created_at": now,
+            "updated_at": now + timedelta(days=i),
+        }
+        for i in range(3)
+    ]
+    return SightResponse.model_validate({
+        "id": sight_id,
+        "name": f"西湖风景区{sight_id}",
+        "desc": "人间天堂，淡妆浓抹总相宜",
+        "main_img": f"/media/202504/static/sight/h{sight_id % 12 + 1}.jpg",
+        "banner_img": f"/media/202504/static/sight_detail/h{sight_id % 12 + 1}_max.jpg",
+        "content": content,
+        "score": 4.8,
+        "min_price": 120.0,
+        "province": "浙江省",
+        "city": "杭州市",
+        "area": "西湖区",
+        "town": "北山街道",
+        "is_top": sight_id % 3 == 0,
+        "is_hot": sight_id % 2 == 0,
+        "is_valid": True,
+        "created_at": now,
+        "updated_at": now,
+        "profile": {
+            "id": sight_id,
+            "sight_id": sight_id,
+            "img": "/media/202504/static/home/sight/h1.jpg",
+            "address": "浙江省杭州市西湖区龙井路1号",
+            "explain": "开放时间内可自由游览",
+            "open_time": "08:00-17:30",
+            "tel": "0571-87179617",
+            "level": "5A",
+            "tags": "自然风光,人文古迹",
+            "attention": attention,
+            "location": "120.15,30.25",
+        },
+        "tickets": tickets,
+    })
+
+
+async def load_sights_from_db(limit: int):
+    from app.database import AsyncSessionLocal, init_db_engines
+    from app.sight.services import get_sight_async, get_sight_by_id_async
+
+    init_db_engines()
+    async with AsyncSessionLocal() as db:
+        # 列表查询只加载卡片字段，逐个按详情查询得到完整景点
+        sights = await get_sight_async(db, limit=limit)
+        return [SightResponse.model_validate(await get_sight_by_id_async(db, sight.id)) for sight in sights]
+
+
+def envelope(data):
+    return {"code": 200, "message": "success", "data": data, "pagination": None}
+
+
+def timeit(fn, repeat: int) -> float:
+    """单次调用平均耗时(微秒)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def bench(payload, repeat: int):
+    """payload为景点模型或景点模型列表，返回各方案的(名称, 字节数, 编码耗时, 命中路径耗时)"""
+    results = []
+    body = to_json(envelope(payload))
+
+    def json_encode():
+        dumped = [s.model_dump() for s in payload] if isinstance(payload, list) else payload.model_dump()
+        return json.dumps(dumped, default=lambda o: o.isoformat()).encode("utf-8")
+
+    stored = json_encode()
+    results.append((
+        "json(DateTimeEncoder)+解析+重新编码",
+        len(stored),
+        timeit(json_encode, repeat),
+        timeit(lambda: to_json(envelope(json.loads(stored))), repeat),
+    ))
+
+    for name, codec in [
+        ("json字节(raw)", RawCodec()),
+        ("json字节+zlib-1", ZlibCodec(threshold=0, level=1)),
+        ("json字节+zlib-6", ZlibCodec(threshold=0, level=6)),
+        ("json字节+zlib-9", ZlibCodec(threshold=0, level=9)),
+    ]:
+        stored = codec.encode(body)
+        results.append((
+            name,
+            len(stored),
+            timeit(lambda: codec.encode(to_json(envelope(payload))), repeat),
+            timeit(lambda: codec.decode(stored), repeat),
+        ))
+
+    plain = json.loads(body)
+    if orjson is not None:
+        stored = orjson.dumps(plain)
+        results.append((
+            "orjson",
+            len(stored),
+            timeit(lambda: orjson.dumps(plain), repeat),
+            timeit(lambda: stored, repeat),
+        ))
+    if msgpack is not None:
+        stored = msgpack.packb(plain)
+        results.append((
+            "msgpack+重新编码",
+            len(stored),
+            timeit(lambda: msgpack.packb(plain), repeat),
+            timeit(lambda: to_json(msgpack.unpackb(stored)), repeat),
+        ))
+        packed = zlib.compress(stored, 6)
+        results.append((
+            "msgpack+zlib-6+重新编码",
+            len(packed),
+            timeit(lambda: zlib.compress(msgpack.packb(plain), 6), repeat),
+            timeit(lambda: to_json(msgpack.unpackb(zlib.decompress(packed))), repeat),
+        ))
+    return results
+
+
+def print_results(title: str, results):
+    print(f"\n{title}")
+    print(f"{'方案':<36}{'字节数':>10}{'编码(us)':>12}{'命中路径(us)':>14}")
+    for name, size, encode_us, hit_us in results:
+        print(f"{name:<36}{size:>10}{encode_us:>12.1f}{hit_us:>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from-db", action="store_true", help="从数据库读取景点数据")
+    parser.add_argument("--rows", type=int, default=6, help="列表缓存包含的景点数")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.from_db:
+        sights = asyncio.run(load_sights_from_db(args.rows))
+        if not sights:
+            raise SystemExit("数据库中没有景点数据")
+    else:
+        sights = [make_sight(i) for i in range(1, args.rows + 1)]
+
+    print_results("景点详情(单条)", bench(sights[0], args.repeat))
+    print_results(f"景点列表({len(sights)}条)", bench(sights, args.repeat))
+    if orjson is None or msgpack is None:
+        print("\n未安装orjson或msgpack，对应方案已跳过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Redis门票库存基准：对同一张门票发起大量预占，统计吞吐并验证不会超卖、重新计算后库存一致
+
+用法(需要Redis与MySQL):
+    python -m benchmarks.inventory_bench                                   # 10万次预占抢1万张
+    python -m benchmarks.inventory_bench --attempts 200000 --stock 50000 --processes 8
+
+在配置的主库中创建一个临时景点与门票并加载到Redis，--processes个进程各以--concurrency个协程
+并发调用TicketInventory.reserve(单个事件循环受限于Python本身，多进程才能压到Redis的上限)。
+结束后校验：成功预占数 = min(预占次数, 初始余量 // 每次数量)，Redis余量 = 初始余量 - 预占数；
+再按数据库重新计算一次(预占未确认，没有订单)，校验sight_ticket.remain为初始余量、
+Redis余量仍扣除了预占中的数量；最后归还全部预占，Redis余量恢复为初始余量。测试数据在结束后删除。
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy.future import select
+
+from app.database import PrimarySessionLocal, init_db_engines, create_redis_pool, create_redis_client, close_redis_pool
+from app.tickets.inventory import TicketInventory, TRACKED_KEY, DIRTY_KEY, stock_key, held_key, sold_key
+from app.tickets.models import Ticket
+from benchmarks.order_concurrency_bench import create_fixture, cleanup
+
+
+async def _reserve_worker(ticket_id: int, attempts: int, quantity: int, concurrency: int):
+    redis = create_redis_client(create_redis_pool())
+    inventory = TicketInventory(redis, PrimarySessionLocal)
+    outcomes: Counter = Counter()
+    holds = []
+    remaining = iter(range(attempts))
+
+    async def attempt():
+        for _ in remaining:
+            try:
+                hold_id = uuid.uuid4().hex
+                if await inventory.reserve(hold_id, {ticket_id: quantity}) is None:
+                    outcomes["success"] += 1
+                    holds.append(hold_id)
+                else:
+                    outcomes["sold_out"] += 1
+            except Exception as e:
+                outcomes[f"error: {type(e).__name__}"] += 1
+
+    try:
+        await asyncio.gather(*(attempt() for _ in range(concurrency)))
+    finally:
+        await close_redis_pool(redis)
+    return outcomes, holds
+
+
+def reserve_process(ticket_id: int, attempts: int, quantity: int, concurrency: int):
+    return asyncio.run(_reserve_worker(ticket_id, attempts, quantity, concurrency))
+
+
+async def run(attempts: int, stock: int, quantity: int, processes: int, concurrency: int) -> bool:
+    engine = init_db_engines()
+    redis = create_redis_client(create_redis_pool())
+    inventory = TicketInventory(redis, PrimarySessionLocal)
+    ticket_id = await create_fixture(stock)
+    outcomes: Counter = Counter()
+    holds = []
+    try:
+        await inventory.load([ticket_id])
+        loop = asyncio.get_running_loop()
+        shares = [attempts // processes + (1 if i < attempts % processes else 0) for i in range(processes)]
+        start = time.perf_counter()
+        with ProcessPoolExecutor(processes) as pool:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(pool, reserve_process, ticket_id, share, quantity, concurrency)
+                for share in shares
+            ))
+        elapsed = time.perf_counter() - start
+        for result, worker_holds in results:
+            outcomes.update(result)
+            holds.extend(worker_holds)
+
+        redis_stock = await inventory.stock(ticket_id)
+        await inventory.load([ticket_id])
+        reseeded_stock = await inventory.stock(ticket_id)
+        async with PrimarySessionLocal() as db:
+            remain = (await db.execute(select(Ticket.remain).where(Ticket.id == ticket_id))).scalar_one()
+        while holds:
+            await inventory.release(holds.pop(), {ticket_id: quantity})
+        released_stock = await inventory.stock(ticket_id)
+    finally:
+        # 中途出错时归还剩余的预占
+        for hold_id in holds:
+            await inventory.release(hold_id, {ticket_id: quantity})
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.delete(stock_key(ticket_id), held_key(ticket_id), sold_key(ticket_id))
+            pipe.srem(TRACKED_KEY, ticket_id)
+            pipe.srem(DIRTY_KEY, ticket_id)
+            await pipe.execute()
+        await close_redis_pool(redis)
+        await cleanup(ticket_id)
+        await engine.dispose()
+
+    sold = outcomes["success"] * quantity
+    print(f"{processes}个进程x{concurrency}并发，{attempts}次预占，每次{quantity}张，初始余量{stock}")
+    print(f"耗时{elapsed:.2f}s，{attempts / elapsed:.0f}次/秒")
+    print(f"结果: {dict(outcomes)}")
+    print(f"Redis余量 {redis_stock}，重新计算后Redis余量 {reseeded_stock}、数据库余量 {remain}，预占 {sold} 张")
+    print(f"归还全部预占后Redis余量 {released_stock}")
+    ok = (
+        outcomes["success"] == min(attempts, stock // quantity)
+        and redis_stock == stock - sold
+        and reseeded_stock == redis_stock
+        and remain == stock
+        and released_stock == stock
+    )
+    print("未超卖，重新计算与归还后库存一致" if ok else "校验失败：余量不一致")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attempts", type=int, default=100000)
+    parser.add_argument("--stock", type=int, default=10000)
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=32, help="每个进程的并发协程数，不超过Redis连接池容量")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args.attempts, args.stock, args.quantity, args.processes, args.concurrency)) else 1)
+
+
+if __name__ == "__main__":
+    main()
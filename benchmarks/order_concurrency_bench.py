@@ -0,0 +1,118 @@
+"""
+下单并发基准：大量买家同时抢购同一张门票，验证不会超卖并统计吞吐
+
+用法(需要MySQL，条件更新的行锁语义依赖InnoDB):
+    python -m benchmarks.order_concurrency_bench                          # 2000个买家抢500张
+    python -m benchmarks.order_concurrency_bench --buyers 5000 --stock 1000 --quantity 2
+
+在配置的主库中创建一个临时景点与门票，所有买家并发调用create_order_async，
+结束后校验：成功订单的购买总数 = 初始余量 - 最终余量，最终余量不为负，订单项数与成功订单数一致。
+--db-concurrency限制同时占用的数据库连接数(不超过连接池容量)，其余买家排队等待连接。
+测试数据在结束后删除。
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import delete, func
+from sqlalchemy.future import select
+
+from app.database import PrimarySessionLocal, init_db_engines
+from app.order.models import Order, OrderItem, Visitor
+from app.order.schemas import OrderCreate
+from app.order.services import InsufficientStockError, create_order_async
+from app.sight.models import Sight
+from app.tickets.models import Ticket
+
+BENCH_USER_ID = 0
+
+
+async def create_fixture(stock: int) -> int:
+    async with PrimarySessionLocal() as db:
+        sight = Sight(name="并发下单基准", desc="", main_img="", banner_img="", content="", province="", city="")
+        db.add(sight)
+        await db.flush()
+        ticket = Ticket(sight_id=sight.id, name="基准门票", price=100, discount=1, total=stock, remain=stock, is_valid=True)
+        db.add(ticket)
+        await db.commit()
+        return ticket.id
+
+
+async def cleanup(ticket_id: int):
+    async with PrimarySessionLocal() as db:
+        sight_id = (await db.execute(select(Ticket.sight_id).where(Ticket.id == ticket_id))).scalar_one()
+        order_ids = (await db.execute(select(OrderItem.order_id).where(OrderItem.ticket_id == ticket_id))).scalars().all()
+        await db.execute(delete(OrderItem).where(OrderItem.ticket_id == ticket_id))
+        if order_ids:
+            await db.execute(delete(Visitor).where(Visitor.order_id.in_(order_ids)))
+            await db.execute(delete(Order).where(Order.id.in_(order_ids)))
+        await db.execute(delete(Ticket).where(Ticket.id == ticket_id))
+        await db.execute(delete(Sight).where(Sight.id == sight_id))
+        await db.commit()
+
+
+async def buyer(ticket_id: int, quantity: int, semaphore: asyncio.Semaphore, outcomes: Counter):
+    order_data = OrderCreate(
+        items=[{"ticket_id": ticket_id, "quantity": quantity, "visit_date": date.today()}],
+        contact_name="基准",
+        contact_phone="13800000000",
+    )
+    async with semaphore:
+        async with PrimarySessionLocal() as db:
+            try:
+                await create_order_async(db, BENCH_USER_ID, order_data)
+                outcomes["success"] += 1
+            except InsufficientStockError:
+                outcomes["sold_out"] += 1
+            except Exception as e:
+                outcomes[f"error: {type(e).__name__}"] += 1
+
+
+async def run(buyers: int, stock: int, quantity: int, db_concurrency: int) -> bool:
+    engine = init_db_engines()
+    ticket_id = await create_fixture(stock)
+    outcomes: Counter = Counter()
+    try:
+        semaphore = asyncio.Semaphore(db_concurrency)
+        start = time.perf_counter()
+        await asyncio.gather(*(buyer(ticket_id, quantity, semaphore, outcomes) for _ in range(buyers)))
+        elapsed = time.perf_counter() - start
+
+        async with PrimarySessionLocal() as db:
+            remain = (await db.execute(select(Ticket.remain).where(Ticket.id == ticket_id))).scalar_one()
+            sold, items = (await db.execute(
+                select(func.coalesce(func.sum(OrderItem.quantity), 0), func.count())
+                .where(OrderItem.ticket_id == ticket_id)
+            )).one()
+    finally:
+        await cleanup(ticket_id)
+        await engine.dispose()
+
+    print(f"{buyers}个买家，每人{quantity}张，初始余量{stock}，耗时{elapsed:.2f}s，{buyers / elapsed:.0f}单/秒")
+    print(f"结果: {dict(outcomes)}")
+    print(f"最终余量 {remain}，订单项售出 {sold} 张/{items} 项")
+    ok = (
+        remain >= 0
+        and stock - remain == sold == outcomes["success"] * quantity
+        and items == outcomes["success"]
+        and outcomes["success"] == min(buyers, stock // quantity)
+    )
+    print("未超卖，余量与订单一致" if ok else "校验失败：余量与订单不一致")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buyers", type=int, default=2000)
+    parser.add_argument("--stock", type=int, default=500)
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--db-concurrency", type=int, default=25)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args.buyers, args.stock, args.quantity, args.db_concurrency)) else 1)
+
+
+if __name__ == "__main__":
+    main()
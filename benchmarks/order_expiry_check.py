@@ -0,0 +1,96 @@
+"""
+未支付订单超时取消检查：下单后让订单到期，验证订单被取消、余量全部归还，且重复处理不会重复归还
+
+用法(需要Redis与MySQL):
+    python -m benchmarks.order_expiry_check                     # 500单，每批200
+    python -m benchmarks.order_expiry_check --orders 2000 --batch 500
+
+在配置的主库中创建临时景点与门票，按数据库扣减方式下单并加入独立的检查用延时队列，
+以未来的时间领取全部订单并取消；随后把订单重新加入队列再处理一遍，模拟进程崩溃后的重复投递。
+校验：所有订单状态为已取消，门票余量恢复为初始值。测试数据在结束后删除。
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from app.database import PrimarySessionLocal, init_db_engines, create_redis_pool, create_redis_client, close_redis_pool
+from app.order.expiry import OrderExpiryQueue
+from app.order.models import Order, OrderItem
+from app.order.schemas import OrderCreate
+from app.order.services import create_order_async
+from app.tickets.models import Ticket
+from benchmarks.order_concurrency_bench import BENCH_USER_ID, create_fixture, cleanup
+
+CHECK_KEY = "bench:order:expiry"
+
+
+async def drain(expiry: OrderExpiryQueue, now: float) -> float:
+    start = time.perf_counter()
+    while await expiry.process(now):
+        pass
+    return time.perf_counter() - start
+
+
+async def run(orders: int, batch: int) -> bool:
+    engine = init_db_engines()
+    redis = create_redis_client(create_redis_pool())
+    expiry = OrderExpiryQueue(redis, PrimarySessionLocal, timeout=0, batch_size=batch, key=CHECK_KEY)
+    ticket_id = await create_fixture(orders)
+    try:
+        await redis.delete(CHECK_KEY)
+        order_data = OrderCreate(
+            items=[{"ticket_id": ticket_id, "quantity": 1, "visit_date": date.today()}],
+            contact_name="基准",
+            contact_phone="13800000000",
+        )
+        order_ids = []
+        for _ in range(orders):
+            async with PrimarySessionLocal() as db:
+                order, _, _ = await create_order_async(db, BENCH_USER_ID, order_data, expiry=expiry)
+                order_ids.append(order.id)
+
+        future = time.time() + 3600
+        elapsed = await drain(expiry, future)
+        first = expiry.cancelled
+        # 重复投递：已取消的订单不应再次归还余量
+        await redis.zadd(CHECK_KEY, {order_id: 0 for order_id in order_ids})
+        await drain(expiry, future)
+
+        async with PrimarySessionLocal() as db:
+            remain = (await db.execute(select(Ticket.remain).where(Ticket.id == ticket_id))).scalar_one()
+            cancelled = (await db.execute(
+                select(func.count()).select_from(Order)
+                .where(Order.id.in_(order_ids), Order.status == Order.STATUS_CANCELLED)
+            )).scalar_one()
+            items = (await db.execute(
+                select(func.count()).select_from(OrderItem).where(OrderItem.ticket_id == ticket_id)
+            )).scalar_one()
+        queued = await redis.zcard(CHECK_KEY)
+    finally:
+        await redis.delete(CHECK_KEY)
+        await close_redis_pool(redis)
+        await cleanup(ticket_id)
+        await engine.dispose()
+
+    print(f"{orders}单，每批{batch}，首次取消{first}单，耗时{elapsed:.2f}s，{first / elapsed:.0f}单/秒")
+    print(f"重复投递后共取消{expiry.cancelled}单，已取消订单{cancelled}/{items}，余量{remain}/{orders}，队列剩余{queued}")
+    ok = first == orders == cancelled == items and expiry.cancelled == orders and remain == orders and queued == 0
+    print("订单全部取消，余量恰好归还一次" if ok else "校验失败")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=200)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args.orders, args.batch)) else 1)
+
+
+if __name__ == "__main__":
+    main()
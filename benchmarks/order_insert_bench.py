@@ -0,0 +1,167 @@
+"""
+订单写入基准：比较逐行ORM写入(调整前)与多行INSERT(调整后)在不同游客数下的语句往返次数与耗时
+
+用法:
+    python -m benchmarks.order_insert_bench                     # 配置的主库(MySQL)，游客数1/10/100
+    python -m benchmarks.order_insert_bench --orders 200 --visitors 1 10 100
+    python -m benchmarks.order_insert_bench --sqlite            # 内存SQLite(需安装aiosqlite)
+
+往返次数通过before_cursor_execute事件统计每单执行的语句数(executemany计为一次，不含COMMIT)。
+MySQL没有RETURNING，调整前ORM为取回自增ID对每个订单项、游客各执行一条INSERT；
+SQLite支持RETURNING，ORM本身已能批量写入，两者差距会小于MySQL，耗时也不含网络延迟，仅供参考。
+在MySQL上运行时测试数据在结束后删除。
+"""
+import argparse
+import asyncio
+import time
+from datetime import date, datetime
+
+from sqlalchemy import delete, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, PrimarySessionLocal, init_db_engines
+from app.order.models import Order, OrderItem, Visitor
+from app.order.schemas import OrderCreate
+from app.order.services import _decrement_remain, _load_tickets, _merge_quantities, _place_order
+from app.sight.models import Sight
+from app.tickets.models import Ticket
+
+BENCH_USER_ID = 0
+# 每单订单项数
+ITEMS_PER_ORDER = 3
+
+
+async def old_place_order(db, user_id, order_data, tickets, quantities):
+    """调整前的写法：ORM逐个添加订单项与游客后flush"""
+    now = datetime.now()
+    items = []
+    for item in order_data.items:
+        name, price = tickets[item.ticket_id]
+        items.append(OrderItem(
+            ticket_id=item.ticket_id, ticket_name=name, price=price, quantity=item.quantity,
+            amount=price * item.quantity, visit_date=item.visit_date, created_at=now,
+        ))
+    order = Order(
+        order_number=Order.generate_order_number(), user_id=user_id,
+        total_amount=float(sum(item.amount for item in items)), status=Order.STATUS_PENDING,
+        contact_name=order_data.contact_name, contact_phone=order_data.contact_phone,
+        remark=order_data.remark, created_at=now,
+    )
+    db.add(order)
+    await db.flush()
+    visitors = [
+        Visitor(order_id=order.id, name=visitor.name, id_card=visitor.id_card, phone=visitor.phone, created_at=now)
+        for visitor in order_data.visitors
+    ]
+    for item in items:
+        item.order_id = order.id
+    db.add_all(items + visitors)
+    await db.flush()
+    await _decrement_remain(db, quantities)
+    await db.commit()
+    return order, items, visitors
+
+
+def make_order(ticket_ids, visitors: int) -> OrderCreate:
+    return OrderCreate(
+        items=[{"ticket_id": ticket_id, "quantity": 1, "visit_date": date.today()} for ticket_id in ticket_ids],
+        visitors=[
+            {"name": f"游客{i}", "id_card": f"{i:018d}", "phone": "13800000000"}
+            for i in range(visitors)
+        ],
+        contact_name="基准",
+        contact_phone="13800000000",
+    )
+
+
+async def create_fixture(session_factory, stock: int):
+    async with session_factory() as db:
+        sight = Sight(name="订单写入基准", desc="", main_img="", banner_img="", content="", province="", city="")
+        db.add(sight)
+        await db.flush()
+        tickets = [
+            Ticket(sight_id=sight.id, name=f"基准门票{i}", price=100, discount=1, total=stock, remain=stock, is_valid=True)
+            for i in range(ITEMS_PER_ORDER)
+        ]
+        db.add_all(tickets)
+        await db.commit()
+        return sight.id, [ticket.id for ticket in tickets]
+
+
+async def cleanup(session_factory, sight_id: int, ticket_ids):
+    async with session_factory() as db:
+        order_ids = (await db.execute(
+            select(OrderItem.order_id).where(OrderItem.ticket_id.in_(ticket_ids))
+        )).scalars().all()
+        if order_ids:
+            await db.execute(delete(Visitor).where(Visitor.order_id.in_(order_ids)))
+            await db.execute(delete(OrderItem).where(OrderItem.order_id.in_(order_ids)))
+            await db.execute(delete(Order).where(Order.id.in_(order_ids)))
+        await db.execute(delete(Ticket).where(Ticket.id.in_(ticket_ids)))
+        await db.execute(delete(Sight).where(Sight.id == sight_id))
+        await db.commit()
+
+
+async def time_orders(session_factory, place, order_data: OrderCreate, orders: int, counter: list):
+    """返回(每单语句数, 每单耗时毫秒)，每单使用新会话"""
+    quantities = _merge_quantities(order_data)
+    async with session_factory() as db:
+        tickets = await _load_tickets(db, quantities)
+    counter[0] = 0
+    start = time.perf_counter()
+    for _ in range(orders):
+        async with session_factory() as db:
+            order, items, visitors = await place(db, BENCH_USER_ID, order_data, tickets, quantities)
+            assert len(items) == len(order_data.items) and len(visitors) == len(order_data.visitors)
+            assert all(visitor.id for visitor in visitors)
+    elapsed = time.perf_counter() - start
+    return counter[0] / orders, elapsed / orders * 1000
+
+
+async def bench(orders: int, visitor_counts, sqlite: bool):
+    if sqlite:
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[
+                Sight.__table__, Ticket.__table__, Order.__table__, OrderItem.__table__, Visitor.__table__,
+            ])
+        session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    else:
+        engine = init_db_engines()
+        session_factory = PrimarySessionLocal
+
+    counter = [0]
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        counter[0] += 1
+
+    stock = orders * 2 * len(visitor_counts) + 10
+    sight_id, ticket_ids = await create_fixture(session_factory, stock)
+    try:
+        print(f"每单{ITEMS_PER_ORDER}个订单项，每种情况{orders}单")
+        print(f"{'游客数':>6}{'方式':>8}{'每单语句数':>12}{'每单耗时(ms)':>14}")
+        for visitors in visitor_counts:
+            order_data = make_order(ticket_ids, visitors)
+            for label, place in (("调整前", old_place_order), ("调整后", _place_order)):
+                statements, ms = await time_orders(session_factory, place, order_data, orders, counter)
+                print(f"{visitors:>6}{label:>8}{statements:>12.1f}{ms:>14.2f}")
+    finally:
+        await cleanup(session_factory, sight_id, ticket_ids)
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--visitors", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--sqlite", action="store_true", help="使用内存SQLite")
+    args = parser.parse_args()
+    asyncio.run(bench(args.orders, args.visitors, args.sqlite))
+
+
+if __name__ == "__main__":
+    main()
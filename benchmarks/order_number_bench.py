@@ -0,0 +1,88 @@
+"""
+订单编号基准：多进程同时生成订单编号，验证全局唯一、进程内有序、长度不超过列宽，并统计吞吐
+
+用法:
+    python -m benchmarks.order_number_bench                           # 8个进程各生成20万个
+    python -m benchmarks.order_number_bench --processes 16 --count 500000
+    python -m benchmarks.order_number_bench --lease                   # 工作节点ID从Redis租用(需要Redis)
+
+每个进程使用与线上相同的方式取得工作节点ID(默认按进程序号指定，--lease时走WorkerIdLease)，
+同时以旧算法(年月日时分秒+4位随机数)生成同样数量的编号作对比，统计其重复数。
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Tuple
+
+from app.utils.snowflake import SnowflakeGenerator, WorkerIdLease
+
+# order.order_number列宽
+ORDER_NUMBER_LENGTH = 32
+
+
+def legacy_order_number() -> str:
+    """旧算法，仅用于对比"""
+    now = datetime.now()
+    return now.strftime('%Y%m%d%H%M%S') + ''.join(random.choice('0123456789') for _ in range(4))
+
+
+async def _lease_worker_id(generator: SnowflakeGenerator) -> WorkerIdLease:
+    from app.database import create_redis_client, create_redis_pool
+    lease = WorkerIdLease(create_redis_client(create_redis_pool()), generator, key_prefix="bench:order:worker:", ttl=60)
+    await lease.acquire()
+    return lease
+
+
+def generate(index: int, count: int, lease: bool) -> Tuple[List[str], float, List[str], float]:
+    generator = SnowflakeGenerator(index)
+    if lease:
+        asyncio.run(_lease_worker_id(generator))
+    start = time.perf_counter()
+    numbers = [generator.next_str() for _ in range(count)]
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy = [legacy_order_number() for _ in range(count)]
+    legacy_elapsed = time.perf_counter() - start
+    return numbers, elapsed, legacy, legacy_elapsed
+
+
+def run(processes: int, count: int, lease: bool) -> bool:
+    with ProcessPoolExecutor(processes) as pool:
+        results = list(pool.map(generate, range(processes), [count] * processes, [lease] * processes))
+
+    total = processes * count
+    numbers = [number for result in results for number in result[0]]
+    legacy = [number for result in results for number in result[2]]
+    per_process = sum(result[1] for result in results) / processes
+    legacy_per_process = sum(result[3] for result in results) / processes
+
+    unique = len(set(numbers))
+    ordered = all(result[0] == sorted(result[0]) for result in results)
+    max_length = max(len(number) for number in numbers)
+    legacy_duplicates = total - len(set(legacy))
+
+    print(f"{processes}个进程各生成{count}个，共{total}个，示例 {numbers[0]}")
+    print(f"Snowflake: 单进程{count / per_process:,.0f}个/秒，合计约{total / per_process:,.0f}个/秒，"
+          f"重复{total - unique}个，进程内有序: {ordered}，最大长度{max_length}")
+    print(f"旧算法:    单进程{count / legacy_per_process:,.0f}个/秒，重复{legacy_duplicates}个")
+    ok = unique == total and ordered and max_length <= ORDER_NUMBER_LENGTH
+    print("编号全局唯一、有序且不超过列宽" if ok else "校验失败")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--count", type=int, default=200000)
+    parser.add_argument("--lease", action="store_true", help="工作节点ID从Redis租用")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.processes, args.count, args.lease) else 1)
+
+
+if __name__ == "__main__":
+    main()
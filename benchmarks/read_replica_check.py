@@ -0,0 +1,88 @@
+"""
+读写分离本地验证：用两个SQLite文件分别充当主库与从库，验证语句路由、读己之写与从库健康检查
+
+用法(需安装aiosqlite):
+    python -m benchmarks.read_replica_check
+
+主库与从库之间没有复制，只写入主库的数据在从库中不可见，借此判断每次读取实际走了哪个库。
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+WORKDIR = tempfile.mkdtemp(prefix="replica_check_")
+os.environ["DATABASE_PRIMARY_URL"] = f"sqlite+aiosqlite:///{os.path.join(WORKDIR, 'primary.db')}"
+os.environ["DATABASE_REPLICA_URLS"] = ",".join([
+    f"sqlite+aiosqlite:///{os.path.join(WORKDIR, 'replica.db')}",
+    # 不存在的目录，健康检查应将其移出读取轮询
+    f"sqlite+aiosqlite:///{os.path.join(WORKDIR, 'missing', 'replica.db')}",
+])
+
+from sqlalchemy import func  # noqa: E402
+from sqlalchemy.future import select  # noqa: E402
+
+from app.database import (  # noqa: E402
+    AsyncSessionLocal,
+    PrimarySessionLocal,
+    USE_PRIMARY,
+    Base,
+    init_db_engines,
+    replicas,
+)
+from app.sight.models import Sight  # noqa: E402
+import app.tickets.models  # noqa: E402,F401  注册Sight.tickets关系引用的Ticket模型
+
+
+async def count_sights(session) -> int:
+    return (await session.execute(select(func.count()).select_from(Sight))).scalar_one()
+
+
+def check(label: str, ok: bool):
+    print(f"[{'OK' if ok else 'FAIL'}] {label}")
+    return ok
+
+
+async def run() -> bool:
+    async_engine = init_db_engines()
+    for engine in [async_engine, replicas.engines[0]]:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[Sight.__table__])
+
+    results = []
+    await replicas.check()
+    results.append(check("不可用的从库被移出读取轮询", replicas.stats() == {"replicas": 2, "healthy": 1}))
+
+    async with PrimarySessionLocal() as db:
+        db.add(Sight(name="西湖", desc="", main_img="", banner_img="", content="", province="浙江省", city="杭州市"))
+        await db.commit()
+
+    async with AsyncSessionLocal() as db:
+        results.append(check("普通读取走从库(看不到只写入主库的数据)", await count_sights(db) == 0))
+
+    async with AsyncSessionLocal() as db:
+        db.info[USE_PRIMARY] = True
+        results.append(check("读己之写窗口内的读取走主库", await count_sights(db) == 1))
+
+    async with AsyncSessionLocal() as db:
+        db.add(Sight(name="灵隐寺", desc="", main_img="", banner_img="", content="", province="浙江省", city="杭州市"))
+        await db.commit()
+    async with PrimarySessionLocal() as db:
+        results.append(check("读取会话中的写入(flush)走主库", await count_sights(db) == 2))
+
+    replicas.healthy = []
+    async with AsyncSessionLocal() as db:
+        results.append(check("没有健康从库时读取退回主库", await count_sights(db) == 2))
+
+    for engine in replicas.engines:
+        await engine.dispose()
+    await async_engine.dispose()
+    return all(results)
+
+
+def main():
+    sys.exit(0 if asyncio.run(run()) else 1)
+
+
+if __name__ == "__main__":
+    main()
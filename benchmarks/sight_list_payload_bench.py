@@ -0,0 +1,83 @@
+"""
+景点列表响应基准：比较列表接口返回完整景点(SightResponse)与卡片字段(SightListItem)的
+响应体大小、序列化耗时，以及(--from-db时)两种查询的数据库耗时
+
+用法:
+    python -m benchmarks.sight_list_payload_bench            # 使用按真实表结构生成的景点数据
+    python -m benchmarks.sight_list_payload_bench --from-db  # 同时测量真实数据库中的查询耗时
+"""
+import argparse
+import asyncio
+import time
+
+from pydantic_core import to_json
+
+from app.sight.schemas import SightListItem, SightResponse
+from benchmarks.cache_codec_bench import envelope, make_sight, timeit
+
+
+def bench_payload(sights, repeat: int):
+    """返回各方案的(名称, 响应体字节数, 校验+序列化耗时)"""
+    results = []
+    for name, schema in [("完整景点(SightResponse)", SightResponse), ("卡片字段(SightListItem)", SightListItem)]:
+        def encode():
+            return to_json(envelope([schema.model_validate(sight) for sight in sights]))
+        results.append((name, len(encode()), timeit(encode, repeat)))
+    return results
+
+
+async def bench_queries(rows: int, repeat: int):
+    """返回(完整查询耗时, 卡片查询耗时)，单位毫秒，以及卡片查询得到的景点"""
+    from sqlalchemy.future import select
+    from sqlalchemy.orm import selectinload
+
+    from app.database import AsyncSessionLocal, init_db_engines
+    from app.sight.models import Sight
+    from app.sight.services import get_sight_async
+
+    async def full_query(db):
+        # 调整前列表接口使用的查询
+        query = select(Sight).options(selectinload(Sight.profile), selectinload(Sight.tickets)).limit(rows)
+        return (await db.execute(query)).scalars().all()
+
+    async def list_query(db):
+        return await get_sight_async(db, limit=rows)
+
+    async_engine = init_db_engines()
+    timings = []
+    sights = []
+    for query in (full_query, list_query):
+        elapsed = 0.0
+        for _ in range(repeat):
+            # 每次使用新会话，避免身份映射中已加载的对象影响结果
+            async with AsyncSessionLocal() as db:
+                start = time.perf_counter()
+                sights = await query(db)
+                elapsed += time.perf_counter() - start
+        timings.append(elapsed / repeat * 1000)
+    await async_engine.dispose()
+    return timings[0], timings[1], len(sights)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from-db", action="store_true", help="测量真实数据库中的查询耗时")
+    parser.add_argument("--rows", type=int, default=6, help="每页景点数")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    sights = [make_sight(i) for i in range(1, args.rows + 1)]
+    print(f"\n景点列表({len(sights)}条)")
+    print(f"{'方案':<28}{'字节数':>10}{'序列化(us)':>14}")
+    for name, size, encode_us in bench_payload(sights, args.repeat):
+        print(f"{name:<28}{size:>10}{encode_us:>14.1f}")
+
+    if args.from_db:
+        full_ms, list_ms, count = asyncio.run(bench_queries(args.rows, max(args.repeat // 10, 1)))
+        print(f"\n数据库查询({count}条)")
+        print(f"{'完整景点+详情+门票':<28}{full_ms:>10.2f}ms")
+        print(f"{'卡片字段(load_only)':<28}{list_ms:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+景点搜索基准：比较逐行模糊匹配(LIKE)与ngram全文索引(MATCH ... AGAINST)在不同数据量下的耗时
+
+用法:
+    python -m benchmarks.sight_search_bench                          # 1万、10万、100万条
+    python -m benchmarks.sight_search_bench --sizes 10000 50000 --keep
+
+在配置的MySQL库中建立独立的sight_search_bench表并按sight表的搜索字段生成数据，
+不影响业务表，结束后删除(--keep保留，再次运行时只补齐缺少的行)。
+每个数据量分别测量首页查询(LIMIT 10)与总数统计(COUNT)的平均耗时。
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import text
+
+from app.database import init_db_engines
+
+TABLE = "sight_search_bench"
+INSERT_BATCH = 5000
+PAGE_SIZE = 10
+
+PROVINCES = {
+    "浙江省": {"杭州市": ["西湖区", "上城区", "淳安县"], "宁波市": ["海曙区", "奉化区"]},
+    "四川省": {"成都市": ["青羊区", "都江堰市"], "乐山市": ["峨眉山市", "市中区"]},
+    "云南省": {"昆明市": ["五华区", "石林县"], "丽江市": ["古城区", "玉龙县"]},
+    "北京市": {"北京市": ["东城区", "海淀区", "延庆区"]},
+    "陕西省": {"西安市": ["雁塔区", "临潼区"], "延安市": ["宝塔区"]},
+}
+PREFIXES = ["西湖", "千岛湖", "峨眉", "九寨", "玉龙雪山", "石林", "故宫", "长城", "兵马俑", "大雁塔", "灵隐", "乌镇", "青城"]
+SUFFIXES = ["风景区", "国家公园", "古镇", "博物馆", "森林公园", "度假区", "寺", "湿地"]
+# (关键词, 说明)：覆盖高频词、低频词与不存在的词
+KEYWORDS = [("西湖", "名称高频"), ("杭州", "城市"), ("青城古镇", "名称组合"), ("海淀区", "区域"), ("不存在的景点", "无结果")]
+
+
+def make_rows(start: int, count: int, rng: random.Random):
+    rows = []
+    for i in range(start, start + count):
+        province = rng.choice(list(PROVINCES))
+        city = rng.choice(list(PROVINCES[province]))
+        rows.append({
+            "name": f"{rng.choice(PREFIXES)}{rng.choice(SUFFIXES)}{i}",
+            "province": province,
+            "city": city,
+            "area": rng.choice(PROVINCES[province][city]),
+        })
+    return rows
+
+
+async def prepare(conn, size: int, rng: random.Random):
+    """补齐数据到size行，并(重新)建立全文索引"""
+    await conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+        "id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(64) NOT NULL, province VARCHAR(32) NOT NULL, "
+        "city VARCHAR(32) NOT NULL, area VARCHAR(32) NULL) DEFAULT CHARSET=utf8mb4"
+    ))
+    existing = (await conn.execute(text(f"SELECT COUNT(*) FROM {TABLE}"))).scalar_one()
+    if existing >= size:
+        return
+    indexes = (await conn.execute(text(f"SHOW INDEX FROM {TABLE} WHERE Key_name = 'ft_search'"))).all()
+    if indexes:
+        # 先删除索引再批量写入，写完重建比逐行维护索引快得多
+        await conn.execute(text(f"ALTER TABLE {TABLE} DROP INDEX ft_search"))
+    insert = text(f"INSERT INTO {TABLE} (name, province, city, area) VALUES (:name, :province, :city, :area)")
+    for start in range(existing, size, INSERT_BATCH):
+        await conn.execute(insert, make_rows(start, min(INSERT_BATCH, size - start), rng))
+    start_time = time.perf_counter()
+    await conn.execute(text(
+        f"ALTER TABLE {TABLE} ADD FULLTEXT INDEX ft_search (name, province, city, area) WITH PARSER ngram"
+    ))
+    print(f"  建立全文索引耗时 {time.perf_counter() - start_time:.1f}s")
+
+
+async def timeit(conn, query, params, repeat: int):
+    """平均耗时(毫秒)与最后一次的结果"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = (await conn.execute(query, params)).all()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+async def bench(conn, repeat: int):
+    like = "(name LIKE :q OR province LIKE :q OR city LIKE :q OR area LIKE :q)"
+    fulltext = "MATCH(name, province, city, area) AGAINST(:q IN BOOLEAN MODE)"
+    queries = {
+        "LIKE": (
+            text(f"SELECT id FROM {TABLE} WHERE {like} ORDER BY id LIMIT {PAGE_SIZE}"),
+            text(f"SELECT COUNT(*) FROM {TABLE} WHERE {like}"),
+            lambda keyword: {"q": f"%{keyword}%"},
+        ),
+        "FULLTEXT": (
+            text(f"SELECT id FROM {TABLE} WHERE {fulltext} ORDER BY {fulltext} DESC, id LIMIT {PAGE_SIZE}"),
+            text(f"SELECT COUNT(*) FROM {TABLE} WHERE {fulltext}"),
+            lambda keyword: {"q": f'"{keyword}"'},
+        ),
+    }
+    print(f"  {'关键词':<16}{'方式':<10}{'首页(ms)':>10}{'总数(ms)':>10}{'命中数':>10}")
+    for keyword, label in KEYWORDS:
+        for name, (page_query, count_query, params) in queries.items():
+            page_ms, _ = await timeit(conn, page_query, params(keyword), repeat)
+            count_ms, result = await timeit(conn, count_query, params(keyword), repeat)
+            print(f"  {keyword + '(' + label + ')':<16}{name:<10}{page_ms:>10.2f}{count_ms:>10.2f}{result[0][0]:>10}")
+
+
+async def run(sizes, repeat: int, keep: bool):
+    rng = random.Random(42)
+    async_engine = init_db_engines()
+    try:
+        for size in sorted(sizes):
+            print(f"\n{size}条景点")
+            async with async_engine.begin() as conn:
+                await prepare(conn, size, rng)
+            async with async_engine.connect() as conn:
+                await bench(conn, repeat)
+    finally:
+        if not keep:
+            async with async_engine.begin() as conn:
+                await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="保留基准数据表")
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.repeat, args.keep))
+
+
+if __name__ == "__main__":
+    main()
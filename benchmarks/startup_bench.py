@@ -0,0 +1,112 @@
+"""
+启动耗时基准：测量导入app.main的耗时，以及(--serve时)从启动uvicorn进程到就绪检查通过的耗时
+
+用法:
+    python -m benchmarks.startup_bench                     # 只测导入耗时(不需要MySQL/Redis)
+    python -m benchmarks.startup_bench --serve             # 同时测到首个请求就绪的耗时
+    python -m benchmarks.startup_bench --serve --record    # 结果追加到benchmarks/startup_history.csv
+
+每次测量都在新的Python进程中进行，避免模块缓存影响结果。
+--record按提交记录结果，便于对比不同版本的启动耗时。
+"""
+import argparse
+import csv
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_FILE = os.path.join(ROOT, "benchmarks", "startup_history.csv")
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def measure_import() -> float:
+    """新进程中导入app.main的耗时(秒)"""
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT)
+    return float(output.decode().strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_ready(timeout: float) -> float:
+    """从启动uvicorn进程到/health/ready/返回200的耗时(秒)"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/health/ready/"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise SystemExit(f"uvicorn exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.02)
+        raise SystemExit(f"Not ready after {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def record(row: dict):
+    exists = os.path.exists(HISTORY_FILE)
+    with open(HISTORY_FILE, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(row))
+        if not exists:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--serve", action="store_true", help="测量启动uvicorn到就绪的耗时(需要MySQL与Redis)")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--record", action="store_true", help="结果追加到startup_history.csv")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.repeat)]
+    import_ms = statistics.median(imports) * 1000
+    print(f"导入app.main: 中位数 {import_ms:.0f}ms (最小 {min(imports) * 1000:.0f}ms)")
+
+    ready_ms = None
+    if args.serve:
+        readies = [measure_ready(args.timeout) for _ in range(args.repeat)]
+        ready_ms = statistics.median(readies) * 1000
+        print(f"启动到就绪: 中位数 {ready_ms:.0f}ms (最小 {min(readies) * 1000:.0f}ms)")
+
+    if args.record:
+        record({
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "import_ms": round(import_ms),
+            "ready_ms": "" if ready_ms is None else round(ready_ms),
+        })
+        print(f"已记录到 {os.path.relpath(HISTORY_FILE, ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
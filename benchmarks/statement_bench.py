@@ -0,0 +1,131 @@
+"""
+语句构建开销基准：比较每次调用重新构建select(调整前)与使用模块级预构建语句(调整后)的单次调用耗时
+
+用法(需安装aiosqlite):
+    python -m benchmarks.statement_bench
+    python -m benchmarks.statement_bench --calls 5000 --rows 200
+
+使用内存SQLite，数据库本身的耗时很小，差值主要是Python侧构建语句、加载选项与计算缓存键的开销。
+"构建+缓存键"一列只测量语句构建与缓存键计算，不执行SQL。
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.sight import services as sight_services
+from app.sight.models import Sight, SightProfile
+from app.tickets import services as ticket_services
+from app.tickets.models import Ticket
+
+
+# 调整前的写法：每次调用都重新构建语句
+def old_sight_by_id(sight_id):
+    return select(Sight).options(selectinload(Sight.profile), selectinload(Sight.tickets)).where(Sight.id == sight_id)
+
+
+def old_hot_sights(skip=0, limit=10):
+    return select(Sight).options(sight_services._list_columns()).where(Sight.is_hot == True).order_by(Sight.id).offset(skip).limit(limit)
+
+
+def old_tickets_by_sight(sight_id):
+    return select(Ticket).where(Ticket.sight_id == sight_id)
+
+
+# (名称, 调整前的语句构建, 调整后的预构建语句, 参数, 调整后的服务函数)
+CASES = [
+    (
+        "get_sight_by_id_async",
+        lambda: old_sight_by_id(1),
+        sight_services._SIGHT_BY_ID, {"sight_id": 1},
+        lambda db: sight_services.get_sight_by_id_async(db, 1),
+    ),
+    (
+        "get_hot_sights_async",
+        lambda: old_hot_sights(),
+        sight_services._HOT_SIGHTS, {"skip": 0, "limit": 10},
+        lambda db: sight_services.get_hot_sights_async(db),
+    ),
+    (
+        "get_tickets_by_sight_async",
+        lambda: old_tickets_by_sight(1),
+        ticket_services._TICKETS_BY_SIGHT, {"sight_id": 1},
+        lambda db: ticket_services.get_tickets_by_sight_async(db, 1),
+    ),
+]
+
+
+async def setup(rows: int):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[Sight.__table__, SightProfile.__table__, Ticket.__table__],
+        )
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as db:
+        for i in range(1, rows + 1):
+            db.add(Sight(
+                id=i, name=f"景点{i}", desc="", main_img="", banner_img="", content="",
+                province="浙江省", city="杭州市", is_hot=i % 2 == 0, is_top=i % 3 == 0,
+            ))
+            db.add(SightProfile(id=i, sight_id=i, img="", address="", open_time="", tel=""))
+            db.add(Ticket(id=i, sight_id=i, name=f"门票{i}", price=100, total=10, remain=10))
+        await db.commit()
+    return engine, session_factory
+
+
+def time_build(build, calls: int) -> float:
+    """单次构建语句并计算缓存键的耗时(微秒)"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        build()._generate_cache_key()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def time_execute(session_factory, run, calls: int) -> float:
+    """单次调用的耗时(微秒)，每次调用使用新会话"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        async with session_factory() as db:
+            await run(db)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def bench(calls: int, rows: int):
+    engine, session_factory = await setup(rows)
+    print(f"{'查询':<28}{'方式':<8}{'构建+缓存键(us)':>16}{'单次调用(us)':>14}")
+    for name, old_build, prebuilt, params, new_run in CASES:
+        async def old_run(db, old_build=old_build):
+            return (await db.execute(old_build())).scalars().all()
+
+        # 预热编译缓存
+        await time_execute(session_factory, old_run, 10)
+        await time_execute(session_factory, new_run, 10)
+        results = [
+            ("调整前", time_build(old_build, calls), await time_execute(session_factory, old_run, calls)),
+            ("调整后", time_build(lambda: prebuilt, calls), await time_execute(session_factory, new_run, calls)),
+        ]
+        for label, build_us, call_us in results:
+            print(f"{name:<28}{label:<8}{build_us:>16.1f}{call_us:>14.1f}")
+    async with session_factory() as db:
+        assert (await db.execute(select(func.count()).select_from(Sight))).scalar_one() == rows
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(bench(args.calls, args.rows))
+
+
+if __name__ == "__main__":
+    main()
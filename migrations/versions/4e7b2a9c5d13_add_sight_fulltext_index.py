@@ -0,0 +1,36 @@
+"""add sight fulltext index
+
+Revision ID: 4e7b2a9c5d13
+Revises: cc8cbbe2d008
+Create Date: 2025-05-20 10:12:31.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e7b2a9c5d13'
+down_revision: Union[str, None] = 'cc8cbbe2d008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 景点搜索全文索引，ngram分词器支持中文，分词长度由服务端ngram_token_size决定(默认2)
+    op.create_index(
+        'ft_sight_search',
+        'sight',
+        ['name', 'province', 'city', 'area'],
+        unique=False,
+        mysql_prefix='FULLTEXT',
+        mysql_with_parser='ngram',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ft_sight_search', table_name='sight')
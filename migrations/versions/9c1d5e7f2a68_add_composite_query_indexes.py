@@ -0,0 +1,39 @@
+"""add composite query indexes
+
+Revision ID: 9c1d5e7f2a68
+Revises: 4e7b2a9c5d13
+Create Date: 2025-05-22 15:40:08.731264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1d5e7f2a68'
+down_revision: Union[str, None] = '4e7b2a9c5d13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (索引名, 表名, 列)
+INDEXES = [
+    ('ix_sight_is_hot_id', 'sight', ['is_hot', 'id']),
+    ('ix_sight_is_top_id', 'sight', ['is_top', 'id']),
+    ('ix_sight_is_valid_score', 'sight', ['is_valid', 'score']),
+    ('ix_sight_ticket_sight_id_is_valid', 'sight_ticket', ['sight_id', 'is_valid']),
+    ('ix_order_user_id_created_at', 'order', ['user_id', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -1,5 +1,6 @@
 import uvicorn
-from app.main import app
+
+# 不在此处导入app.main：uvicorn会按字符串在(重载)子进程中导入，提前导入只会让启动多做一遍
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -8,4 +9,4 @@ if __name__ == "__main__":
         port=8001,
         reload=True,
         reload_excludes=["app/database.py","app/models/*.py"]
-    )
\ No newline at end of file
+    )
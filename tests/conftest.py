@@ -0,0 +1,62 @@
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.order.schemas import OrderCreate
+from app.sight.models import Sight
+from app.tickets.models import Ticket
+import app.order.models  # noqa: F401  注册订单相关的表
+
+
+@pytest.fixture
+def run_db(tmp_path):
+    """run(fn)：在新建的SQLite库(aiosqlite)上执行async函数fn(session_factory)并返回其结果"""
+    pytest.importorskip("aiosqlite")
+
+    def run(fn):
+        async def main():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+            try:
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                return await fn(sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+async def create_ticket(session_factory, stock: int, price: float = 100, is_valid: bool = True) -> int:
+    """创建一个景点及其门票，返回门票ID"""
+    async with session_factory() as db:
+        sight = Sight(name="测试景点", desc="", main_img="", banner_img="", content="", province="", city="")
+        db.add(sight)
+        await db.flush()
+        ticket = Ticket(
+            sight_id=sight.id, name="测试门票", price=price, discount=1, total=stock, remain=stock, is_valid=is_valid
+        )
+        db.add(ticket)
+        await db.commit()
+        return ticket.id
+
+
+def order_data(quantities: dict, visitors: int = 0) -> OrderCreate:
+    """按{门票ID: 数量}构造下单请求"""
+    return OrderCreate(
+        items=[
+            {"ticket_id": ticket_id, "quantity": quantity, "visit_date": date.today()}
+            for ticket_id, quantity in quantities.items()
+        ],
+        visitors=[
+            {"name": f"游客{i}", "id_card": f"11010119900101{i:04d}", "phone": "13800000000"}
+            for i in range(visitors)
+        ],
+        contact_name="测试",
+        contact_phone="13800000000",
+    )
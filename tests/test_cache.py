@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+from app.cache import local as local_module
+from app.cache.local import LocalCache
+from app.cache.singleflight import SingleFlight
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(local_module.time, "monotonic", clock)
+    return clock
+
+
+def test_singleflight_coalesces_concurrent_loads():
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("k", load) for _ in range(10)))
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert calls == 1
+    assert results == [1] * 10
+    assert flight.coalesced == 9
+    assert not flight.in_flight("k")
+
+
+def test_singleflight_shares_errors_and_retries_afterwards():
+    calls = 0
+
+    async def fail():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert calls == 1
+        # 失败后不缓存结果，下一次调用重新加载
+        with pytest.raises(RuntimeError):
+            await flight.do("k", fail)
+        assert calls == 2
+
+    asyncio.run(main())
+
+
+def test_singleflight_waiter_takes_over_when_loader_is_cancelled():
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        flight = SingleFlight()
+        leader = asyncio.create_task(flight.do("k", load))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.do("k", load))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await waiter == "value"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    asyncio.run(main())
+    assert calls == 2
+
+
+def test_local_cache_expires_after_ttl(clock):
+    cache = LocalCache(maxsize=10, ttl=30)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)
+    clock.now += 5
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    clock.now += 25
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_local_cache_ttl_is_capped(clock):
+    cache = LocalCache(maxsize=10, ttl=30)
+    cache.set("a", 1, ttl=3600)
+    clock.now += 30
+    assert cache.get("a") is None
+
+
+def test_local_cache_evicts_least_recently_used(clock):
+    cache = LocalCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_local_cache_invalidates_by_tag(clock):
+    cache = LocalCache(maxsize=10)
+    cache.set("a", 1, tags=("sight:1", "sights"))
+    cache.set("b", 2, tags=("sights",))
+    cache.set("c", 3, tags=("sight:2",))
+    assert cache.invalidate_tags(["sights"]) == 2
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    # 已删除的键不再留在其他标签下
+    assert cache.invalidate_tags(["sight:1"]) == 0
+
+
+def test_load_racing_an_invalidation_is_not_cached():
+    fakeredis = pytest.importorskip("fakeredis.aioredis")
+    from app.cache.manager import CacheManager
+
+    async def main():
+        cache = CacheManager(fakeredis.FakeRedis(), LocalCache())
+
+        async def stale_loader():
+            # 回源读到旧数据之后、写入缓存之前，数据被修改并失效了标签
+            await cache.invalidate("sight:1")
+            return "old", b"old"
+
+        assert await cache.get_or_load("sight:1:detail", stale_loader, ex=60, tags=("sight:1",)) == "old"
+        assert cache.stale_writes == 1
+        assert await cache.get("sight:1:detail") is None
+
+        async def loader():
+            return "new", b"new"
+
+        assert await cache.get_or_load("sight:1:detail", loader, ex=60, tags=("sight:1",)) == "new"
+        assert await cache.get("sight:1:detail", tags=("sight:1",)) == b"new"
+        await cache.invalidate("sight:1")
+        assert await cache.get("sight:1:detail", tags=("sight:1",)) is None
+
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+查询计划检查：对每个只读服务函数执行的SQL运行EXPLAIN，出现全表扫描(type=ALL)时失败
+
+需要MySQL(使用配置的主库)，连接不上时整个模块跳过:
+    python -m pytest tests/test_explain.py
+    EXPLAIN_MIN_ROWS=0 python -m pytest tests/test_explain.py    # 小表上的全表扫描也视为失败
+
+通过SQLAlchemy事件捕获服务函数实际发出的每条SELECT及其参数，再以相同参数执行EXPLAIN，
+因此检查的是真实生成的SQL(包括selectinload产生的附加查询)。
+表中数据很少时优化器倾向于全表扫描，默认忽略估算行数低于EXPLAIN_MIN_ROWS的扫描，
+应在数据量接近生产的库上运行(如迁移后导入测试数据)。
+"""
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import event, text
+
+from app.database import ASYNC_DATABASE_URL, PrimarySessionLocal, init_db_engines
+from app.sight import services as sight_services
+from app.sight.counters import SightCounters
+from app.tickets import services as ticket_services
+
+MIN_ROWS = int(os.getenv("EXPLAIN_MIN_ROWS", "1000"))
+
+# (名称, 服务调用)
+CASES = [
+    ("get_sight_by_id_async", lambda db: sight_services.get_sight_by_id_async(db, 1)),
+    ("get_sight_base_async", lambda db: sight_services.get_sight_base_async(db, 1)),
+    ("get_profiles_by_sight_ids_async", lambda db: sight_services.get_profiles_by_sight_ids_async(db, [1, 2, 3])),
+    ("get_sight_async", lambda db: sight_services.get_sight_async(db, skip=0, limit=6)),
+    ("get_hot_sights_async", lambda db: sight_services.get_hot_sights_async(db)),
+    ("get_fine_sights_async", lambda db: sight_services.get_fine_sights_async(db)),
+    ("get_sight_after_async", lambda db: sight_services.get_sight_after_async(db, after_id=100, limit=7)),
+    ("search_sights_async", lambda db: sight_services.search_sights_async(db, "西湖", limit=4)),
+    ("search_sights_async(单字)", lambda db: sight_services.search_sights_async(db, "湖", limit=4)),
+    ("search_sights_after_async", lambda db: sight_services.search_sights_after_async(db, "西湖", limit=5)),
+    ("count_sights_async", lambda db: sight_services.count_sights_async(db)),
+    ("count_search_sights_async", lambda db: sight_services.count_search_sights_async(db, "西湖")),
+    ("SightCounters.count_from_db", lambda db: SightCounters(None, None).count_from_db(db)),
+    ("get_ticket_async", lambda db: ticket_services.get_ticket_async(db, 1)),
+    ("get_tickets_async", lambda db: ticket_services.get_tickets_async(db, skip=0, limit=100)),
+    ("get_tickets_by_sight_async", lambda db: ticket_services.get_tickets_by_sight_async(db, 1)),
+    ("get_tickets_by_sight_ids_async", lambda db: ticket_services.get_tickets_by_sight_ids_async(db, [1, 2, 3])),
+]
+
+# 允许全表扫描的查询及原因
+ALLOWED_FULL_SCANS = {
+    "get_sight_async": "无过滤条件的分页，读满LIMIT即停止",
+    "get_tickets_async": "无过滤条件的分页，读满LIMIT即停止",
+    "search_sights_async(单字)": "短于ngram分词长度的关键词只能模糊匹配",
+    "SightCounters.count_from_db": "后台对账，统计全表",
+}
+
+
+def run(func):
+    """在新的事件循环中以主库引擎执行func(engine)，结束后释放连接(异步连接不能跨事件循环复用)"""
+    async def main():
+        engine = init_db_engines()
+        try:
+            return await func(engine)
+        finally:
+            await engine.dispose()
+    return asyncio.run(main())
+
+
+@pytest.fixture(scope="module", autouse=True)
+def mysql():
+    if not ASYNC_DATABASE_URL.startswith("mysql"):
+        pytest.skip("EXPLAIN检查需要MySQL")
+
+    async def ping(engine):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    try:
+        run(ping)
+    except Exception as e:
+        pytest.skip(f"MySQL不可用: {e}")
+
+
+async def capture(engine, case) -> list:
+    """执行服务函数，返回其发出的(SQL, 参数)列表"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        async with PrimarySessionLocal() as db:
+            await case(db)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+async def explain(engine, statement: str, parameters) -> list:
+    async with engine.connect() as conn:
+        result = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        return [dict(row._mapping) for row in result]
+
+
+@pytest.mark.parametrize("name, case", CASES, ids=[name for name, _ in CASES])
+def test_no_full_table_scan(name, case):
+    async def full_scans(engine):
+        scans = []
+        for statement, parameters in await capture(engine, case):
+            for row in await explain(engine, statement, parameters):
+                if row.get("type") == "ALL" and (row.get("rows") or 0) >= MIN_ROWS:
+                    scans.append(f"table={row.get('table')} rows={row.get('rows')}: {' '.join(statement.split())}")
+        return scans
+
+    scans = run(full_scans)
+    if name in ALLOWED_FULL_SCANS:
+        return
+    assert not scans, "\n".join(scans)
@@ -0,0 +1,139 @@
+import time
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+from app.order.expiry import OrderExpiryQueue
+from app.order.models import Order
+from app.order.services import InsufficientStockError, create_order_async
+from app.tickets.inventory import TicketInventory
+from app.tickets.models import Ticket
+from tests.conftest import create_ticket, order_data
+
+fakeredis = pytest.importorskip("fakeredis.aioredis")
+
+
+async def remain_of(session_factory, ticket_id: int) -> int:
+    async with session_factory() as db:
+        return (await db.execute(select(Ticket.remain).where(Ticket.id == ticket_id))).scalar_one()
+
+
+async def buy(session_factory, inventory, ticket_id: int, quantity: int, **kwargs):
+    async with session_factory() as db:
+        order, _, _ = await create_order_async(db, 1, order_data({ticket_id: quantity}), inventory=inventory, **kwargs)
+    return order
+
+
+def test_order_reserves_in_redis_and_flush_recomputes_remain(run_db):
+    async def main(session_factory):
+        ticket_id = await create_ticket(session_factory, stock=5)
+        inventory = TicketInventory(fakeredis.FakeRedis(), session_factory)
+        await buy(session_factory, inventory, ticket_id, 2)
+        assert await inventory.stock(ticket_id) == 3
+        # 下单事务不扣减数据库余量，由回写任务按订单项重新计算
+        assert await remain_of(session_factory, ticket_id) == 5
+        assert await inventory.flush() == 1
+        assert await remain_of(session_factory, ticket_id) == 3
+        assert await inventory.stock(ticket_id) == 3
+
+        with pytest.raises(InsufficientStockError):
+            await buy(session_factory, inventory, ticket_id, 4)
+        assert await inventory.stock(ticket_id) == 3
+
+    run_db(main)
+
+
+def test_failed_order_releases_its_hold(run_db, monkeypatch):
+    async def main(session_factory):
+        ticket_id = await create_ticket(session_factory, stock=5)
+        inventory = TicketInventory(fakeredis.FakeRedis(), session_factory)
+
+        def broken():
+            raise RuntimeError("db down")
+
+        monkeypatch.setattr(Order, "generate_order_number", staticmethod(broken))
+        with pytest.raises(RuntimeError):
+            await buy(session_factory, inventory, ticket_id, 2)
+        assert await inventory.stock(ticket_id) == 5
+        assert await inventory.redis.zcard("ticket:holds") == 0
+
+    run_db(main)
+
+
+def test_hold_left_by_a_crash_expires_instead_of_leaking(run_db):
+    async def main(session_factory):
+        ticket_id = await create_ticket(session_factory, stock=5)
+        inventory = TicketInventory(fakeredis.FakeRedis(), session_factory, hold_ttl=60)
+        # 预占后进程崩溃：既没有确认也没有归还
+        assert await inventory.reserve("crashed", {ticket_id: 2}) is None
+        assert await inventory.stock(ticket_id) == 3
+        await inventory.flush()
+        assert await inventory.stock(ticket_id) == 3
+
+        assert await inventory.expire_holds(now=time.time() + 61) == 1
+        await inventory.flush()
+        assert await inventory.stock(ticket_id) == 5
+        # 已丢弃的预占不能再确认或归还
+        assert not await inventory.release("crashed", {ticket_id: 2})
+        assert await inventory.stock(ticket_id) == 5
+
+    run_db(main)
+
+
+def test_unconfirmed_committed_order_is_kept_after_hold_expires(run_db):
+    async def main(session_factory):
+        ticket_id = await create_ticket(session_factory, stock=5)
+        inventory = TicketInventory(fakeredis.FakeRedis(), session_factory, hold_ttl=60)
+
+        async def lost(*args):
+            raise ConnectionError("redis gone")
+
+        # 订单已提交但确认失败：预占到期后按数据库中的订单项重新计算，不会把已售的库存放回去
+        inventory.confirm = lost
+        await buy(session_factory, inventory, ticket_id, 2)
+        await inventory.expire_holds(now=time.time() + 61)
+        await inventory.flush()
+        assert await inventory.stock(ticket_id) == 3
+        assert await remain_of(session_factory, ticket_id) == 3
+
+    run_db(main)
+
+
+def test_restock_and_cancellation_reach_redis(run_db):
+    async def main(session_factory):
+        ticket_id = await create_ticket(session_factory, stock=5)
+        redis = fakeredis.FakeRedis()
+        inventory = TicketInventory(redis, session_factory)
+        expiry = OrderExpiryQueue(redis, session_factory, timeout=60, inventory=inventory)
+        order = await buy(session_factory, inventory, ticket_id, 2, expiry=expiry)
+        await inventory.flush()
+
+        async with session_factory() as db:
+            await db.execute(update(Ticket).where(Ticket.id == ticket_id).values(total=15))
+            await db.commit()
+        assert await inventory.reconcile() == 1
+        assert await inventory.stock(ticket_id) == 13
+        assert await remain_of(session_factory, ticket_id) == 13
+
+        assert await expiry.process(now=order.created_at.timestamp() + 61) == 1
+        await inventory.flush()
+        assert await inventory.stock(ticket_id) == 15
+        assert await remain_of(session_factory, ticket_id) == 15
+
+    run_db(main)
+
+
+def test_reseed_keeps_outstanding_holds(run_db):
+    async def main(session_factory):
+        ticket_id = await create_ticket(session_factory, stock=5)
+        inventory = TicketInventory(fakeredis.FakeRedis(), session_factory)
+        assert await inventory.reserve("pending", {ticket_id: 4}) is None
+        # 重新计算时尚未提交的预占仍从库存中扣除，不会被数据库余量覆盖而超卖
+        await inventory.load([ticket_id])
+        assert await inventory.stock(ticket_id) == 1
+        assert await inventory.reserve("other", {ticket_id: 2}) == ticket_id
+        assert await inventory.release("pending", {ticket_id: 4})
+        assert await inventory.stock(ticket_id) == 5
+
+    run_db(main)
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from app.order.models import Order, OrderItem, Visitor
+from app.order.services import (
+    InsufficientStockError,
+    TicketUnavailableError,
+    create_order_async,
+    get_order_async,
+)
+from app.tickets.models import Ticket
+from tests.conftest import create_ticket, order_data
+
+
+async def remain_of(session_factory, ticket_id: int) -> int:
+    async with session_factory() as db:
+        return (await db.execute(select(Ticket.remain).where(Ticket.id == ticket_id))).scalar_one()
+
+
+async def count(session_factory, model) -> int:
+    async with session_factory() as db:
+        return (await db.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+def test_order_decrements_remain_and_writes_rows(run_db):
+    async def main(session_factory):
+        ticket_id = await create_ticket(session_factory, stock=10, price=80)
+        other_id = await create_ticket(session_factory, stock=5, price=50)
+        async with session_factory() as db:
+            order, items, visitors = await create_order_async(
+                db, 1, order_data({ticket_id: 3, other_id: 1}, visitors=2)
+            )
+        assert order.status == Order.STATUS_PENDING
+        assert len(order.order_number) == 27
+        assert order.total_amount == 3 * 80 + 50
+        assert [(item.ticket_id, item.quantity, item.amount) for item in items] == [(ticket_id, 3, 240), (other_id, 1, 50)]
+        assert all(item.order_id == order.id for item in items)
+        assert [visitor.name for visitor in visitors] == ["游客0", "游客1"]
+        assert await remain_of(session_factory, ticket_id) == 7
+        assert await remain_of(session_factory, other_id) == 4
+
+        async with session_factory() as db:
+            found, found_items, found_visitors = await get_order_async(db, order.id, 1)
+            assert found.order_number == order.order_number
+            assert [item.id for item in found_items] == [item.id for item in items]
+            assert len(found_visitors) == 2
+            assert (await get_order_async(db, order.id, 2))[0] is None
+
+    run_db(main)
+
+
+def test_same_ticket_lines_are_merged_for_the_stock_check(run_db):
+    async def main(session_factory):
+        ticket_id = await create_ticket(session_factory, stock=3)
+        data = order_data({ticket_id: 2})
+        data.items = data.items + data.items
+        async with session_factory() as db:
+            with pytest.raises(InsufficientStockError):
+                await create_order_async(db, 1, data)
+        assert await remain_of(session_factory, ticket_id) == 3
+
+    run_db(main)
+
+
+def test_insufficient_stock_rolls_back_the_whole_order(run_db):
+    async def main(session_factory):
+        ticket_id = await create_ticket(session_factory, stock=10)
+        short_id = await create_ticket(session_factory, stock=1)
+        async with session_factory() as db:
+            with pytest.raises(InsufficientStockError) as exc_info:
+                await create_order_async(db, 1, order_data({ticket_id: 2, short_id: 2}))
+        assert exc_info.value.ticket_id == short_id
+        assert exc_info.value.status_code == 409
+        assert await remain_of(session_factory, ticket_id) == 10
+        assert await remain_of(session_factory, short_id) == 1
+        assert await count(session_factory, Order) == 0
+        assert await count(session_factory, OrderItem) == 0
+
+    run_db(main)
+
+
+def test_unavailable_ticket_is_rejected(run_db):
+    async def main(session_factory):
+        invalid_id = await create_ticket(session_factory, stock=10, is_valid=False)
+        async with session_factory() as db:
+            with pytest.raises(TicketUnavailableError):
+                await create_order_async(db, 1, order_data({invalid_id: 1}))
+            with pytest.raises(TicketUnavailableError):
+                await create_order_async(db, 1, order_data({invalid_id + 100: 1}))
+        assert await remain_of(session_factory, invalid_id) == 10
+
+    run_db(main)
+
+
+def test_concurrent_orders_do_not_oversell(run_db):
+    async def main(session_factory):
+        ticket_id = await create_ticket(session_factory, stock=5)
+
+        async def buy():
+            async with session_factory() as db:
+                try:
+                    await create_order_async(db, 1, order_data({ticket_id: 1}))
+                    return True
+                except InsufficientStockError:
+                    return False
+
+        results = await asyncio.gather(*(buy() for _ in range(12)))
+        assert results.count(True) == 5
+        assert await remain_of(session_factory, ticket_id) == 0
+        assert await count(session_factory, Order) == 5
+        assert await count(session_factory, OrderItem) == 5
+
+    run_db(main)
+
+
+def test_order_number_conflict_is_retried_without_double_decrement(run_db, monkeypatch):
+    async def main(session_factory):
+        ticket_id = await create_ticket(session_factory, stock=10)
+        async with session_factory() as db:
+            first, _, _ = await create_order_async(db, 1, order_data({ticket_id: 1}))
+
+        numbers = iter([first.order_number, Order.generate_order_number()])
+        monkeypatch.setattr(Order, "generate_order_number", staticmethod(lambda: next(numbers)))
+        async with session_factory() as db:
+            second, items, visitors = await create_order_async(db, 1, order_data({ticket_id: 2}, visitors=1))
+        assert second.order_number != first.order_number
+        assert [item.quantity for item in items] == [2]
+        assert len(visitors) == 1
+        assert await remain_of(session_factory, ticket_id) == 7
+        assert await count(session_factory, Order) == 2
+        assert await count(session_factory, Visitor) == 1
+
+    run_db(main)
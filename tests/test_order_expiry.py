@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+from app.order.expiry import OrderExpiryQueue
+from app.order.models import Order
+from app.order.services import create_order_async
+from app.tickets.models import Ticket
+from tests.conftest import create_ticket, order_data
+
+fakeredis = pytest.importorskip("fakeredis.aioredis")
+
+
+async def remain_of(session_factory, ticket_id: int) -> int:
+    async with session_factory() as db:
+        return (await db.execute(select(Ticket.remain).where(Ticket.id == ticket_id))).scalar_one()
+
+
+async def status_of(session_factory, order_id: int) -> int:
+    async with session_factory() as db:
+        return (await db.execute(select(Order.status).where(Order.id == order_id))).scalar_one()
+
+
+async def place(session_factory, expiry, quantities):
+    async with session_factory() as db:
+        order, _, _ = await create_order_async(db, 1, order_data(quantities), expiry=expiry)
+    return order
+
+
+def test_expired_order_is_cancelled_and_stock_restored_once(run_db):
+    async def main(session_factory):
+        ticket_id = await create_ticket(session_factory, stock=10)
+        expiry = OrderExpiryQueue(fakeredis.FakeRedis(), session_factory, timeout=60)
+        order = await place(session_factory, expiry, {ticket_id: 3})
+        assert await remain_of(session_factory, ticket_id) == 7
+
+        now = order.created_at.timestamp()
+        # 未到期时不领取
+        assert await expiry.process(now=now + 30) == 0
+        assert await expiry.process(now=now + 61) == 1
+        assert await status_of(session_factory, order.id) == Order.STATUS_CANCELLED
+        assert await remain_of(session_factory, ticket_id) == 10
+        assert await expiry.redis.zcard(expiry.key) == 0
+
+        # 重复处理(如租约到期后重新领取)不会重复归还
+        assert await expiry.cancel([order.id]) == 0
+        assert await remain_of(session_factory, ticket_id) == 10
+        assert expiry.cancelled == 1
+
+    run_db(main)
+
+
+def test_paid_order_is_not_cancelled(run_db):
+    async def main(session_factory):
+        ticket_id = await create_ticket(session_factory, stock=10)
+        expiry = OrderExpiryQueue(fakeredis.FakeRedis(), session_factory, timeout=60)
+        order = await place(session_factory, expiry, {ticket_id: 2})
+        async with session_factory() as db:
+            await db.execute(update(Order).where(Order.id == order.id).values(status=Order.STATUS_PAID))
+            await db.commit()
+
+        assert await expiry.process(now=order.created_at.timestamp() + 61) == 1
+        assert await status_of(session_factory, order.id) == Order.STATUS_PAID
+        assert await remain_of(session_factory, ticket_id) == 8
+        assert await expiry.redis.zcard(expiry.key) == 0
+
+    run_db(main)
+
+
+def test_claimed_orders_are_leased_until_processed(run_db):
+    async def main(session_factory):
+        ticket_id = await create_ticket(session_factory, stock=10)
+        expiry = OrderExpiryQueue(fakeredis.FakeRedis(), session_factory, timeout=60, retry_after=30)
+        order = await place(session_factory, expiry, {ticket_id: 1})
+        now = order.created_at.timestamp() + 61
+
+        # 领取后进程崩溃(未调用cancel)：租约期内其他进程领取不到，租约到期后重新领取
+        assert await expiry.claim(now) == [order.id]
+        assert await expiry.claim(now + 1) == []
+        assert await expiry.process(now=now + 31) == 1
+        assert await status_of(session_factory, order.id) == Order.STATUS_CANCELLED
+        assert await remain_of(session_factory, ticket_id) == 10
+
+    run_db(main)
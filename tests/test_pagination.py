@@ -0,0 +1,45 @@
+import base64
+
+import pytest
+from fastapi import HTTPException
+
+from app.sight.router import parse_cursor
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    values = {"id": 42, "score": 4.5, "name": "西湖"}
+    cursor = encode_cursor(values)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == values
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor({"id": 10 ** 12, "k": "???>>>"})
+    assert all(c.isalnum() or c in "-_" for c in cursor)
+
+
+# W10 = "[]"，bnVsbA = "null"：能解码但不是对象
+@pytest.mark.parametrize("cursor", ["not base64!", "W10", "bnVsbA", "x"])
+def test_decode_cursor_rejects_invalid_input(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_parse_cursor_returns_last_id():
+    assert parse_cursor(None) == 0
+    assert parse_cursor("") == 0
+    assert parse_cursor(encode_cursor({"id": 15})) == 15
+
+
+@pytest.mark.parametrize("values", [{}, {"id": "abc"}, {"id": [1]}, {"id": None}, {"after": 15}])
+def test_parse_cursor_rejects_tampered_cursor(values):
+    with pytest.raises(HTTPException) as exc_info:
+        parse_cursor(encode_cursor(values))
+    assert exc_info.value.status_code == 400
+
+
+def test_parse_cursor_rejects_truncated_cursor():
+    cursor = base64.urlsafe_b64encode(b'{"id": 15').decode("ascii")
+    with pytest.raises(HTTPException):
+        parse_cursor(cursor)
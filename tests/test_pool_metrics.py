@@ -0,0 +1,40 @@
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from app.utils.pool_metrics import PoolMetrics, install_pool_metrics
+
+
+def make_engine(tmp_path, recycle):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, pool_size=1, pool_recycle=recycle)
+    metrics = PoolMetrics()
+    install_pool_metrics(engine, metrics)
+    return engine, metrics
+
+
+def checkout(engine):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def test_recycle_is_counted(tmp_path):
+    engine, metrics = make_engine(tmp_path, recycle=1)
+    checkout(engine)
+    for _ in range(2):
+        time.sleep(1.1)
+        checkout(engine)
+    assert metrics.connects == 3
+    assert metrics.recycles == 2
+    engine.dispose()
+
+
+def test_invalidation_is_not_a_recycle(tmp_path):
+    engine, metrics = make_engine(tmp_path, recycle=3600)
+    with engine.connect() as conn:
+        conn.invalidate()
+    checkout(engine)
+    assert metrics.invalidations == 1
+    assert metrics.connects == 2
+    assert metrics.recycles == 0
+    engine.dispose()
@@ -0,0 +1,23 @@
+from app.sight.services import normalize_keyword
+
+
+def test_normalize_keyword_converts_full_width_characters():
+    assert normalize_keyword("ＡＢＣ１２３") == "abc123"
+
+
+def test_normalize_keyword_collapses_whitespace():
+    assert normalize_keyword("  西湖 \t  断桥　残雪 ") == "西湖 断桥 残雪"
+
+
+def test_normalize_keyword_folds_case():
+    assert normalize_keyword("West LAKE") == normalize_keyword("west lake") == "west lake"
+    assert normalize_keyword("Straße") == "strasse"
+
+
+def test_normalize_keyword_keeps_chinese_unchanged():
+    assert normalize_keyword("西湖") == "西湖"
+
+
+def test_equivalent_keywords_share_a_cache_key():
+    variants = ["西湖", " 西湖 ", "西湖　"]
+    assert len({normalize_keyword(keyword) for keyword in variants}) == 1
@@ -0,0 +1,157 @@
+import asyncio
+import os
+import threading
+from datetime import datetime
+
+import pytest
+
+from app.utils import snowflake
+from app.utils.snowflake import (
+    EPOCH_MS,
+    MAX_SEQUENCE,
+    MAX_WORKER_ID,
+    SEQUENCE_BITS,
+    WORKER_ID_BITS,
+    SnowflakeGenerator,
+    WorkerIdLease,
+)
+
+
+class Clock:
+    def __init__(self, ms: int):
+        self.ms = ms
+
+    def __call__(self):
+        return self.ms * 1_000_000
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(EPOCH_MS + 10_000)
+    monkeypatch.setattr(snowflake.time, "time_ns", clock)
+    return clock
+
+
+def split(snowflake_id: int):
+    """拆分为(时间戳, 工作节点ID, 序号)"""
+    return (
+        snowflake_id >> (WORKER_ID_BITS + SEQUENCE_BITS),
+        (snowflake_id >> SEQUENCE_BITS) & MAX_WORKER_ID,
+        snowflake_id & MAX_SEQUENCE,
+    )
+
+
+def test_ids_are_unique_and_increasing():
+    generator = SnowflakeGenerator(worker_id=7)
+    ids = [generator.next_id() for _ in range(20000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert {split(i)[1] for i in ids} == {7}
+
+
+def test_id_layout(clock):
+    generator = SnowflakeGenerator(worker_id=5)
+    assert split(generator.next_id()) == (10_000, 5, 0)
+    assert split(generator.next_id()) == (10_000, 5, 1)
+    clock.ms += 1
+    assert split(generator.next_id()) == (10_001, 5, 0)
+
+
+def test_worker_id_out_of_range_wraps():
+    assert SnowflakeGenerator(worker_id=MAX_WORKER_ID + 3).worker_id == 2
+
+
+def test_exhausted_sequence_borrows_next_millisecond(clock):
+    generator = SnowflakeGenerator(worker_id=1)
+    ids = [generator.next_id() for _ in range(MAX_SEQUENCE + 3)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert split(ids[MAX_SEQUENCE])[::2] == (10_000, MAX_SEQUENCE)
+    assert split(ids[MAX_SEQUENCE + 1])[::2] == (10_001, 0)
+
+
+def test_clock_rollback_does_not_repeat_ids(clock):
+    generator = SnowflakeGenerator(worker_id=1)
+    before = [generator.next_id() for _ in range(3)]
+    clock.ms -= 5000
+    after = [generator.next_id() for _ in range(3)]
+    ids = before + after
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    # 时钟追上之前继续使用上次的逻辑时间
+    assert {split(i)[0] for i in after} == {10_000}
+
+
+def test_ids_are_unique_across_threads():
+    generator = SnowflakeGenerator(worker_id=3)
+    results = [[] for _ in range(8)]
+
+    def worker(out):
+        for _ in range(5000):
+            out.append(generator.next_id())
+
+    threads = [threading.Thread(target=worker, args=(out,)) for out in results]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ids = [i for out in results for i in out]
+    assert len(set(ids)) == len(ids)
+
+
+def test_order_number_format(clock):
+    generator = SnowflakeGenerator(worker_id=9)
+    number = generator.next_str()
+    assert len(number) == 27
+    assert number.isdigit()
+    expected_day = datetime.fromtimestamp(clock.ms / 1000).strftime("%Y%m%d")
+    assert number[:8] == expected_day
+    assert int(number[8:]) == (10_000 << (WORKER_ID_BITS + SEQUENCE_BITS)) | (9 << SEQUENCE_BITS)
+
+
+def test_order_numbers_sort_in_generation_order_across_days(clock):
+    generator = SnowflakeGenerator(worker_id=9)
+    numbers = []
+    for _ in range(3):
+        numbers.append(generator.next_str())
+        clock.ms += 86400 * 1000 // 2
+    assert numbers == sorted(numbers)
+    assert len({number[:8] for number in numbers}) >= 2
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="需要fork")
+def test_forked_child_gets_its_own_worker_id():
+    snowflake.order_numbers.configure(os.getpid())
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        os.write(write_fd, str(snowflake.order_numbers.worker_id).encode())
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        child_worker_id = int(pipe.read())
+    os.waitpid(pid, 0)
+    assert child_worker_id == pid % (MAX_WORKER_ID + 1)
+    assert snowflake.order_numbers.worker_id == os.getpid() % (MAX_WORKER_ID + 1)
+
+
+def test_worker_id_leases_are_exclusive():
+    fakeredis = pytest.importorskip("fakeredis.aioredis")
+
+    async def main():
+        redis = fakeredis.FakeRedis()
+        first = WorkerIdLease(redis, SnowflakeGenerator(worker_id=0))
+        second = WorkerIdLease(redis, SnowflakeGenerator(worker_id=0))
+        first_id = await first.acquire()
+        second_id = await second.acquire()
+        assert first_id != second_id
+        assert first.generator.worker_id == first_id
+
+        # 租约过期后被其他进程占用，续约时改租新的ID
+        await redis.set(first._key(first_id), "other")
+        await first.renew()
+        assert first.worker_id not in (first_id, second_id)
+        assert first.generator.worker_id == first.worker_id
+
+    asyncio.run(main())